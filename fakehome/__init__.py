@@ -3,3 +3,4 @@
 
 from .datasets import *
 from .core import *
+from .generators import *
@@ -1,9 +1,22 @@
+import os
 from owlready2 import *
 
-DATE_REPRESENTATION = str
-
-# import datetime
-# DATE_REPRESENTATION = datetime.datetime
+# Type of the timestamps stored in the ontology, chosen with the
+# FAKEHOME_DATE_REPRESENTATION environment variable:
+#   'str': the timestamp string read from the data file (default)
+#   'int': nanoseconds since the epoch (see Timestamps.parse_timestamp)
+DATE_REPRESENTATIONS = {
+    'str': str,
+    'int': int
+}
+
+try:
+    DATE_REPRESENTATION = DATE_REPRESENTATIONS[
+        os.environ.get('FAKEHOME_DATE_REPRESENTATION', 'str')]
+except KeyError:
+    raise ValueError(
+        "FAKEHOME_DATE_REPRESENTATION must be one of %s." % (
+            list(DATE_REPRESENTATIONS.keys()),))
 
 baseOnto = get_ontology("file://wsu_datasets/hh/BaseOntology.owl")
 
@@ -234,3 +247,9 @@ with baseOnto:
 
     class takesPlaceIn(Activity >> Location):
         pass
+
+    class ingestedLines(AnnotationProperty):
+        python_name = 'ingested_lines'
+
+    class ingestedSource(AnnotationProperty):
+        python_name = 'ingested_source'
@@ -0,0 +1,208 @@
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+# A snapshot of the state is kept every CHECKPOINT_INTERVAL change points, so
+# that state_at() only replays the change points since the last snapshot.
+CHECKPOINT_INTERVAL = 1 << 16
+
+
+def forward_fill(X_cells, cells, positions, values):
+    """ forward_fill()
+            Writes each value of a (cell, position) change point into the
+            row 'cell' of the C x T array X_cells, from its position until
+            the next change point of the same cell. Change points must be
+            given in time order. The columns before the first change point of
+            a cell are left untouched.
+    """
+    if not len(cells):
+        return X_cells
+    T = X_cells.shape[1]
+
+    # The change points of a cell are gathered in time order, and each value
+    # is repeated until the next change point of the cell
+    order = np.argsort(cells, kind='stable')
+    sorted_cells = cells[order]
+    bounds = np.flatnonzero(np.diff(sorted_cells)) + 1
+
+    for cell, indices in zip(sorted_cells[np.r_[0, bounds]],
+                             np.split(order, bounds)):
+        cell_positions = positions[indices]
+        counts = np.diff(np.append(cell_positions, T))
+        X_cells[cell, cell_positions[0]:] = np.repeat(values[indices], counts)
+    return X_cells
+
+
+class ChangePointTensor(object):
+    """ ChangePointTensor
+            N x F x T nodes features tensor stored as its change points: the
+            N x F state before the first time step, and the (time, node,
+            feature, value) of every change. The value of a (node, feature)
+            at time t is the value of its last change at a time <= t, or its
+            initial value.
+
+            A dense window is materialized with to_dense(), the N x F state
+            at a time step with state_at(), and iterating yields the state at
+            every time step.
+
+            Example:
+
+            X = graph.events_to_change_points(ontology.read_data())
+            X.to_dense(1000, 2000) is a N x F x 1000 array
+    """
+
+    def __init__(self, initial_state, times, nodes, features, values, length=None, dtype=np.float64):
+        super(ChangePointTensor, self).__init__()
+        self._initial_state = np.array(initial_state, dtype=dtype)
+        if self._initial_state.ndim != 2:
+            s = "The initial state of a ChangePointTensor must be a N x F \
+                array. Wrong shape: %s" % (self._initial_state.shape,)
+            logger.error(s)
+            raise AttributeError(s)
+        self._N, self._F = self._initial_state.shape
+
+        times = np.asarray(times, dtype=np.int64)
+        cells = np.asarray(nodes, dtype=np.int64) * self._F + \
+            np.asarray(features, dtype=np.int64)
+        values = np.asarray(values, dtype=dtype)
+
+        if len(times) and np.any(np.diff(times) < 0):
+            order = np.argsort(times, kind='stable')
+            times, cells, values = times[order], cells[order], values[order]
+
+        self._times = times
+        self._cells = cells
+        self._values = values
+        self._T = int(length) if length is not None else \
+            (int(times[-1]) + 1 if len(times) else 0)
+        self._checkpoints = None
+
+    @classmethod
+    def from_dense(cls, X):
+        """ from_dense()
+                Returns the change points of a N x F x T array.
+        """
+        X = np.asarray(X)
+        N, F, T = X.shape
+        if not T:
+            return cls(np.zeros((N, F), dtype=X.dtype), [], [], [], [],
+                       length=0, dtype=X.dtype)
+
+        changed = X[:, :, 1:] != X[:, :, :-1]
+        nodes, features, times = np.nonzero(changed)
+        times = times + 1
+        order = np.argsort(times, kind='stable')
+        nodes, features, times = nodes[order], features[order], times[order]
+        return cls(X[:, :, 0], times, nodes, features,
+                   X[nodes, features, times], length=T, dtype=X.dtype)
+
+    def _build_checkpoints(self):
+        # State after the change points [0, k * CHECKPOINT_INTERVAL)
+        states = [self._initial_state]
+        state = self._initial_state.copy()
+        for start in range(0, len(self._times) - CHECKPOINT_INTERVAL + 1,
+                           CHECKPOINT_INTERVAL):
+            self._apply(state, start, start + CHECKPOINT_INTERVAL)
+            states.append(state.copy())
+        self._checkpoints = states
+
+    def _apply(self, state, begin, end):
+        # Applies the change points [begin, end) to the state, keeping the
+        # last change of each cell
+        cells = self._cells[begin:end][::-1]
+        unique_cells, last = np.unique(cells, return_index=True)
+        state.reshape(-1)[unique_cells] = self._values[end - 1 - last]
+        return state
+
+    def state_at(self, t):
+        """ state_at()
+                Returns the N x F state at time step t, i.e. after the change
+                points of times <= t. A negative t returns the initial state.
+        """
+        end = int(np.searchsorted(self._times, t, side='right'))
+        if self._checkpoints is None:
+            self._build_checkpoints()
+        k = min(end // CHECKPOINT_INTERVAL, len(self._checkpoints) - 1)
+        state = self._checkpoints[k].copy()
+        return self._apply(state, k * CHECKPOINT_INTERVAL, end)
+
+    def to_dense(self, start=0, stop=None):
+        """ to_dense()
+                Returns the N x F x (stop - start) dense array of the time
+                steps [start, stop).
+        """
+        stop = self._T if stop is None else min(stop, self._T)
+        start = max(0, min(start, stop))
+
+        X = np.empty((self._N, self._F, stop - start),
+                     dtype=self._initial_state.dtype)
+        if stop == start:
+            return X
+        X[:] = self.state_at(start)[:, :, None]
+
+        begin, end = np.searchsorted(
+            self._times, [start + 1, stop], side='left')
+        forward_fill(X.reshape(self._N * self._F, stop - start),
+                     self._cells[begin:end], self._times[begin:end] - start,
+                     self._values[begin:end])
+        return X
+
+    def iter_windows(self, window_size):
+        """ iter_windows()
+                Yields consecutive N x F x window_size dense windows (the
+                last one may be shorter).
+        """
+        for start in range(0, self._T, window_size):
+            yield self.to_dense(start, start + window_size)
+
+    def __iter__(self):
+        state = self._initial_state.copy()
+        end = 0
+        for t in range(self._T):
+            begin = end
+            while end < len(self._times) and self._times[end] == t:
+                end += 1
+            if end > begin:
+                self._apply(state, begin, end)
+            yield state.copy()
+
+    def __len__(self):
+        return self._T
+
+    @property
+    def shape(self):
+        return (self._N, self._F, self._T)
+
+    @property
+    def dtype(self):
+        return self._initial_state.dtype
+
+    @property
+    def initial_state(self):
+        return self._initial_state
+
+    @property
+    def times(self):
+        return self._times
+
+    @property
+    def nodes(self):
+        return self._cells // self._F
+
+    @property
+    def features(self):
+        return self._cells % self._F
+
+    @property
+    def values(self):
+        return self._values
+
+    @property
+    def nbytes(self):
+        """ Property: nbytes
+                Returns the memory used by the change points and the initial
+                state.
+        """
+        return self._initial_state.nbytes + self._times.nbytes + \
+            self._cells.nbytes + self._values.nbytes
@@ -0,0 +1,205 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+from .DatasetObject import DatasetObject
+from .EventColumns import EVENT_COLUMNS
+from .ParallelParser import parse_parallel
+from .Sources import source_file, source_stat, sidecar_path
+
+# Bumped whenever parsing changes, so that entries of an older parser are
+# rebuilt (2: lines with an unknown sensor state are skipped)
+CACHE_FORMAT_VERSION = 2
+CACHE_SUFFIX = '.cache'
+TMP_SUFFIX = '.tmp'
+HASH_CHUNK_SIZE = 1 << 24
+
+
+def file_hash(filepath):
+    """ file_hash()
+            Returns the sha1 hex digest of the content of a file.
+    """
+    h = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class DatasetCache(object):
+    """ DatasetCache
+            On-disk binary cache of the parsed events of a dataset.
+
+            The event columns (see EventColumns.EVENT_COLUMNS) are stored as
+            .npy files, along with the sensor and activity vocabularies, in a
+            directory keyed by the hash of the data file and the version of
+            the dataset configuration. Loading an up-to-date cache only
+            memory-maps those files. When the cache has to be built, the data
+            file is parsed with 'processes' worker processes (see
+            ParallelParser.parse_parallel).
+
+            Example:
+
+            columns = DatasetCache(HHDataset('hh101')).load()
+    """
+
+    def __init__(self, dataset, cache_dir=None, processes=1):
+        super(DatasetCache, self).__init__()
+        if not isinstance(dataset, DatasetObject):
+            s = "The DatasetCache must be built from a DatasetObject. \
+                Wrong type for 'dataset': %s" % (type(dataset),)
+            logger.error(s)
+            raise AttributeError(s)
+
+        self._dataset = dataset
+        self._cache_dir = cache_dir if cache_dir is not None \
+            else sidecar_path(dataset.filepath, CACHE_SUFFIX)
+        self._processes = processes
+        self._vocabularies = None
+
+    def _source_hash(self):
+        # Hashing a large file is slow: the hash is memoized along with the
+        # size and mtime of the file it was computed for
+        memo_path = os.path.join(self._cache_dir, 'source.json')
+        st = source_stat(self._dataset.filepath)
+        stat = [st.st_size, st.st_mtime_ns]
+
+        try:
+            with open(memo_path, 'r') as f:
+                memo = json.load(f)
+            if memo['stat'] == stat:
+                return memo['sha1']
+        except (OSError, ValueError, KeyError):
+            pass
+
+        # Compressed data files are keyed on the compressed file
+        logger.debug("Hashing file '%s'...", source_file(self._dataset.filepath))
+        sha1 = file_hash(source_file(self._dataset.filepath))
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            with open(memo_path, 'w') as f:
+                json.dump({'stat': stat, 'sha1': sha1}, f)
+        except OSError as e:
+            logger.warning("Cannot save file hash '%s' (%s).", memo_path, e)
+        return sha1
+
+    @property
+    def key(self):
+        """ Property: key
+                Returns the key of the cache entry for the current content of
+                the data file and configuration of the dataset.
+        """
+        return "v%d-%s-%s" % (
+            CACHE_FORMAT_VERSION, self._source_hash(),
+            self._dataset.config_version)
+
+    def _entry_path(self, key):
+        return os.path.join(self._cache_dir, key)
+
+    def _vocabularies_from_dataset(self):
+        return {
+            'sensor_list': list(self._dataset.sensor_list),
+            'activity_list': list(self._dataset.activity_list),
+            'activity_state_list': list(self._dataset.activity_state_list),
+        }
+
+    def build(self, columns=None):
+        """ build()
+                Parses the data file (unless already parsed columns are
+                given) and stores the result in the cache. Outdated entries
+                are removed.
+        """
+        key = self.key
+        entry_path = self._entry_path(key)
+
+        if columns is None:
+            logger.debug("Parsing dataset %s to build its cache...",
+                         self._dataset.name)
+            columns = parse_parallel(
+                self._dataset, processes=self._processes)
+
+        # The entry is written to a directory of its own, then renamed, as
+        # other processes may build the same entry concurrently
+        os.makedirs(self._cache_dir, exist_ok=True)
+        tmp_path = tempfile.mkdtemp(
+            prefix=key + '.', suffix=TMP_SUFFIX, dir=self._cache_dir)
+        for name, dtype in EVENT_COLUMNS:
+            np.save(os.path.join(tmp_path, name + '.npy'),
+                    np.asarray(columns[name], dtype=dtype))
+        with open(os.path.join(tmp_path, 'vocabularies.json'), 'w') as f:
+            json.dump(self._vocabularies_from_dataset(), f)
+
+        if os.path.isdir(entry_path):
+            # A directory cannot be renamed over a non-empty one: the
+            # replaced entry is moved aside first
+            old_path = tempfile.mkdtemp(
+                prefix=key + '.', suffix=TMP_SUFFIX, dir=self._cache_dir)
+            try:
+                os.rename(entry_path, os.path.join(old_path, key))
+            except OSError:
+                pass
+            shutil.rmtree(old_path, ignore_errors=True)
+        try:
+            os.rename(tmp_path, entry_path)
+            logger.debug("Saved cache entry '%s'.", entry_path)
+        except OSError:
+            if not os.path.isdir(entry_path):
+                raise
+            logger.debug("Cache entry '%s' was built by another process.",
+                         entry_path)
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+        for other in os.listdir(self._cache_dir):
+            other_path = os.path.join(self._cache_dir, other)
+            # Entries being built by other processes are kept
+            if other != key and not other.endswith(TMP_SUFFIX) and \
+                    os.path.isdir(other_path):
+                logger.debug("Removing outdated cache entry '%s'.", other_path)
+                shutil.rmtree(other_path, ignore_errors=True)
+
+        return key
+
+    def load(self, rebuild=False):
+        """ load()
+                Returns the event columns of the dataset as read-only
+                memory-mapped arrays, building the cache first if it is
+                missing or outdated.
+        """
+        entry_path = self._entry_path(self.key)
+        if rebuild or not os.path.isdir(entry_path):
+            self.build()
+
+        with open(os.path.join(entry_path, 'vocabularies.json'), 'r') as f:
+            self._vocabularies = json.load(f)
+
+        logger.debug("Loading cache entry '%s'...", entry_path)
+        return {
+            name: np.load(os.path.join(entry_path, name + '.npy'), mmap_mode='r')
+            for name, _ in EVENT_COLUMNS
+        }
+
+    def clear(self):
+        """ clear()
+                Removes every cache entry of the dataset.
+        """
+        shutil.rmtree(self._cache_dir, ignore_errors=True)
+
+    @property
+    def vocabularies(self):
+        """ Property: vocabularies
+                Returns the sensor, activity and activity state lists the
+                loaded columns refer to.
+        """
+        if self._vocabularies is None:
+            return self._vocabularies_from_dataset()
+        return self._vocabularies
+
+    @property
+    def cache_dir(self):
+        return self._cache_dir
@@ -1,6 +1,11 @@
+import io
+import itertools
+
 import logging
 logger = logging.getLogger(__name__)
 
+from .Sources import open_source
+
 
 class DatasetObject(object):
     """ DatasetObject """
@@ -128,6 +133,54 @@ class DatasetObject(object):
         """
         DatasetObject._not_implemented_error()
 
+    def apply_lines_pattern(self, lines):
+        """ apply_lines_pattern
+                Takes a list of lines from the data file as argument.
+                Returns the events of the lines as a dict of numpy columns
+                (see EventColumns.EVENT_COLUMNS):
+                {
+                    'timestamp': int64 array of epoch nanoseconds,
+                    'sensor': int32 array of indices in sensor_list,
+                    'value': float32 array of converted sensor states,
+                    'activity': int16 array of indices in activity_list,
+                    'activity_state': int16 array of indices in
+                        activity_state_list
+                }
+
+                Lines without activity have NO_ACTIVITY as activity and
+                activity_state. Lines that apply_line_pattern cannot parse or
+                whose sensor is not in sensor_list are skipped.
+        """
+        DatasetObject._not_implemented_error()
+
+    def iter_events(self, start=0, stop=None):
+        """ iter_events()
+                Yields, one at a time, the events (see apply_line_pattern) of
+                the lines [start, stop) of the data file. The file is read
+                (and decompressed, see Sources.open_source) lazily, so memory
+                does not grow with the number of lines.
+                Lines that cannot be parsed are skipped.
+        """
+        with io.TextIOWrapper(open_source(self.filepath)) as f:
+            for idx, line in enumerate(itertools.islice(f, start, stop), start):
+                try:
+                    yield self.apply_line_pattern(line)
+                except (KeyError, AttributeError):
+                    logger.debug(
+                        "Cannot parse line %s of dataset %s. Skipping...", idx, self.name)
+
+    def iter_batches(self, batch_size, start=0, stop=None):
+        """ iter_batches()
+                Same as iter_events(), but yields lists of at most batch_size
+                events.
+        """
+        events = self.iter_events(start, stop)
+        while True:
+            batch = list(itertools.islice(events, batch_size))
+            if not batch:
+                return
+            yield batch
+
     @property
     def sensor_list(self):
         """ Property: sensor_list
@@ -142,6 +195,13 @@ class DatasetObject(object):
         """
         DatasetObject._not_implemented_error()
 
+    @property
+    def activity_state_list(self):
+        """ Property: activity_state_list
+                Returns the list of activity states used in the dataset.
+        """
+        DatasetObject._not_implemented_error()
+
     @property
     def location_list(self):
         """ Property: location_list
@@ -153,6 +213,15 @@ class DatasetObject(object):
     def filepath(self):
         """ Property: filepath
                 Returns the absolute path to the data file. 
+                It can be a compressed file (see Sources.open_source).
+        """
+        DatasetObject._not_implemented_error()
+
+    @property
+    def config_version(self):
+        """ Property: config_version
+                Returns a string identifying the configuration of the dataset.
+                It must change whenever the parsing of the data file would.
         """
         DatasetObject._not_implemented_error()
 
@@ -0,0 +1,55 @@
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Columns produced by DatasetObject.apply_lines_pattern(), with their dtype.
+#   timestamp: epoch time in nanoseconds
+#   sensor: index of the sensor in dataset.sensor_list
+#   value: converted sensor state
+#   activity: index of the activity in dataset.activity_list, or NO_ACTIVITY
+#   activity_state: index of the state in dataset.activity_state_list, or
+#       NO_ACTIVITY
+EVENT_COLUMNS = (
+    ('timestamp', np.int64),
+    ('sensor', np.int32),
+    ('value', np.float32),
+    ('activity', np.int16),
+    ('activity_state', np.int16),
+)
+
+NO_ACTIVITY = -1
+
+
+def empty_columns(size=0):
+    """ empty_columns()
+            Returns a dict of zero-filled event columns of the given size.
+    """
+    return {name: np.zeros(size, dtype=dtype) for name, dtype in EVENT_COLUMNS}
+
+
+def columns_from_lists(**lists):
+    """ columns_from_lists()
+            Converts lists of values (one keyword argument per column) to
+            event columns with the right dtypes.
+    """
+    return {name: np.asarray(lists[name], dtype=dtype)
+            for name, dtype in EVENT_COLUMNS}
+
+
+def concatenate_columns(blocks):
+    """ concatenate_columns()
+            Concatenates, in order, a sequence of event column dicts.
+    """
+    blocks = list(blocks)
+    if not blocks:
+        return empty_columns()
+    return {name: np.concatenate([b[name] for b in blocks]).astype(dtype, copy=False)
+            for name, dtype in EVENT_COLUMNS}
+
+
+def num_events(columns):
+    """ num_events()
+            Returns the number of events stored in an event column dict.
+    """
+    return len(columns['timestamp'])
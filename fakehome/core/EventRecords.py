@@ -0,0 +1,60 @@
+import logging
+logger = logging.getLogger(__name__)
+
+from .BaseOntology import Measure
+
+
+class MeasureRecord(object):
+    """ MeasureRecord
+            Slot-based stand-in for a Measure individual, with the same
+            attributes. The sensor it refers to is the sensor individual of
+            the ontology.
+    """
+    __slots__ = ('is_measured_by', 'value', 'timestamp')
+
+    def __init__(self, is_measured_by, value, timestamp):
+        self.is_measured_by = is_measured_by
+        self.value = value
+        self.timestamp = timestamp
+
+    def materialize(self, measure_class=Measure):
+        """ materialize()
+                Creates the Measure individual of the record. Must be called
+                within the ontology the individual should belong to.
+        """
+        return measure_class(
+            is_measured_by=self.is_measured_by,
+            value=self.value,
+            timestamp=self.timestamp
+        )
+
+    def __repr__(self):
+        return "MeasureRecord(%s, %s, %s)" % (
+            self.is_measured_by.name, self.value, self.timestamp)
+
+
+class ActivityRecord(object):
+    """ ActivityRecord
+            Slot-based stand-in for an Activity individual. 'type' is the
+            Activity class, and 'state' the data property (e.g. beginsAt)
+            the timestamp is assigned to.
+    """
+    __slots__ = ('type', 'state', 'timestamp')
+
+    def __init__(self, type, state, timestamp):
+        self.type = type
+        self.state = state
+        self.timestamp = timestamp
+
+    def materialize(self, activity_class=None):
+        """ materialize()
+                Creates the Activity individual of the record. Must be called
+                within the ontology the individual should belong to.
+        """
+        activity = (activity_class or self.type)()
+        activity.__setattr__(self.state.python_name, self.timestamp)
+        return activity
+
+    def __repr__(self):
+        return "ActivityRecord(%s, %s, %s)" % (
+            self.type.name, self.state.python_name, self.timestamp)
@@ -1,15 +1,29 @@
+import os
+import json
 import networkx as nx
 import numpy as np
 
-from scipy.linalg import fractional_matrix_power
+import scipy.sparse as sp
+from numpy.lib.stride_tricks import as_strided
 
 import logging
 logger = logging.getLogger(__name__)
 
 from .FakeHomeOntology import FakeHomeOntology
-
-
-def adjacency_from_ontology(fakehomeontology):
+from .ChangePointTensor import ChangePointTensor
+from .SpectralCache import SpectralCache, topology_hash
+from .Sources import sidecar_path
+from .TimeBinning import iter_binned, DEFAULT_CHUNK_BINS
+from .Timestamps import as_timestamps
+
+
+def adjacency_from_ontology(fakehomeontology, dense=False, dtype=np.float64):
+    """ adjacency_from_ontology()
+            Returns the N x N adjacency matrix of the sensors and locations
+            of an ontology, as a scipy.sparse CSR matrix (or a numpy array if
+            dense is True) of the given dtype, along with the ordered sensors
+            and locations lists.
+    """
     if not isinstance(fakehomeontology, FakeHomeOntology):
         raise AttributeError()
 
@@ -20,7 +34,6 @@ def adjacency_from_ontology(fakehomeontology):
     # Adjacency is an NxN matrix. The nsensors first elements ([0, nsensors - 1]) refer to
     # sensors, and the nlocations remaining elements ([nsensors, N -
     # 1]) refer to locations
-    adjacency = np.zeros((N, N), dtype=np.float)
 
     # Sensors are stored in an (unordererd) dictionnary. We have to give
     # a fixed ordering here
@@ -29,91 +42,265 @@ def adjacency_from_ontology(fakehomeontology):
     # Same for the locations
     locations_list = [fakehomeontology.locations[k]
                       for k in sorted(fakehomeontology.locations.keys())]
+    location_index = {location: idx + nsensors
+                      for idx, location in enumerate(locations_list)}
 
+    rows, cols = [], []
     for i, sensor in enumerate(sensors_list):
-        j = locations_list.index(sensor.has_location) + nsensors
-        adjacency[i, j] = 1.
-        adjacency[j, i] = 1.
+        j = location_index[sensor.has_location]
+        rows += [i, j]
+        cols += [j, i]
 
-    for idx, location in enumerate(locations_list):
-        i = idx + nsensors
+    for location in locations_list:
+        i = location_index[location]
         for other_location in location.is_adjacent_to:
-            j = locations_list.index(other_location) + nsensors
-            adjacency[i, j] = 1.
+            rows.append(i)
+            cols.append(location_index[other_location])
+
+    # Duplicated edges are summed by the conversion to CSR: they are reset
+    # to 1.
+    adjacency = sp.coo_matrix(
+        (np.ones(len(rows), dtype=sparse_dtype(dtype)), (rows, cols)), shape=(N, N)).tocsr()
+    adjacency.data[:] = 1
+
+    if dense:
+        adjacency = adjacency.toarray().astype(dtype, copy=False)
 
     return adjacency, sensors_list, locations_list
 
 
-def normalize_adjacency(A, symmetric=True):
+def normalize_adjacency(A, symmetric=True, dtype=None):
     """ normalize_adjacency
         Computes the normalized adjacency matrix, either using symmetric 
         or asymmetric normalization. 
-        Please note that the Moore-Penrose pseudo-inverse is used instead of 
-        a straight inverse.  
+        A can be a numpy array or a scipy.sparse matrix, and the result has
+        the same kind. The degree matrix being diagonal, its (pseudo-)inverse
+        is computed elementwise, in O(E): nodes with a zero degree get a
+        zero inverse degree, as with the Moore-Penrose pseudo-inverse.
+        The result has the given floating point dtype (by default, the dtype
+        of A, or float64 for an integer A).
     """
-    D = np.diag(np.sum(A, axis=0))
-    D_1 = np.linalg.pinv(D)
-
+    if dtype is None:
+        dtype = A.dtype if np.issubdtype(A.dtype, np.floating) else np.float64
+    degree = np.asarray(A.sum(axis=0), dtype=np.float64).ravel()
+    nonzero = degree > 0
+    d_1 = np.zeros_like(degree)
+    d_1[nonzero] = 1. / degree[nonzero]
+
+    if sp.issparse(A):
+        dtype = sparse_dtype(dtype)
+        if symmetric:
+            D_12 = sp.diags(np.sqrt(d_1))
+            return (D_12 @ A @ D_12).tocsr().astype(dtype)
+        return (sp.diags(d_1) @ A).tocsr().astype(dtype)
+
+    A = np.asarray(A)
     if symmetric:
-        D_12 = fractional_matrix_power(D_1, 0.5)
-        A_norm = D_12.dot(A).dot(D_12)
-    else:
-        A_norm = D_1.dot(A)
+        d_12 = np.sqrt(d_1)
+        return (d_12[:, None] * A * d_12[None, :]).astype(dtype)
+    return (d_1[:, None] * A).astype(dtype)
+
 
-    return A_norm
+def sparse_dtype(dtype):
+    """ sparse_dtype()
+            Returns the dtype scipy.sparse matrices use for dtype: float16 is
+            not supported, and is replaced with float32.
+    """
+    dtype = np.dtype(dtype)
+    return np.dtype(np.float32) if dtype == np.float16 else dtype
+
+
+LAYOUT_SUFFIX = '.layouts'
+# Height of the locations layer in draw3d(), the sensors being at 0
+LOCATIONS_LAYER_HEIGHT = 60.
+
+# Layouts computed in this process, by topology hash and dimension
+_layouts = {}
+
+
+def propagate_chunk(operator, X, hops=1):
+    """ propagate_chunk()
+            Returns operator^hops X for every time step of a N x F x T
+            tensor, with a single sparse matmul per hop.
+    """
+    N, F, T = X.shape
+    H = np.ascontiguousarray(X).reshape(N, F * T)
+    for _ in range(hops):
+        H = operator.dot(H)
+    return H.reshape(N, F, T)
+
+
+def _check_windows(window_size, stride):
+    for name, value in (('window_size', window_size), ('stride', stride)):
+        if value < 1:
+            s = "%s must be at least 1. Got: %s" % (name, value)
+            logger.error(s)
+            raise ValueError(s)
+
+
+def window_view(X, window_size, stride=1):
+    """ window_view()
+            Returns a read-only (num_windows, N, F, window_size) strided view
+            of the windows of a N x F x T array, starting every 'stride' time
+            steps. No data is copied, and X can be memory-mapped.
+
+            Raises ValueError if window_size or stride is lower than 1.
+    """
+    _check_windows(window_size, stride)
+    N, F, T = X.shape
+    num_windows = max(0, (T - window_size) // stride + 1)
+    sN, sF, sT = X.strides
+    return as_strided(X, shape=(num_windows, N, F, window_size),
+                      strides=(sT * stride, sN, sF, sT), writeable=False)
 
 
 class FakeHomeGraph(nx.Graph):
+    """ FakeHomeGraph
+            Graph of the sensors and locations of a FakeHomeOntology, and
+            builder of its N x F x T nodes features tensors.
+
+            dtype is the dtype of the features tensors and of the normalized
+            adjacency and laplacian. binary_dtype (by default, dtype) is the
+            dtype of the 0/1 arrays: adjacency and one-hot location
+            features. Memory per element of a N x F x T tensor, e.g. for
+            hh101 (N=45, F=10) over 1M events:
+
+                float64  8 bytes  3.6 GB (default)
+                float32  4 bytes  1.8 GB
+                float16  2 bytes  0.9 GB, values with 3 significant digits
+                                  (counts are exact up to 2048). Sparse
+                                  matrices do not support float16 and use
+                                  float32
+                uint8    1 byte   binary_dtype only: the adjacency and
+                                  location features, 8x smaller
+
+            Spectral operators (see spectral_cache()) are computed in
+            float64, as LAPACK has no half precision eigensolver.
+
+            Example:
+
+            graph = FakeHomeGraph(ontology, dtype=np.float32, binary_dtype=np.uint8)
+    """
 
-    def __init__(self, ontology=None, **attr):
+    def __init__(self, ontology=None, dtype=np.float64, binary_dtype=None, **attr):
         if not isinstance(ontology, FakeHomeOntology):
             raise AttributeError(
                 "Fake home graph must be built from a FakfHomeOntology object")
 
         self._ontology = ontology
+        self._dtype = np.dtype(dtype)
+        self._binary_dtype = np.dtype(
+            binary_dtype if binary_dtype is not None else dtype)
 
         self._adjacency, self._sensors_list, self._locations_list = adjacency_from_ontology(
-            self._ontology)
+            self._ontology, dtype=self._binary_dtype)
 
         self._nsensors = len(self._sensors_list)
         self._nlocations = len(self._locations_list)
         self._N = self._adjacency.shape[0]
 
-        # A ordering for the nodes' features is obtained here
-        self._features_list = list(set(type(e)
-                                       for e in self._sensors_list + self._locations_list))
+        # A ordering for the nodes' features is obtained here. Classes are
+        # sorted by name so that the ordering is the same between runs
+        self._features_list = sorted(
+            set(type(e) for e in self._sensors_list + self._locations_list),
+            key=lambda cls: cls.name)
         self._F = len(self._features_list)
 
         # One-hot coding of the location
         self._locations_features = np.zeros(
-            (self._nlocations, self._F), dtype=np.float)
+            (self._nlocations, self._F), dtype=self._binary_dtype)
         for i, loc in enumerate(self._locations_list):
             j = self._features_list.index(type(loc))
             self._locations_features[i, j] = 1.0
 
+        # Lookups from events to node and feature indices
+        self._sensor_index = {sensor: i
+                              for i, sensor in enumerate(self._sensors_list)}
+        self._sensor_index_by_name = {
+            name: i for i, name in enumerate(sorted(ontology.sensors.keys()))}
+        self._sensor_features = np.array(
+            [self._features_list.index(type(sensor))
+             for sensor in self._sensors_list], dtype=np.intp)
+
         super(FakeHomeGraph, self).__init__(self._adjacency, **attr)
 
         for idx, sensor in enumerate(self._sensors_list):
-            self.node[idx]['name'] = sensor.name
-            self.node[idx]['instance'] = sensor
+            self.nodes[idx]['name'] = sensor.name
+            self.nodes[idx]['instance'] = sensor
 
         for idx, loc in enumerate(self._locations_list):
-            self.node[idx + self._nsensors]['name'] = loc.name
-            self.node[
-                idx + self._nsensors]['instance'] = loc
+            self.nodes[idx + self._nsensors]['name'] = loc.name
+            self.nodes[idx + self._nsensors]['instance'] = loc
 
         self._normalized_adjacency = None
         self._laplacian = None
+        self._spectral_caches = {}
+        self._topology_key = None
+
+    def _compute_layout(self):
+        try:
+            pos = nx.nx_agraph.graphviz_layout(self)
+        except ImportError as e:
+            logger.warning(e)
+            pos = nx.spring_layout(self, k=(1. / self._N) * 10)
+        return [[float(c) for c in pos[v]] for v in range(self._N)]
+
+    def layout(self, dim=2, layout_dir=None):
+        """ layout()
+                Returns the positions of the nodes used by draw() (dim=2) or
+                draw3d() (dim=3, sensors and locations on two layers), as a
+                dict of tuples by node.
+
+                Layouts are cached in memory and in a json file of
+                layout_dir (by default, next to the data file of the
+                dataset), keyed by the topology hash of the adjacency
+                matrix: homes with the same topology are laid out once.
+        """
+        key = self.topology_key
+        if layout_dir is None:
+            layout_dir = sidecar_path(
+                self._ontology.dataset.filepath, LAYOUT_SUFFIX)
+        path = os.path.join(layout_dir, key + '.json')
+
+        layouts = _layouts.get(key)
+        if layouts is None:
+            try:
+                with open(path, 'r') as f:
+                    layouts = json.load(f)
+                logger.debug("Loaded layout '%s'.", path)
+            except (OSError, ValueError):
+                layouts = {}
+            _layouts[key] = layouts
+
+        name = '%dd' % (dim,)
+        if name not in layouts:
+            if dim == 2:
+                layouts[name] = self._compute_layout()
+            elif dim == 3:
+                # Sensors and locations on 2 different layers
+                layouts[name] = [
+                    list(xy) + [0. if v < self._nsensors else LOCATIONS_LAYER_HEIGHT]
+                    for v, xy in enumerate(self.layout(2, layout_dir).values())]
+            else:
+                s = "Wrong layout dimension: %s. Must be 2 or 3." % (dim,)
+                logger.error(s)
+                raise AttributeError(s)
+
+            try:
+                os.makedirs(layout_dir, exist_ok=True)
+                with open(path + '.tmp', 'w') as f:
+                    json.dump(layouts, f)
+                os.replace(path + '.tmp', path)
+            except OSError as e:
+                logger.warning("Cannot save layout '%s' (%s).", path, e)
+
+        return {v: tuple(xyz) for v, xyz in enumerate(layouts[name])}
 
     def draw(self, pos=None):
         if pos is None:
-            try:
-                pos = nx.nx_agraph.graphviz_layout(self)
-            except ImportError as e:
-                logger.warning(e)
-                pos = nx.spring_layout(self, k=(1. / self._N) * 10)
+            pos = self.layout()
 
-        labels = {i: self.node[i]['name'].replace(
+        labels = {i: self.nodes[i]['name'].replace(
             "location", "").replace('1', '') for i in self.nodes()}
         node_color = ['lightseagreen' if i <
                       self._nsensors else 'indianred' for i in self.nodes()]
@@ -142,19 +329,15 @@ class FakeHomeGraph(nx.Graph):
             logger.error("Cannot use draw3d without mayavi.")
             raise e
 
-        graph_pos = nx.nx_agraph.graphviz_layout(self)
+        graph_pos = self.layout(dim=3)
 
         # numpy array of x,y,z positions in sorted node order
-        xyz = np.array([graph_pos[v] + (0,) for v in sorted(self)])
+        xyz = np.array([graph_pos[v] for v in sorted(self)])
 
         # Clear figure
         mlab.figure(1, bgcolor=bgcolor)
         mlab.clf()
 
-        # Setup 2 different layers, for sensors and locations
-        xyz[:self._nsensors, 2] = 0.
-        xyz[self._nsensors:, 2] = 60.
-
         # Create points
         pts = mlab.points3d(xyz[:, 0], xyz[:, 1], xyz[:, 2], range(self._N),
                             scale_factor=node_size,
@@ -171,7 +354,7 @@ class FakeHomeGraph(nx.Graph):
         pts.module_manager.scalar_lut_manager.lut.table = node_color
 
         # Add labels with different size for locations and sensors names
-        labels = {i: self.node[i]['name'].replace(
+        labels = {i: self.nodes[i]['name'].replace(
             "location", "") for i in self.nodes()}
 
         for i, (x, y, z) in enumerate(xyz):
@@ -190,34 +373,276 @@ class FakeHomeGraph(nx.Graph):
         # Visualize with mayavi
         mlab.show()
 
-    def events_to_nodes_features(self, events):
+    def events_to_nodes_features(self, events, initial_state=None):
+        """ events_to_nodes_features()
+                Builds the N x F x T nodes features tensor of the sensor events
+                of a slice, with one time step per event.
+
+                initial_state is the N x F state before the first event, e.g.
+                the last time step of the previous slice. By default, sensors
+                are set to zero and locations to their one-hot features.
+        """
         if not isinstance(events, dict) or not 'sensor_events' in events.keys():
             raise AttributeError()
 
         measures = events["sensor_events"]
-        X = np.zeros((self._N, self._F, len(measures)), dtype=np.float)
+        T = len(measures)
+        X = np.empty((self._N, self._F, T), dtype=self._dtype)
+        if not T:
+            return X
+
+        if initial_state is None:
+            # The locations will remain unchanged during the process
+            initial_state = self._default_state()
+        X[:] = initial_state[:, :, None]
+
+        rows, cols, values = self._events_indices(measures)
+
+        # Each (node, feature) cell keeps the value of its last event: the
+        # events of a cell are gathered in time order, and each value is
+        # repeated until the next event of the cell.
+        cells = rows * self._F + cols
+        order = np.argsort(cells, kind='stable')
+        sorted_cells = cells[order]
+        bounds = np.flatnonzero(np.diff(sorted_cells)) + 1
+
+        X_cells = X.reshape(self._N * self._F, T)
+        for cell, positions in zip(sorted_cells[np.r_[0, bounds]],
+                                   np.split(order, bounds)):
+            counts = np.diff(np.append(positions, T))
+            X_cells[cell, positions[0]:] = np.repeat(values[positions], counts)
 
-        # The locations will remain unchanged during the process
-        X[self._nsensors:, :, 0] = self._locations_features
+        return X
 
-        for idx, measure in enumerate(measures):
-            # Ensure temporal consistence
-            if idx > 0:
-                X[:, :, idx] = X[:, :, idx - 1]
+    def events_to_change_points(self, events, initial_state=None):
+        """ events_to_change_points()
+                Same as events_to_nodes_features(), but returns the tensor as
+                a ChangePointTensor, which only stores the sensor events. Use
+                it for long slices, whose dense tensor would not fit in
+                memory.
+        """
+        if not isinstance(events, dict) or not 'sensor_events' in events.keys():
+            raise AttributeError()
 
-            # Assign sensor value
-            sensor = measure.is_measured_by
-            feature = type(sensor)
-            i = self._sensors_list.index(sensor)
-            j = self._features_list.index(feature)
-            X[i, j, idx] = measure.value
+        if initial_state is None:
+            # The locations will remain unchanged during the process
+            initial_state = self._default_state()
 
-        return X
+        measures = events["sensor_events"]
+        rows, cols, values = self._events_indices(measures)
+        return ChangePointTensor(
+            initial_state, np.arange(len(measures)), rows, cols, values,
+            length=len(measures), dtype=self._dtype)
+
+    def _events_indices(self, measures):
+        """ _events_indices()
+                Returns the node indices, feature indices and values of a
+                list of measures, as arrays.
+        """
+        n = len(measures)
+        rows = np.fromiter(
+            (self._sensor_index[measure.is_measured_by] for measure in measures),
+            dtype=np.intp, count=n)
+        values = np.fromiter(
+            (measure.value for measure in measures), dtype=np.float64, count=n)
+        return rows, self._sensor_features[rows], values
 
     def read_data(self, window_size=-1, starting_line=0):
         events = self._ontology.read_data(window_size, starting_line)
         return self.events_to_nodes_features(events)
 
+    def iter_data(self, batch_size=1000, window_size=-1, starting_line=0):
+        """ iter_data()
+                Same as read_data(), but pulls the events incrementally from
+                FakeHomeOntology.iter_events() and yields one N x F x T_batch
+                tensor per batch of lines. Each tensor continues from the last
+                state of the previous one, so concatenating them along the
+                last axis gives the read_data() tensor.
+        """
+        state = None
+        for events in self._ontology.iter_events(
+                batch_size, window_size, starting_line):
+            X = self.events_to_nodes_features(events, initial_state=state)
+            if X.shape[2]:
+                state = X[:, :, -1].copy()
+            yield X
+
+    def _default_state(self):
+        # Sensors set to zero and locations to their one-hot features
+        state = np.zeros((self._N, self._F), dtype=self._dtype)
+        state[self._nsensors:] = self._locations_features
+        return state
+
+    def iter_binned_features(self, bin_size, aggregation='last', events=None,
+                             columns=None, start=None, stop=None,
+                             chunk_bins=DEFAULT_CHUNK_BINS, initial_state=None):
+        """ iter_binned_features()
+                Yields the N x F x T nodes features tensor sampled every
+                bin_size seconds, in chunks of at most chunk_bins time steps,
+                so that long ranges are processed in bounded memory.
+
+                The values of a sensor within a bin are aggregated with
+                'last' (value at the end of the bin), 'max' or 'count'
+                (number of events). Locations keep their one-hot features.
+
+                The events are either a slice returned by read_data() or
+                event columns (see FakeHomeOntology.read_columns() and
+                DatasetCache.load(), whose memory-mapped columns are read
+                chunk by chunk). By default, read_columns() is used. The bins
+                cover [start, stop), given in any DATE_REPRESENTATION, or
+                the range of the events.
+
+                Example:
+
+                X = graph.binned_features(60, 'count', columns=DatasetCache(dataset).load())
+        """
+        if events is not None:
+            measures = events['sensor_events']
+            timestamps = as_timestamps([m.timestamp for m in measures])
+            sensors, _, values = self._events_indices(measures)
+            node_of_sensor = None
+        else:
+            if columns is None:
+                columns = self._ontology.read_columns()
+            timestamps = columns['timestamp']
+            sensors = columns['sensor']
+            values = columns['value']
+            node_of_sensor = np.array(
+                [self._sensor_index_by_name.get(name, -1)
+                 for name in self._ontology.dataset.sensor_list],
+                dtype=np.intp)
+
+        if start is not None:
+            start = as_timestamps([start])[0]
+        if stop is not None:
+            stop = as_timestamps([stop])[0]
+        if initial_state is None:
+            initial_state = self._default_state()
+
+        feature_of_node = np.r_[
+            self._sensor_features,
+            np.argmax(self._locations_features, axis=1)
+        ].astype(np.intp)
+
+        for X in iter_binned(timestamps, sensors, values, initial_state,
+                             bin_size, feature_of_node, node_of_sensor,
+                             aggregation, start, stop, chunk_bins,
+                             dtype=self._dtype):
+            if aggregation == 'count':
+                X[self._nsensors:] = self._locations_features[:, :, None]
+            yield X
+
+    def binned_features(self, bin_size, aggregation='last', events=None,
+                        columns=None, start=None, stop=None, initial_state=None):
+        """ binned_features()
+                Returns the whole tensor of iter_binned_features().
+        """
+        chunks = list(self.iter_binned_features(
+            bin_size, aggregation, events, columns, start, stop,
+            initial_state=initial_state))
+        if not chunks:
+            return np.zeros((self._N, self._F, 0), dtype=self._dtype)
+        return np.concatenate(chunks, axis=2)
+
+    def iter_minibatches(self, window_size, stride=1, batch_size=32,
+                         shuffle=False, seed=None, drop_last=False, data=None):
+        """ iter_minibatches()
+                Yields B x N x F x window_size minibatches of the windows of
+                a nodes features tensor, starting every 'stride' time steps.
+
+                data is the N x F x T tensor, a path to a .npy file of it
+                (memory-mapped), or a ChangePointTensor. By default, the
+                tensor of read_data() is used.
+
+                Without shuffling, the minibatches are read-only strided
+                views of the tensor. With shuffling, the order of the windows
+                is drawn from a numpy generator seeded with 'seed', and only
+                each minibatch is copied. Windows of a ChangePointTensor are
+                materialized per minibatch.
+
+                Raises ValueError if window_size, stride or batch_size is
+                lower than 1.
+
+                Example:
+
+                for X in graph.iter_minibatches(100, stride=10, shuffle=True, seed=0):
+                    ...
+        """
+        _check_windows(window_size, stride)
+        if batch_size < 1:
+            s = "batch_size must be at least 1. Got: %s" % (batch_size,)
+            logger.error(s)
+            raise ValueError(s)
+
+        if data is None:
+            data = self.read_data()
+        elif isinstance(data, str):
+            data = np.load(data, mmap_mode='r')
+
+        if tuple(data.shape[:2]) != (self._N, self._F):
+            s = "Wrong shape for minibatches data: %s, expected (%d, %d, T)." % (
+                data.shape, self._N, self._F)
+            logger.error(s)
+            raise AttributeError(s)
+
+        T = data.shape[2]
+        num_windows = max(0, (T - window_size) // stride + 1)
+        order = np.arange(num_windows)
+        if shuffle:
+            np.random.default_rng(seed).shuffle(order)
+
+        if isinstance(data, ChangePointTensor):
+            def batch(indices):
+                if not shuffle:
+                    first, last = indices[0] * stride, indices[-1] * stride
+                    dense = data.to_dense(first, last + window_size)
+                    return window_view(dense, window_size, stride)
+                return np.stack([
+                    data.to_dense(i * stride, i * stride + window_size)
+                    for i in indices])
+        else:
+            windows = window_view(data, window_size, stride)
+
+            def batch(indices):
+                if not shuffle:
+                    return windows[indices[0]:indices[-1] + 1]
+                return windows[indices]
+
+        for start in range(0, num_windows, batch_size):
+            indices = order[start:start + batch_size]
+            if drop_last and len(indices) < batch_size:
+                return
+            yield batch(indices)
+
+    @property
+    def topology_key(self):
+        """ Property: topology_key
+                Returns the sha1 hash of the adjacency matrix.
+        """
+        if self._topology_key is None:
+            self._topology_key = topology_hash(self._adjacency)
+        return self._topology_key
+
+    @property
+    def features_list(self):
+        """ Property: features_list
+                Returns the classes of the features, in the order of the
+                feature axis of the nodes features tensors.
+        """
+        return self._features_list
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def binary_dtype(self):
+        return self._binary_dtype
+
+    @property
+    def nsensors(self):
+        return self._nsensors
+
     @property
     def N(self):
         return self._N
@@ -226,15 +651,91 @@ class FakeHomeGraph(nx.Graph):
     def F(self):
         return self._F
 
+    @property
+    def adjacency(self):
+        """ Property: adjacency
+                Returns the N x N adjacency matrix as a scipy.sparse CSR
+                matrix. Use .toarray() for a dense numpy array.
+        """
+        return self._adjacency
+
     @property
     def symnorm_adjacency(self):
+        """ Property: symnorm_adjacency
+                Returns the symmetrically normalized adjacency
+                D^-1/2 A D^-1/2 as a scipy.sparse CSR matrix.
+        """
         if self._normalized_adjacency is None:
             self._normalized_adjacency = normalize_adjacency(
-                self._adjacency, symmetric=True)
+                self._adjacency, symmetric=True, dtype=self._dtype)
         return self._normalized_adjacency
 
     @property
     def normalized_laplacian(self):
+        """ Property: normalized_laplacian
+                Returns the normalized laplacian I - D^-1/2 A D^-1/2 as a
+                scipy.sparse CSR matrix.
+        """
         if self._laplacian is None:
-            self._laplacian = np.eye(self._N) - self.symnorm_adjacency
+            self._laplacian = (
+                sp.identity(self._N, dtype=sparse_dtype(self._dtype),
+                            format='csr') - self.symnorm_adjacency).tocsr()
         return self._laplacian
+
+    def propagate(self, X, hops=1, chunk_size=None, operator=None):
+        """ propagate()
+                Returns A^hops X for every time step of a N x F x T nodes
+                features tensor X (a numpy array, possibly memory-mapped, or
+                a ChangePointTensor), i.e. the features aggregated over the
+                hops-hop neighbourhood of each node. A is the symmetrically
+                normalized adjacency, unless another N x N operator is given.
+
+                With a chunk_size, X is processed chunk_size time steps at a
+                time, so only the result is held in memory along with one
+                chunk.
+
+                Example:
+
+                X2 = graph.propagate(graph.read_data(), hops=2)
+        """
+        if operator is None:
+            operator = self.symnorm_adjacency
+
+        T = X.shape[2]
+        if chunk_size is None:
+            chunk_size = max(T, 1)
+
+        out = np.empty((self._N, X.shape[1], T),
+                       dtype=np.result_type(X.dtype, self._dtype))
+        for start in range(0, T, chunk_size):
+            stop = min(T, start + chunk_size)
+            chunk = X.to_dense(start, stop) \
+                if isinstance(X, ChangePointTensor) else X[:, :, start:stop]
+            out[:, :, start:stop] = propagate_chunk(operator, chunk, hops)
+        return out
+
+    def iter_propagate(self, chunks, hops=1, operator=None):
+        """ iter_propagate()
+                Same as propagate(), for a sequence of N x F x T_chunk
+                tensors, e.g. from iter_data() or iter_binned_features().
+                Yields the propagated chunks.
+        """
+        if operator is None:
+            operator = self.symnorm_adjacency
+        for X in chunks:
+            yield propagate_chunk(operator, X, hops)
+
+    def spectral_cache(self, cache_dir=None):
+        """ spectral_cache()
+                Returns the SpectralCache of the graph (eigenpairs, scaled
+                laplacian, Chebyshev and power bases). With a cache_dir
+                (e.g. SpectralCache.DEFAULT_CACHE_DIR), the operators are
+                persisted on disk, keyed by the topology of the home.
+        """
+        try:
+            return self._spectral_caches[cache_dir]
+        except KeyError:
+            cache = self._spectral_caches[cache_dir] = SpectralCache(
+                self._adjacency, self.normalized_laplacian,
+                self.symnorm_adjacency, cache_dir=cache_dir)
+            return cache
@@ -0,0 +1,176 @@
+import numpy as np
+import scipy.sparse as sp
+
+import logging
+logger = logging.getLogger(__name__)
+
+from .FakeHomeGraph import FakeHomeGraph, normalize_adjacency, propagate_chunk, \
+    sparse_dtype
+
+
+class FakeHomeGraphBatch(object):
+    """ FakeHomeGraphBatch
+            Stacks several FakeHomeGraph into a single graph, whose sparse
+            adjacency is the block-diagonal matrix of their adjacencies, so
+            that a fleet of homes is processed with one sparse multiply.
+
+            The features of every home are mapped to a shared vocabulary:
+            the names of the feature classes of all the homes, sorted. The
+            nodes of home i are the rows [offsets[i], offsets[i + 1]).
+
+            Example:
+
+            batch = FakeHomeGraphBatch([graph_hh101, graph_hh102])
+            X = batch.stack([graph_hh101.binned_features(60, start=t0, stop=t1),
+                             graph_hh102.binned_features(60, start=t0, stop=t1)])
+            H = batch.propagate(X, hops=2)
+    """
+
+    def __init__(self, graphs, features_list=None, dtype=None):
+        super(FakeHomeGraphBatch, self).__init__()
+        self._graphs = list(graphs)
+        for graph in self._graphs:
+            if not isinstance(graph, FakeHomeGraph):
+                s = "FakeHomeGraphBatch must be built from FakeHomeGraph \
+                    objects. Wrong type: %s" % (type(graph),)
+                logger.error(s)
+                raise AttributeError(s)
+
+        if features_list is None:
+            features_list = sorted(set(
+                cls.name for graph in self._graphs
+                for cls in graph.features_list))
+        self._features_list = list(features_list)
+        self._F = len(self._features_list)
+
+        feature_index = {name: j for j, name in enumerate(self._features_list)}
+        try:
+            # Global feature index of each local feature, for every home
+            self._feature_maps = [
+                np.array([feature_index[cls.name] for cls in graph.features_list],
+                         dtype=np.intp)
+                for graph in self._graphs
+            ]
+        except KeyError as e:
+            s = "Feature %s is missing from the batch features list." % (e,)
+            logger.error(s)
+            raise AttributeError(s)
+
+        # dtype of the normalized operators, by default the one of the first
+        # graph
+        self._dtype = np.dtype(dtype if dtype is not None else (
+            self._graphs[0].dtype if self._graphs else np.float64))
+
+        self._offsets = np.cumsum(
+            [0] + [graph.N for graph in self._graphs]).astype(np.intp)
+        self._N = int(self._offsets[-1])
+
+        self._adjacency = sp.block_diag(
+            [graph.adjacency for graph in self._graphs], format='csr')
+        self._normalized_adjacency = None
+        self._laplacian = None
+
+    def align(self, i, X):
+        """ align()
+                Maps the N_i x F_i x T tensor of home i to the shared
+                features vocabulary: returns a N_i x F x T tensor.
+        """
+        X = np.asarray(X)
+        out = np.zeros((X.shape[0], self._F) + X.shape[2:], dtype=X.dtype)
+        out[:, self._feature_maps[i]] = X
+        return out
+
+    def stack(self, tensors):
+        """ stack()
+                Returns the N x F x T tensor of the batch from the tensors of
+                every home, which must have the same number of time steps
+                (e.g. binned_features() with the same bins).
+        """
+        tensors = list(tensors)
+        if len(tensors) != len(self._graphs):
+            s = "Wrong number of tensors: %d, for %d homes." % (
+                len(tensors), len(self._graphs))
+            logger.error(s)
+            raise AttributeError(s)
+
+        lengths = set(X.shape[2] for X in tensors)
+        if len(lengths) > 1:
+            s = "The tensors of the homes must have the same number of time \
+                steps. Got: %s" % (sorted(lengths),)
+            logger.error(s)
+            raise AttributeError(s)
+
+        T = lengths.pop() if lengths else 0
+        out = np.zeros((self._N, self._F, T),
+                       dtype=np.result_type(*tensors) if tensors else np.float64)
+        for i, X in enumerate(tensors):
+            out[self._offsets[i]:self._offsets[i + 1],
+                self._feature_maps[i]] = X
+        return out
+
+    def split(self, X):
+        """ split()
+                Returns the views of the N_i x F x T tensors of every home in
+                a N x F x T tensor of the batch.
+        """
+        return [X[self._offsets[i]:self._offsets[i + 1]]
+                for i in range(len(self._graphs))]
+
+    def propagate(self, X, hops=1, operator=None):
+        """ propagate()
+                Same as FakeHomeGraph.propagate(), for the whole batch at
+                once.
+        """
+        if operator is None:
+            operator = self.symnorm_adjacency
+        return propagate_chunk(operator, X, hops).astype(
+            np.result_type(X.dtype, self._dtype), copy=False)
+
+    def __len__(self):
+        return len(self._graphs)
+
+    @property
+    def graphs(self):
+        return self._graphs
+
+    @property
+    def offsets(self):
+        return self._offsets
+
+    @property
+    def features_list(self):
+        return self._features_list
+
+    @property
+    def node_home(self):
+        """ Property: node_home
+                Returns the index of the home of every node.
+        """
+        return np.repeat(np.arange(len(self._graphs)), np.diff(self._offsets))
+
+    @property
+    def N(self):
+        return self._N
+
+    @property
+    def F(self):
+        return self._F
+
+    @property
+    def adjacency(self):
+        return self._adjacency
+
+    @property
+    def symnorm_adjacency(self):
+        if self._normalized_adjacency is None:
+            self._normalized_adjacency = normalize_adjacency(
+                self._adjacency, symmetric=True, dtype=self._dtype)
+        return self._normalized_adjacency
+
+    @property
+    def normalized_laplacian(self):
+        if self._laplacian is None:
+            self._laplacian = (
+                sp.identity(self._N, dtype=sparse_dtype(self._dtype),
+                            format='csr') - self.symnorm_adjacency).tocsr()
+        return self._laplacian
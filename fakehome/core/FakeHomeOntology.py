@@ -1,4 +1,8 @@
+import io
 import os
+import sqlite3
+import hashlib
+from collections import OrderedDict
 from owlready2 import *
 
 import logging
@@ -7,12 +11,51 @@ from tqdm import tqdm
 
 from .BaseOntology import *
 from .DatasetObject import DatasetObject
+from .EventRecords import MeasureRecord, ActivityRecord
+from .LineIndex import LineIndex
+from .LogFollower import LogFollower
+from .ParallelParser import parse_parallel
 
+# Number of the last ingested lines whose hash is stored in the persistent
+# world, to detect a data file truncated or replaced since
+INGEST_SIGNATURE_LINES = 16
 
-class FakeHomeOntology(object):
-    """docstring for FakeHomeOntology"""
 
-    def __init__(self, dataset):
+class FakeHomeOntology(object):
+    """ FakeHomeOntology
+            Ontology of a home (locations, sensors) built from a
+            DatasetObject, and reader of its events.
+
+            In lightweight mode, the events read are kept as MeasureRecord
+            and ActivityRecord objects instead of ontology individuals, which
+            are much cheaper to create and to drop. Individuals are only
+            created by materialize(), e.g. for semantic queries or OWL export.
+
+            If world_path is given, the working ontology lives in a persistent
+            owlready2 World stored in that SQLite file instead of the default
+            in-memory world. Reopening the file reuses the locations and
+            sensors it holds, and ingest() stores the events of the dataset
+            in it by batches, so that the full history can be queried (see
+            query()) without re-reading the data file. With a persistent
+            world, windows (read_data(), iter_events(), follow()) are always
+            read as records, so that they are not saved along with the
+            ingested events.
+
+            owlready2 locks the file of a persistent world until it is
+            closed. With copy_world, the world is read into an in-memory copy
+            instead, so that other processes can open the file: ingest() and
+            save() then only affect the copy.
+
+            read_data() keeps the events of the lines it read in a cache of
+            at most cache_max_lines lines (besides the current window), which
+            windows overlapping previous ones reuse. The budget is a number
+            of lines rather than of bytes: a line holds at most one measure
+            and one activity, so it bounds the number of cached individuals,
+            whose memory owlready2 cannot report.
+    """
+
+    def __init__(self, dataset, lightweight=False, world_path=None, cache_max_lines=0,
+                 copy_world=False):
         super(FakeHomeOntology, self).__init__()
         if not isinstance(dataset, DatasetObject):
             s = "The FakeHomeOntology must be built from a DatasetObject. \
@@ -21,6 +64,14 @@ class FakeHomeOntology(object):
             raise AttributeError(s)
 
         self._dataset = dataset
+        self._lightweight = lightweight or world_path is not None
+
+        # Cache of the events read by read_data(): segments of lines, from
+        # the least to the most recently used
+        self._segments = OrderedDict()
+        self._cache_max_lines = cache_max_lines
+        self._cache_hits = 0
+        self._cache_misses = 0
 
         if logger.getEffectiveLevel() < logging.WARNING:
             print("Building ontology from dataset %s..." %
@@ -29,151 +80,724 @@ class FakeHomeOntology(object):
             print("Building ontology from dataset %s... " %
                   (self._dataset.name,), end='')
 
-        with open(self._dataset.filepath, 'r') as f:
-            self._file_length = len(f.readlines())
-            logger.debug(
-                "Found %s lines in file %s",
-                self._file_length, self._dataset.filepath)
-
-        self._working_ontology = get_ontology(os.path.join(
-            self._dataset.filepath, self._dataset.name + ".owl"))
+        self._line_index = LineIndex(self._dataset.filepath)
+        self._file_length = len(self._line_index)
+        logger.debug(
+            "Found %s lines in file %s",
+            self._file_length, self._dataset.filepath)
+
+        ontology_iri = os.path.join(
+            self._dataset.filepath, self._dataset.name + ".owl")
+        self._closed = False
+        if world_path is None:
+            self._world = default_world
+            self._working_ontology = get_ontology(ontology_iri)
+        else:
+            self._world = FakeHomeOntology._open_world(world_path, copy_world)
+            self._working_ontology = self._world.get_ontology(ontology_iri)
 
         with self._working_ontology:
-            # Create the locations
-            self._locations = {
-                name: self._dataset.location_type_mapping(name)()
-                for name in self._dataset.location_list
-            }
-            logger.debug("Found locations: %s", self._dataset.location_list)
-
-            # Create a sensor dictionnary
-            self._sensors = {}
-
-            for (loc, loc_instance) in tqdm(
-                    self._locations.items(), desc="Creating ontology", ascii=True):
-                # Create adjacency relationships between locations
-                try:
-                    for other in self._dataset.get_location_adjacency(loc):
-                        other_instance = self._locations[other]
-                        loc_instance.is_adjacent_to.append(other_instance)
-                        other_instance.is_adjacent_to.append(loc_instance)
-                except KeyError as e:
-                    logger.warning(
-                        'Cannot find other: {}. Continuing.'.format(other))
-                logger.debug(
-                    "Processed location adjacencies for location %s.", loc)
-
-                # Create sensors and attach them to location
-                for sensor in self._dataset.get_location_sensors(loc):
-                    # Raise an error if sensor already exist to avoid side
-                    # # effects
-                    if sensor not in self._sensors.keys():
-                        self._sensors[sensor] = \
-                            self._dataset.sensor_name_mapping(
-                                sensor)(
-                                    name=sensor, has_location=loc_instance)
-                    else:
-                        s = "Sensor %s is in 2 locations..." % (sensor,)
-                        logger.error(s)
-                        raise AssertionError(s)
-                logger.debug("Processed sensor creation for location %s.", loc)
+            if not self._load_structure():
+                self._build_structure()
 
             self.training_slice = None
 
             print("Ok !")
 
+    @staticmethod
+    def _open_world(world_path, copy=False):
+        logger.debug("Opening persistent world '%s'...", world_path)
+        if not copy:
+            world = World(filename=world_path)
+        elif os.path.isfile(world_path):
+            source = sqlite3.connect(world_path)
+            connection = sqlite3.connect(':memory:', check_same_thread=False)
+            try:
+                source.backup(connection)
+            finally:
+                source.close()
+            # The file name only tells owlready2 that the quadstore exists
+            world = World(filename=world_path, connection=connection)
+        else:
+            world = World()
+
+        # The classes of the base ontology are copied in the new world, or
+        # updated in a world saved by a previous version
+        if baseOnto.base_iri not in world.ontologies or \
+                world[ingestedSource.iri] is None:
+            serialized = io.BytesIO()
+            baseOnto.save(file=serialized, format='ntriples')
+            serialized.seek(0)
+            world.get_ontology(baseOnto.base_iri).load(
+                fileobj=serialized, reload=True)
+            world.save()
+
+        return world
+
+    def onto_class(self, cls):
+        """ onto_class()
+                Returns the class of the working ontology's world with the
+                same IRI as the given BaseOntology class.
+        """
+        if self._world is default_world:
+            return cls
+        return self._world[cls.iri]
+
+    def _load_structure(self):
+        # Only a persistent world may already hold the home structure
+        if self._world is default_world:
+            return False
+
+        self._locations = {
+            loc.label[0]: loc
+            for loc in self.onto_class(Location).instances(world=self._world)
+            if loc.namespace.ontology is self._working_ontology and loc.label
+        }
+        if not self._locations:
+            return False
+
+        self._sensors = {
+            sensor: self._working_ontology[sensor]
+            for loc in self._dataset.location_list
+            for sensor in self._dataset.get_location_sensors(loc)
+        }
+        missing = [name for name, sensor in self._sensors.items()
+                   if sensor is None]
+        if missing or set(self._locations) != set(self._dataset.location_list):
+            s = "The persistent world does not match dataset %s." % (
+                self._dataset.name,)
+            logger.error(s)
+            raise AssertionError(s)
+
+        logger.debug("Loaded %s locations and %s sensors from the persistent world.",
+                     len(self._locations), len(self._sensors))
+        return True
+
+    def _build_structure(self):
+        # Create the locations
+        self._locations = {}
+        for name in self._dataset.location_list:
+            location = self.onto_class(
+                self._dataset.location_type_mapping(name))()
+            location.label = [name]
+            self._locations[name] = location
+        logger.debug("Found locations: %s", self._dataset.location_list)
+
+        # Create a sensor dictionnary
+        self._sensors = {}
+
+        for (loc, loc_instance) in tqdm(
+                self._locations.items(), desc="Creating ontology", ascii=True):
+            # Create adjacency relationships between locations
+            try:
+                for other in self._dataset.get_location_adjacency(loc):
+                    other_instance = self._locations[other]
+                    loc_instance.is_adjacent_to.append(other_instance)
+                    other_instance.is_adjacent_to.append(loc_instance)
+            except KeyError as e:
+                logger.warning(
+                    'Cannot find other: {}. Continuing.'.format(other))
+            logger.debug(
+                "Processed location adjacencies for location %s.", loc)
+
+            # Create sensors and attach them to location
+            for sensor in self._dataset.get_location_sensors(loc):
+                # Raise an error if sensor already exist to avoid side
+                # # effects
+                if sensor not in self._sensors.keys():
+                    self._sensors[sensor] = \
+                        self.onto_class(self._dataset.sensor_name_mapping(
+                            sensor))(
+                                name=sensor, has_location=loc_instance)
+                else:
+                    s = "Sensor %s is in 2 locations..." % (sensor,)
+                    logger.error(s)
+                    raise AssertionError(s)
+            logger.debug("Processed sensor creation for location %s.", loc)
+
+        if self._world is not default_world:
+            self._world.save()
+
+    def _window_stop(self, window_size, starting_line):
+        if window_size == -1:
+            return self._file_length
+        if starting_line + window_size > self._file_length:
+            raise Warning("Trying to read %d lines, but annotated data file contains %d lines." % (
+                starting_line + window_size, self._file_length))
+        return starting_line + window_size
+
+    def _destroy_events(self, events):
+        # Records are simply garbage collected
+        if self._lightweight:
+            return
+        for i in events['sensor_events']:
+            destroy_entity(i)
+        for i in events['activity_events']:
+            destroy_entity(i)
+
+    def _create_events(self, lines, progress=False, records=None, aligned=False):
+        """ _create_events()
+                Creates the Measure and Activity individuals (or records, by
+                default in lightweight mode) of the given lines.
+                If aligned is True, the returned lists hold one element per
+                line, None for the lines without measure or activity.
+                Must be called within the working ontology.
+        """
+        if records is None:
+            records = self._lightweight
+
+        sensor_events = []
+        activity_events = []
+        measure_type = MeasureRecord if records else self.onto_class(Measure)
+
+        num_lines = len(lines)
+        num_errors = 0
+
+        if progress:
+            lines = tqdm(
+                lines,
+                desc="Retrieving data",
+                total=num_lines,
+                ascii=True,
+                unit='lines',
+                dynamic_ncols=True
+            )
+
+        for idx, line in enumerate(lines):
+            try:
+                event = self._dataset.apply_line_pattern(line)
+
+            except (KeyError, AttributeError, ValueError) as e:
+                num_errors += 1
+                logger.debug(
+                    "Get KeyError while attempting to read line %s of dataset %s. \
+                    Please check your dataset and line pattern.", idx, self._dataset.name)
+                if aligned:
+                    sensor_events.append(None)
+                    activity_events.append(None)
+                continue
+
+            # Add a new sensor measure to the sensor event list
+            try:
+                sensor_events.append(
+                    measure_type(
+                        is_measured_by=self._sensors[
+                            event['sensor']['name']],
+                        value=event['sensor']['state'],
+                        timestamp=event['timestamp']
+                    )
+                )
+
+            except KeyError as e:
+                num_errors += 1
+                logger.debug("Sensor %s is not part of the dataset registered sensors... Skipping...",
+                             event['sensor']['name'])
+                if aligned:
+                    sensor_events.append(None)
+                    activity_events.append(None)
+                continue
+
+            if event['activity'] is not None:
+                if records:
+                    activity = ActivityRecord(
+                        event['activity']['type'],
+                        event['activity']['state'],
+                        event['timestamp'])
+                else:
+                    # Instantiate a new activity
+                    activity = self.onto_class(event['activity']['type'])()
+                    # Assign the timestamp to the data property
+                    # corresponding to the event, e.g. beginsAt
+                    activity.__setattr__(
+                        event['activity']['state'].python_name, event['timestamp'])
+
+                activity_events.append(activity)
+            elif aligned:
+                activity_events.append(None)
+
+        if progress:
+            print("Ok ! Read %s lines out of %s..." %
+                  (num_lines - num_errors, num_lines))
+        else:
+            logger.debug("Read %s lines out of %s...",
+                         num_lines - num_errors, num_lines)
+
+        return sensor_events, activity_events
+
     def read_data(self, window_size=-1, starting_line=0):
+        """ read_data()
+                Returns the events of the lines [starting_line, starting_line
+                + window_size) (to the end of the file if window_size is -1)
+                as a dict:
+                {
+                    'start': starting_line,
+                    'stop': last line + 1,
+                    'sensor_events': [Measure, ...],
+                    'activity_events': [Activity, ...]
+                }
+
+                The events are kept in a cache of line segments, so that the
+                lines of a window overlapping previous ones are not parsed
+                again: only the missing lines are. The window is then cached
+                as one segment, and adjacent segments are merged. The least
+                recently used
+                segments are dropped (and their individuals destroyed) when
+                the cache holds more than cache_max_lines lines besides the
+                segments of the current window. See cache_info().
+        """
+        stop = self._window_stop(window_size, starting_line)
         logger.debug(
             "Reading slice [%s, %s] from dataset %s...", starting_line,
+            stop, self._dataset.name
+        )
+
+        if self.training_slice is not None and \
+                starting_line == self.training_slice['start'] and \
+                stop == self.training_slice['stop']:
+            logger.debug("Returning the stored events slice.")
+            self._cache_hits += stop - starting_line
+            return self.training_slice
+
+        with self._working_ontology:
+            # Cached segments and parsed missing lines covering the window
+            pieces = []
+            position = starting_line
+            for segment in sorted(self._segments.values(), key=lambda s: s['start']):
+                if segment['stop'] <= position or segment['start'] >= stop:
+                    continue
+                if segment['start'] > position:
+                    pieces.append(self._parse_segment(position, segment['start']))
+                end = min(stop, segment['stop'])
+                self._cache_hits += end - max(position, segment['start'])
+                pieces.append(segment)
+                position = end
+
+            if position < stop:
+                pieces.append(self._parse_segment(position, stop))
+
+            window = self._coalesce(pieces, starting_line, stop)
+            self._evict(protected={starting_line})
+
+        self.training_slice = {
+            'start': starting_line,
+            'stop': stop,
+            'sensor_events': [e for e in window['sensor_events'] if e is not None],
+            'activity_events': [e for e in window['activity_events'] if e is not None]
+        }
+
+        return self.training_slice
+
+    def _parse_segment(self, start, stop):
+        # Only the lines of the segment are read, using the line index
+        lines = self._line_index.read_lines(start, stop)
+        sensor_events, activity_events = self._create_events(
+            lines, aligned=True)
+        self._cache_misses += stop - start
+        return {
+            'start': start,
+            'stop': stop,
+            'sensor_events': sensor_events,
+            'activity_events': activity_events
+        }
+
+    @staticmethod
+    def _slice_segment(segment, start, stop):
+        offset = segment['start']
+        return {
+            'start': start,
+            'stop': stop,
+            'sensor_events': segment['sensor_events'][start - offset:stop - offset],
+            'activity_events': segment['activity_events'][start - offset:stop - offset]
+        }
+
+    def _coalesce(self, pieces, start, stop):
+        """ _coalesce()
+                Replaces the contiguous segments covering the window [start,
+                stop) by a single most recently used segment of the window.
+                The lines of the pieces outside the window are kept in
+                segments merged with the adjacent cached ones, so that
+                sliding windows do not fragment the cache.
+        """
+        window = {'start': start, 'stop': stop,
+                  'sensor_events': [], 'activity_events': []}
+        for segment in pieces:
+            if self._segments.get(segment['start']) is segment:
+                del self._segments[segment['start']]
+            if segment['start'] < start:
+                self._insert_segment(
+                    self._slice_segment(segment, segment['start'], start))
+            if segment['stop'] > stop:
+                self._insert_segment(
+                    self._slice_segment(segment, stop, segment['stop']))
+            inside = self._slice_segment(
+                segment, max(start, segment['start']), min(stop, segment['stop']))
+            window['sensor_events'].extend(inside['sensor_events'])
+            window['activity_events'].extend(inside['activity_events'])
+
+        self._segments[start] = window
+        return window
+
+    def _insert_segment(self, segment):
+        # Merges the segment with the cached segments ending at its start or
+        # starting at its end
+        for other in list(self._segments.values()):
+            if other['stop'] == segment['start']:
+                first, second = other, segment
+            elif other['start'] == segment['stop']:
+                first, second = segment, other
+            else:
+                continue
+            del self._segments[other['start']]
+            segment = {
+                'start': first['start'],
+                'stop': second['stop'],
+                'sensor_events': first['sensor_events'] + second['sensor_events'],
+                'activity_events': first['activity_events'] + second['activity_events']
+            }
+        self._segments[segment['start']] = segment
+
+    def _evict(self, protected=()):
+        # The segments of the current window do not count against the budget
+        cached_lines = sum(s['stop'] - s['start']
+                           for start, s in self._segments.items()
+                           if start not in protected)
+        # Segments are ordered from the least to the most recently used
+        for start in list(self._segments.keys()):
+            if cached_lines <= self._cache_max_lines:
+                break
+            if start in protected:
+                continue
+            segment = self._segments.pop(start)
+            cached_lines -= segment['stop'] - segment['start']
+            self._destroy_events({
+                'sensor_events': [e for e in segment['sensor_events'] if e is not None],
+                'activity_events': [e for e in segment['activity_events'] if e is not None]
+            })
+            logger.debug("Evicted cached lines [%s, %s).",
+                         segment['start'], segment['stop'])
+
+    def cache_info(self):
+        """ cache_info()
+                Returns the statistics of the read_data() cache: the number
+                of lines served from the cache (hits) and parsed (misses), and
+                the number of cached segments and lines.
+        """
+        return {
+            'hits': self._cache_hits,
+            'misses': self._cache_misses,
+            'segments': len(self._segments),
+            'lines': sum(s['stop'] - s['start'] for s in self._segments.values()),
+            'max_lines': self._cache_max_lines
+        }
+
+    def clear_cache(self):
+        """ clear_cache()
+                Drops every cached segment, destroying their individuals.
+        """
+        with self._working_ontology:
+            self._cache_max_lines, max_lines = 0, self._cache_max_lines
+            self._evict()
+            self._cache_max_lines = max_lines
+        self.training_slice = None
+
+    def iter_events(self, batch_size=1000, window_size=-1, starting_line=0, destroy=True):
+        """ iter_events()
+                Lazily reads the window [starting_line, starting_line +
+                window_size) of the dataset (the whole remaining file if
+                window_size is -1) in batches of batch_size lines.
+
+                Yields dicts with the same structure as read_data(). Only
+                the lines of the current batch are held in memory and, if
+                destroy is True, the individuals of a batch are destroyed
+                when the next one is requested.
+
+                Example:
+
+                for batch in ontology.iter_events(batch_size=10000):
+                    X = graph.events_to_nodes_features(batch)
+        """
+        stop = self._window_stop(window_size, starting_line)
+        logger.debug(
+            "Iterating over lines [%s, %s) of dataset %s by batches of %s lines...",
+            starting_line, stop, self._dataset.name, batch_size)
+
+        for batch_start in range(starting_line, stop, batch_size):
+            batch_stop = min(batch_start + batch_size, stop)
+            lines = self._line_index.read_lines(batch_start, batch_stop)
+
+            with self._working_ontology:
+                sensor_events, activity_events = self._create_events(lines)
+
+            batch = {
+                'start': batch_start,
+                'stop': batch_stop,
+                'sensor_events': sensor_events,
+                'activity_events': activity_events
+            }
+            yield batch
+
+            if destroy:
+                with self._working_ontology:
+                    self._destroy_events(batch)
+
+    def read_columns(self, window_size=-1, starting_line=0, processes=1):
+        """ read_columns()
+                Reads the same window as read_data(), but returns the events
+                as a dict of numpy columns (see DatasetObject.apply_lines_pattern)
+                instead of ontology individuals.
+
+                With processes > 1 (or None for one process per core), the
+                window is parsed in parallel (see ParallelParser.parse_parallel).
+        """
+        logger.debug(
+            "Reading columns [%s, %s] from dataset %s...", starting_line,
             window_size if window_size != -1 else self._file_length,
             self._dataset.name
         )
+        stop = self._window_stop(window_size, starting_line)
+        if processes != 1:
+            return parse_parallel(self._dataset, starting_line, stop,
+                                  processes=processes, line_index=self._line_index)
+
+        lines = self._line_index.read_lines(starting_line, stop)
+        return self._dataset.apply_lines_pattern(lines)
+
+    def materialize(self, events):
+        """ materialize()
+                Takes a slice returned by read_data() or iter_events().
+                Returns a copy of the slice where the event records are
+                replaced by individuals of the working ontology. Individuals
+                already in the slice are kept as they are.
+        """
+        def individual(event):
+            if isinstance(event, MeasureRecord):
+                return event.materialize(self.onto_class(Measure))
+            if isinstance(event, ActivityRecord):
+                return event.materialize(self.onto_class(event.type))
+            return event
 
         with self._working_ontology:
-            if self.training_slice is not None:
-                # TODO: What if window size == -1. Improve the mechanism
-                if starting_line == self.training_slice['start'] and starting_line + window_size == self.training_slice['stop']:
-                    logger.debug("Returning the stored events slice.")
-                    return self.training_slice
+            materialized = dict(events)
+            materialized['sensor_events'] = [
+                individual(e) for e in events['sensor_events']]
+            materialized['activity_events'] = [
+                individual(e) for e in events['activity_events']]
+
+        return materialized
+
+    def follow(self, poll_interval=0.1, from_start=False):
+        """ follow()
+                Returns a LogFollower of the data file of the dataset. Its
+                subscribers receive, for each poll, a dict with the
+                'sensor_events' and 'activity_events' records of the lines
+                appended to the file since the previous poll. Subscribers
+                needing individuals call materialize() on it.
+
+                After each poll, the line index is updated, so that
+                read_data(), read_columns() and ingest() see the new lines.
+
+                Example:
+
+                follower = ontology.follow()
+                follower.subscribe(lambda events: print(events['sensor_events']))
+                follower.start()
+        """
+        def parse_lines(lines):
+            # Records only: owlready2 individuals must not be created from
+            # the follower's thread, and nothing would destroy them
+            sensor_events, activity_events = self._create_events(
+                lines, records=True)
+            self._file_length = self._line_index.refresh()
+            return {
+                'sensor_events': sensor_events,
+                'activity_events': activity_events
+            }
 
-                else:
-                    for i in self.training_slice['sensor_events']:
-                        destroy_entity(i)
-                    for i in self.training_slice['activity_events']:
-                        destroy_entity(i)
-            else:
-                self.training_slice = {}
-
-            sensor_events = []
-            activity_events = []
-
-            with open(self._dataset.filepath, 'r') as file:
-                if window_size == -1:
-                    lines = file.readlines()[starting_line:]
-                elif starting_line + window_size > self._file_length:
-                    lines = file.readlines()[starting_line:]
-                    raise Warning("Trying to read %d lines, but annotated data file contains %d lines." % (
-                        starting_line + window_size, self._file_length))
-                else:
-                    lines = file.readlines()[
-                        starting_line:starting_line + window_size]
-
-                num_lines = len(lines)
-                num_errors = 0
-
-                for idx, line in tqdm(
-                    enumerate(lines),
-                    desc="Retrieving data",
-                    total=num_lines,
-                    ascii=True,
-                    unit='lines',
-                    dynamic_ncols=True
-                ):
-                    try:
-                        event = self._dataset.apply_line_pattern(line)
-
-                    except (KeyError, AttributeError) as e:
-                        num_errors += 1
-                        logger.debug(
-                            "Get KeyError while attempting to read line %s of dataset %s. \
-                            Please check your dataset and line pattern.", idx, self._dataset.name)
-                        continue
-
-                    # Add a new sensor measure to the sensor event list
-                    try:
-                        sensor_events.append(
-                            Measure(
-                                is_measured_by=self._sensors[
-                                    event['sensor']['name']],
-                                value=event['sensor']['state'],
-                                timestamp=event['timestamp']
-                            )
-                        )
-
-                    except KeyError as e:
-                        num_errors += 1
-                        logger.debug("Sensor %s is not part of the dataset registered sensors... Skipping...",
-                                     event['sensor']['name'])
-                        continue
-
-                    if event['activity'] is not None:
-                        # Instantiate a new activity
-                        activity = event['activity']['type']()
-                        # Assign the timestamp to the data property
-                        # corresponding to the event, e.g. beginsAt
-                        activity.__setattr__(
-                            event['activity']['state'].python_name, event['timestamp'])
-
-                        activity_events.append(activity)
-                print("Ok ! Read %s lines out of %s..." %
-                      (num_lines - num_errors, num_lines))
-
-        self.training_slice['start'] = starting_line
-        self.training_slice['stop'] = starting_line + window_size
-        self.training_slice['sensor_events'] = sensor_events
-        self.training_slice['activity_events'] = activity_events
+        return LogFollower(self._dataset, parse_lines,
+                           poll_interval=poll_interval, from_start=from_start)
+
+    def _new_iris(self, prefix, count):
+        # Reserves count IRIs numbered like the ones owlready2 gives to new
+        # individuals, e.g. 'measure12'
+        graph = self._working_ontology.graph
+        first = graph._new_numbered_iri(prefix)
+        number = int(first[len(prefix):])
+        graph.execute("UPDATE last_numbered_iri SET i=? WHERE prefix=?",
+                      (number + count - 1, prefix))
+        return ['%s%d' % (prefix, i) for i in range(number, number + count)]
+
+    def _store_events(self, sensor_events, activity_events):
+        """ _store_events()
+                Writes the triples of the individuals of event records to
+                the quadstore of the persistent world, as creating the
+                individuals would, with one executemany() per table.
+                Must be called within the working ontology.
+        """
+        graph = self._working_ontology.graph
+        base_iri = self._working_ontology.base_iri
+        to_rdf = self._world._to_rdf
+
+        measure = self.onto_class(Measure).storid
+        is_measured_by = self.onto_class(isMeasuredBy).storid
+        has_value = self.onto_class(hasValue).storid
+        has_timestamp = self.onto_class(hasTimeStamp).storid
+
+        iris = self._new_iris(base_iri + 'measure', len(sensor_events))
+        activities = {}
+        for event in activity_events:
+            activities.setdefault(event.type, []).append(event)
+        for cls, events in activities.items():
+            iris.extend(self._new_iris(
+                base_iri + cls.name.lower(), len(events)))
+        activity_events = [e for events in activities.values() for e in events]
+
+        # Storids are allocated like owlready2 does when importing a file
+        current = graph.execute(
+            "SELECT current_resource FROM store").fetchone()[0]
+        storids = range(current + 1, current + 1 + len(iris))
+        graph.execute("UPDATE store SET current_resource=?",
+                      (current + len(iris),))
+
+        objs = []
+        datas = []
+        for s, event in zip(storids, sensor_events):
+            objs.append((s, rdf_type, owl_named_individual))
+            objs.append((s, rdf_type, measure))
+            objs.append((s, is_measured_by, event.is_measured_by.storid))
+            datas.append((s, has_value) + to_rdf(event.value))
+            datas.append((s, has_timestamp) + to_rdf(event.timestamp))
+
+        classes = {}
+        for s, event in zip(storids[len(sensor_events):], activity_events):
+            try:
+                cls, state = classes[event.type, event.state]
+            except KeyError:
+                cls, state = classes[event.type, event.state] = (
+                    self.onto_class(event.type).storid,
+                    self.onto_class(event.state).storid)
+            objs.append((s, rdf_type, owl_named_individual))
+            objs.append((s, rdf_type, cls))
+            datas.append((s, state) + to_rdf(event.timestamp))
+
+        c = graph.c
+        graph.db.executemany("INSERT INTO resources VALUES (?,?)",
+                             zip(storids, iris))
+        graph.db.executemany("INSERT OR IGNORE INTO objs VALUES (%d,?,?,?)" % c,
+                             objs)
+        graph.db.executemany("INSERT OR IGNORE INTO datas VALUES (%d,?,?,?,?)" % c,
+                             datas)
+
+    def _source_signature(self, stop, lines):
+        # Byte offset of the end of the ingested lines and hash of the last
+        # ones
+        lines = lines[-INGEST_SIGNATURE_LINES:]
+        sha1 = hashlib.sha1(''.join(lines).encode()).hexdigest()
+        return "%d:%d:%s" % (self._line_index.offset(stop), len(lines), sha1)
+
+    def _check_source(self, start):
+        signature = self._working_ontology.metadata.ingested_source
+        if not start or not signature:
+            return
+        offset, count, _ = signature[0].split(':')
+        matches = start <= self._file_length and \
+            self._line_index.offset(start) == int(offset)
+        if matches:
+            lines = self._line_index.read_lines(start - int(count), start)
+            matches = self._source_signature(start, lines) == signature[0]
+        if not matches:
+            s = "The data file of dataset %s was truncated or replaced since \
+                it was ingested in the persistent world." % (self._dataset.name,)
+            logger.error(s)
+            raise AssertionError(s)
+
+    def ingest(self, batch_size=100000):
+        """ ingest()
+                Stores the individuals of the events of the data file in the
+                persistent world, by batches of batch_size lines committed in
+                one transaction each. The triples of the individuals are
+                written to the quadstore in bulk (see _store_events()).
+                Lines already ingested in a previous run are skipped, so only
+                the lines appended since are added. Raises an AssertionError
+                if the lines already ingested have changed in the data file.
+                Returns the number of lines ingested by this call.
+        """
+        if self._world is default_world:
+            s = "ingest() requires a persistent world (see world_path)."
+            logger.error(s)
+            raise AttributeError(s)
 
-        return self.training_slice
+        start = self.ingested_lines
+        self._check_source(start)
+        for batch_start in tqdm(
+                range(start, self._file_length, batch_size),
+                desc="Ingesting data", ascii=True, unit='batches'):
+            batch_stop = min(batch_start + batch_size, self._file_length)
+            lines = self._line_index.read_lines(batch_start, batch_stop)
+
+            with self._working_ontology:
+                self._store_events(*self._create_events(lines, records=True))
+                self._working_ontology.metadata.ingested_lines = [batch_stop]
+                self._working_ontology.metadata.ingested_source = [
+                    self._source_signature(batch_stop, lines)]
+            self._world.save()
+
+        logger.debug("Ingested lines [%s, %s) of dataset %s.",
+                     start, self._file_length, self._dataset.name)
+        return self._file_length - start
+
+    def query(self, sparql, *params):
+        """ query()
+                Runs a SPARQL query on the world of the working ontology and
+                returns the list of result rows.
+
+                Example:
+
+                ontology.query('SELECT (COUNT(?m) AS ?c) WHERE { ?m a ?? }',
+                               ontology.onto_class(Measure))
+        """
+        return list(self._world.sparql(sparql, list(params)))
+
+    def save(self):
+        """ save()
+                Commits the persistent world to its file.
+        """
+        if self._world is not default_world:
+            self._world.save()
+
+    def close(self):
+        """ close()
+                Releases the data file kept open by the line index (for
+                compressed data files), and saves and closes the persistent
+                world, if any. The ontology cannot be used afterwards.
+        """
+        self._line_index.close()
+        if self._world is not default_world and not self._closed:
+            self.save()
+            self._world.close()
+            self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type=None, exc_val=None, exc_tb=None):
+        self.close()
+
+    @property
+    def ingested_lines(self):
+        ingested = self._working_ontology.metadata.ingested_lines
+        return int(ingested[0]) if ingested else 0
+
+    @property
+    def world(self):
+        return self._world
+
+    @property
+    def lightweight(self):
+        return self._lightweight
+
+    @property
+    def dataset(self):
+        return self._dataset
 
     @property
     def sensors(self):
@@ -0,0 +1,211 @@
+import io
+import os
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+from .Sources import open_source, source_stat, sidecar_path, is_compressed
+
+INDEX_SUFFIX = '.idx.npz'
+READ_CHUNK_SIZE = 1 << 24
+
+
+def read_lines_from(f, begin, end):
+    """ read_lines_from()
+            Returns the lines contained in the bytes [begin, end) of an open
+            binary file, as readlines() would. begin and end must be line
+            boundaries.
+    """
+    f.seek(begin)
+    data = f.read(end - begin)
+    return io.TextIOWrapper(io.BytesIO(data)).readlines()
+
+
+def read_byte_range(filepath, begin, end):
+    """ read_byte_range()
+            Returns the lines contained in the bytes [begin, end) of a file,
+            as readlines() would. begin and end must be line boundaries.
+            Compressed files are decompressed up to end (see Sources).
+    """
+    with open_source(filepath) as f:
+        return read_lines_from(f, begin, end)
+
+
+class LineIndex(object):
+    """ LineIndex
+            Byte offsets of the lines of a text data file.
+
+            The index is built once by scanning the file for newlines and is
+            persisted next to it (see INDEX_SUFFIX). It is rebuilt whenever the
+            size or the modification time of the data file changes.
+
+            Compressed data files (see Sources.open_source) are indexed in
+            decompressed coordinates. As seeking backwards in them restarts
+            decompression, the file is kept open between reads so that
+            forward windows only decompress the data in between.
+
+            Example:
+
+            index = LineIndex('/path/to/ann.txt')
+            len(index) returns the number of lines of the file.
+            index.read_lines(10, 20) returns the lines 10 to 19.
+    """
+
+    def __init__(self, filepath, index_path=None):
+        super(LineIndex, self).__init__()
+        self._filepath = filepath
+        self._index_path = index_path if index_path is not None \
+            else sidecar_path(filepath, INDEX_SUFFIX)
+        self._compressed = is_compressed(filepath)
+        self._source = None
+
+        self._offsets = self._load()
+        if self._offsets is None:
+            self._offsets = self._build()
+            self._save()
+
+    def _stat(self):
+        st = source_stat(self._filepath)
+        return st.st_size, st.st_mtime_ns
+
+    def _load(self):
+        if not os.path.isfile(self._index_path):
+            return None
+
+        try:
+            with np.load(self._index_path) as stored:
+                size, mtime = int(stored['size']), int(stored['mtime'])
+                offsets = stored['offsets']
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(
+                "Cannot load line index '%s' (%s). Rebuilding it.",
+                self._index_path, e)
+            return None
+
+        if (size, mtime) != self._stat():
+            logger.debug(
+                "Line index '%s' is outdated. Rebuilding it.", self._index_path)
+            return None
+
+        logger.debug("Loaded line index '%s'.", self._index_path)
+        return offsets
+
+    def _scan(self, offsets, position):
+        # Appends to offsets the positions of the lines of the file from
+        # the line beginning at position
+        chunks = [offsets]
+        with open_source(self._filepath) as f:
+            f.seek(position)
+            while True:
+                chunk = f.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                newlines = np.flatnonzero(
+                    np.frombuffer(chunk, dtype=np.uint8) == ord('\n'))
+                chunks.append(newlines.astype(np.int64) + position + 1)
+                position += len(chunk)
+
+        offsets = np.concatenate(chunks)
+        # Like readlines(), count a last line without trailing newline
+        if offsets[-1] != position:
+            offsets = np.append(offsets, position)
+        return offsets, position
+
+    def _build(self):
+        logger.debug("Building line index for file '%s'...", self._filepath)
+        size, _ = self._stat()
+
+        # offsets[i] is the position of the first byte of line i, and the
+        # last element is the size of the file
+        offsets, position = self._scan(np.zeros(1, dtype=np.int64), 0)
+        if not self._compressed and position != size:
+            logger.warning(
+                "File '%s' changed while building its line index.",
+                self._filepath)
+
+        return offsets
+
+    def refresh(self):
+        """ refresh()
+                Updates the index after the file changed. When lines were
+                appended to an uncompressed file, only the new bytes are
+                scanned; otherwise the index is rebuilt. Returns the number
+                of lines.
+        """
+        size, _ = self._stat()
+        end = int(self._offsets[-1])
+        if self._compressed or size < end:
+            self.close()
+            self._offsets = self._build()
+        elif size > end:
+            offsets = self._offsets
+            # A last line without trailing newline is scanned again, as it
+            # may have been completed
+            with open(self._filepath, 'rb') as f:
+                f.seek(max(0, end - 1))
+                if end > 0 and f.read(1) != b'\n':
+                    offsets = offsets[:-1]
+            self._offsets, _ = self._scan(offsets, int(offsets[-1]))
+        self._save()
+        return len(self)
+
+    def _save(self):
+        size, mtime = self._stat()
+        tmp_path = self._index_path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, offsets=self._offsets, size=size, mtime=mtime)
+            os.replace(tmp_path, self._index_path)
+            logger.debug("Saved line index '%s'.", self._index_path)
+        except OSError as e:
+            logger.warning(
+                "Cannot save line index '%s' (%s). Keeping it in memory only.",
+                self._index_path, e)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def offset(self, line):
+        """ offset()
+                Returns the byte offset of the beginning of the given line.
+                offset(len(index)) returns the size of the file.
+        """
+        return int(self._offsets[line])
+
+    def read_lines(self, start=0, stop=None):
+        """ read_lines()
+                Returns the lines [start, stop) of the file as a list of
+                strings, as readlines() would, reading only those lines.
+        """
+        nlines = len(self)
+        stop = nlines if stop is None else min(stop, nlines)
+        start = min(start, stop)
+
+        begin, end = self.offset(start), self.offset(stop)
+        if not self._compressed:
+            return read_byte_range(self._filepath, begin, end)
+
+        if self._source is None or self._source.tell() > begin:
+            self.close()
+            self._source = open_source(self._filepath)
+        return read_lines_from(self._source, begin, end)
+
+    def close(self):
+        """ close()
+                Closes the compressed data file kept open between reads.
+        """
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+
+    def __del__(self):
+        self.close()
+
+    @property
+    def filepath(self):
+        return self._filepath
+
+    @property
+    def offsets(self):
+        return self._offsets
@@ -0,0 +1,196 @@
+import io
+import os
+import threading
+
+import logging
+logger = logging.getLogger(__name__)
+
+from .DatasetObject import DatasetObject
+
+READ_CHUNK_SIZE = 1 << 20
+
+
+class LogFollower(object):
+    """ LogFollower
+            Follows the data file of a dataset while it grows, like tail -F.
+
+            Only complete lines appended to the file are parsed; a partial
+            last line is kept until its newline is written. If the file is
+            truncated, it is read again from its beginning. If it is rotated
+            (the path now refers to a new file), the rest of the old file is
+            read before switching to the new one.
+
+            Each call to poll() parses the new lines with parse_lines (by
+            default, dataset.apply_line_pattern on every line, skipping the
+            lines that cannot be parsed) and pushes the result to every
+            subscriber. start() polls in a background thread.
+
+            Example:
+
+            follower = LogFollower(HHDataset('hh101'))
+            follower.subscribe(lambda events: print(len(events)))
+            follower.start()
+    """
+
+    def __init__(self, dataset, parse_lines=None, poll_interval=0.1, from_start=False):
+        super(LogFollower, self).__init__()
+        if not isinstance(dataset, DatasetObject):
+            s = "The LogFollower must be built from a DatasetObject. \
+                Wrong type for 'dataset': %s" % (type(dataset),)
+            logger.error(s)
+            raise AttributeError(s)
+
+        self._dataset = dataset
+        self._filepath = dataset.filepath
+        self._parse_lines = parse_lines if parse_lines is not None \
+            else self._apply_line_pattern
+        self._poll_interval = poll_interval
+
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+
+        self._file = None
+        self._partial = b''
+        self._open(from_start)
+
+    def _apply_line_pattern(self, lines):
+        events = []
+        for line in lines:
+            try:
+                events.append(self._dataset.apply_line_pattern(line))
+            except (KeyError, AttributeError, ValueError):
+                logger.debug("Cannot parse followed line '%s'. Skipping...",
+                             line.rstrip())
+        return events
+
+    def _open(self, from_start=True):
+        try:
+            self._file = open(self._filepath, 'rb')
+        except OSError as e:
+            logger.debug("Cannot open followed file '%s' (%s).",
+                         self._filepath, e)
+            self._file = None
+            return
+        if not from_start:
+            self._file.seek(0, os.SEEK_END)
+        self._partial = b''
+        logger.debug("Following file '%s' from position %s.",
+                     self._filepath, self._file.tell())
+
+    def _rotated(self):
+        try:
+            st = os.stat(self._filepath)
+        except OSError:
+            # The file may be briefly missing during a rotation
+            return False
+        fst = os.fstat(self._file.fileno())
+        return (st.st_ino, st.st_dev) != (fst.st_ino, fst.st_dev)
+
+    def _read_complete_lines(self):
+        if os.fstat(self._file.fileno()).st_size < self._file.tell():
+            logger.debug("Followed file '%s' was truncated.", self._filepath)
+            self._file.seek(0)
+            self._partial = b''
+
+        data = self._partial + b''.join(
+            iter(lambda: self._file.read(READ_CHUNK_SIZE), b''))
+        end = data.rfind(b'\n') + 1
+        self._partial = data[end:]
+        return io.TextIOWrapper(io.BytesIO(data[:end])).readlines()
+
+    def read_new_lines(self):
+        """ read_new_lines()
+                Returns the complete lines appended to the file since the
+                last call.
+        """
+        with self._lock:
+            if self._file is None:
+                self._open(from_start=True)
+                if self._file is None:
+                    return []
+
+            lines = self._read_complete_lines()
+
+            if self._rotated():
+                logger.debug("Followed file '%s' was rotated.", self._filepath)
+                # The remaining partial line of the old file is complete
+                if self._partial:
+                    lines += io.TextIOWrapper(
+                        io.BytesIO(self._partial)).readlines()
+                self._file.close()
+                self._open(from_start=True)
+                if self._file is not None:
+                    lines += self._read_complete_lines()
+
+            return lines
+
+    def poll(self):
+        """ poll()
+                Parses the new complete lines of the file and pushes the
+                result to the subscribers. Returns the parsed result, or None
+                if no line was appended.
+        """
+        lines = self.read_new_lines()
+        if not lines:
+            return None
+
+        parsed = self._parse_lines(lines)
+        for callback in list(self._subscribers):
+            try:
+                callback(parsed)
+            except Exception as e:
+                logger.error("Subscriber %s failed: %s", callback, e)
+        return parsed
+
+    def subscribe(self, callback):
+        """ subscribe()
+                Registers a callable receiving the parsed new lines.
+        """
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self._subscribers.remove(callback)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.poll()
+            self._stop_event.wait(self._poll_interval)
+
+    def start(self):
+        """ start()
+                Polls the file every poll_interval seconds in a daemon thread.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """ stop()
+                Stops the polling thread. poll() can still be called, and
+                start() resumes from the current position.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        """ close()
+                Stops the polling thread and closes the file.
+        """
+        self.stop()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type=None, exc_val=None, exc_tb=None):
+        self.close()
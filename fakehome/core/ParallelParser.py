@@ -0,0 +1,91 @@
+import multiprocessing
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+from .DatasetObject import DatasetObject
+from .EventColumns import concatenate_columns
+from .LineIndex import LineIndex, read_byte_range, read_lines_from
+from .Sources import open_source, is_compressed
+
+# Number of chunks given to each worker process. More chunks than workers
+# balances the load when some parts of the file are slower to parse.
+CHUNKS_PER_PROCESS = 4
+MIN_CHUNK_LINES = 10000
+
+
+# Dataset of the worker processes, sent once by the pool initializer
+_worker_dataset = None
+
+
+def _init_worker(dataset):
+    global _worker_dataset
+    _worker_dataset = dataset
+
+
+def _parse_chunk(chunk):
+    begin, end = chunk
+    return _worker_dataset.apply_lines_pattern(
+        read_byte_range(_worker_dataset.filepath, begin, end))
+
+
+def parse_parallel(dataset, start=0, stop=None, processes=None, line_index=None):
+    """ parse_parallel()
+            Parses the lines [start, stop) of the data file of a dataset in a
+            pool of worker processes.
+
+            The lines are split at line boundaries into chunks, each chunk is
+            parsed with dataset.apply_lines_pattern() and the resulting event
+            columns are merged in file order, so the result is the same as
+            parsing the lines serially.
+
+            Compressed data files are parsed serially, in a single pass:
+            each worker would have to decompress the file from its start.
+
+            Example:
+
+            columns = parse_parallel(HHDataset('hh101'), processes=8)
+    """
+    if not isinstance(dataset, DatasetObject):
+        s = "parse_parallel() requires a DatasetObject. \
+            Wrong type for 'dataset': %s" % (type(dataset),)
+        logger.error(s)
+        raise AttributeError(s)
+
+    if line_index is None:
+        line_index = LineIndex(dataset.filepath)
+    stop = len(line_index) if stop is None else min(stop, len(line_index))
+    start = min(start, stop)
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    nchunks = max(1, min(processes * CHUNKS_PER_PROCESS,
+                         (stop - start) // MIN_CHUNK_LINES))
+    boundaries = np.linspace(start, stop, nchunks + 1).astype(np.int64)
+    chunks = [(line_index.offset(b), line_index.offset(e))
+              for b, e in zip(boundaries[:-1], boundaries[1:])]
+
+    logger.debug("Parsing lines [%s, %s) of dataset %s in %s chunks with %s processes...",
+                 start, stop, dataset.name, nchunks, processes)
+
+    if is_compressed(dataset.filepath):
+        if processes != 1:
+            logger.debug("Dataset %s is compressed: parsing it serially.",
+                         dataset.name)
+        with open_source(dataset.filepath) as f:
+            # Chunks are contiguous: the file is decompressed once
+            return concatenate_columns(
+                dataset.apply_lines_pattern(read_lines_from(f, begin, end))
+                for begin, end in chunks)
+
+    if processes == 1 or nchunks == 1:
+        return concatenate_columns(
+            dataset.apply_lines_pattern(
+                read_byte_range(dataset.filepath, begin, end))
+            for begin, end in chunks)
+
+    with multiprocessing.Pool(processes, _init_worker, (dataset,)) as pool:
+        # imap() keeps the order of the chunks
+        return concatenate_columns(pool.imap(_parse_chunk, chunks))
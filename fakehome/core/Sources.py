@@ -0,0 +1,127 @@
+import os
+import bz2
+import gzip
+import lzma
+import zipfile
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Data files can be read from compressed files, with streaming decompression.
+# A member of a zip archive is designated by the path of the archive followed
+# by the path of the member, e.g. /data/hh101.zip/hh101/ann.txt
+COMPRESSED_OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+}
+ZIP_EXTENSION = '.zip'
+
+
+def split_zip_path(path):
+    """ split_zip_path()
+            Returns (archive path, member path) if path designates a member
+            of an existing zip archive, None otherwise.
+    """
+    parts = path.split(os.sep)
+    for i in range(len(parts) - 1, 0, -1):
+        archive = os.sep.join(parts[:i])
+        if archive.endswith(ZIP_EXTENSION) and os.path.isfile(archive):
+            return archive, '/'.join(parts[i:])
+    return None
+
+
+def source_file(path):
+    """ source_file()
+            Returns the path of the file on disk holding the data of path:
+            the archive for a zip member, path itself otherwise.
+    """
+    zip_path = split_zip_path(path)
+    return zip_path[0] if zip_path else path
+
+
+def source_stat(path):
+    """ source_stat()
+            Returns os.stat() of the file on disk holding the data of path.
+    """
+    return os.stat(source_file(path))
+
+
+def is_compressed(path):
+    return split_zip_path(path) is not None or \
+        os.path.splitext(path)[1] in COMPRESSED_OPENERS
+
+
+def open_source(path):
+    """ open_source()
+            Opens a data file for binary reading, decompressing it on the fly
+            according to its extension (.gz, .bz2, .xz) or to the zip archive
+            it belongs to. The returned file object is seekable, although
+            seeking backwards in a compressed file restarts decompression.
+    """
+    zip_path = split_zip_path(path)
+    if zip_path is not None:
+        archive, member = zip_path
+        zf = zipfile.ZipFile(archive)
+        try:
+            f = zf.open(member)
+        except KeyError:
+            zf.close()
+            raise FileNotFoundError(
+                "Cannot find '%s' in archive '%s'." % (member, archive))
+        # The archive is closed with the member
+        close = f.close
+
+        def close_all():
+            close()
+            zf.close()
+        f.close = close_all
+        return f
+
+    opener = COMPRESSED_OPENERS.get(os.path.splitext(path)[1], open)
+    return opener(path, 'rb')
+
+
+def sidecar_path(path, suffix):
+    """ sidecar_path()
+            Returns the path of a file stored next to the data of path, e.g.
+            an index or a cache. For a zip member, it is stored next to the
+            archive, e.g. /data/hh101.zip.hh101.ann.txt<suffix>.
+    """
+    zip_path = split_zip_path(path)
+    if zip_path is not None:
+        archive, member = zip_path
+        return archive + '.' + member.replace('/', '.') + suffix
+    return path + suffix
+
+
+def resolve_source(path):
+    """ resolve_source()
+            Returns path if it exists. Otherwise, looks for a compressed
+            version of it: path.gz, path.bz2, path.xz or a member of a zip
+            archive named after one of its parent directories, e.g.
+            /data/hh101.zip/hh101/ann.txt for /data/hh101/hh101/ann.txt.
+            Returns path if nothing is found.
+    """
+    if os.path.exists(path):
+        return path
+
+    for extension in COMPRESSED_OPENERS:
+        if os.path.isfile(path + extension):
+            return path + extension
+
+    parts = path.split(os.sep)
+    for i in range(len(parts) - 1, 0, -1):
+        archive = os.sep.join(parts[:i]) + ZIP_EXTENSION
+        if not os.path.isfile(archive):
+            continue
+        member = '/'.join(parts[i:])
+        with zipfile.ZipFile(archive) as zf:
+            names = zf.namelist()
+        # The archive may or may not contain its own directory
+        candidates = [n for n in names
+                      if n == member or n.endswith('/' + member)]
+        if candidates:
+            return os.path.join(archive, *min(candidates, key=len).split('/'))
+
+    return path
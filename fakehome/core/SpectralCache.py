@@ -0,0 +1,195 @@
+import os
+import hashlib
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+
+import logging
+logger = logging.getLogger(__name__)
+
+SPECTRAL_FORMAT_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser('~'), '.cache', 'fakehome', 'spectral')
+
+
+def topology_hash(adjacency):
+    """ topology_hash()
+            Returns the sha1 hex digest of a (dense or sparse) adjacency
+            matrix.
+    """
+    A = sp.csr_matrix(adjacency, dtype=np.float64)
+    A.sort_indices()
+    h = hashlib.sha1()
+    h.update(("v%d-%d-%d" % ((SPECTRAL_FORMAT_VERSION,) + A.shape)).encode())
+    for array in (A.indptr, A.indices, A.data):
+        h.update(np.ascontiguousarray(array).tobytes())
+    return h.hexdigest()
+
+
+class SpectralCache(object):
+    """ SpectralCache
+            Spectral operators of a graph, computed lazily from its
+            normalized laplacian L and symmetrically normalized adjacency A:
+            truncated eigenpairs of L, scaled laplacian 2 L / lmax - I, and
+            Chebyshev (T_k of the scaled laplacian) and power (A^k) bases.
+
+            Each operator is computed once. If cache_dir is given, operators
+            are also saved to (and loaded from) a directory keyed by the
+            topology hash of the adjacency matrix, e.g. DEFAULT_CACHE_DIR.
+
+            Example:
+
+            spectral = graph.spectral_cache(cache_dir=DEFAULT_CACHE_DIR)
+            T = spectral.chebyshev_basis(3)
+    """
+
+    def __init__(self, adjacency, laplacian, symnorm_adjacency, cache_dir=None):
+        super(SpectralCache, self).__init__()
+        # Operators are computed in float64 whatever the dtype of the graph
+        self._laplacian = sp.csr_matrix(laplacian, dtype=np.float64)
+        self._symnorm_adjacency = sp.csr_matrix(
+            symnorm_adjacency, dtype=np.float64)
+        self._N = self._laplacian.shape[0]
+        self._key = topology_hash(adjacency)
+        self._cache_dir = os.path.join(cache_dir, self._key) \
+            if cache_dir is not None else None
+        self._operators = {}
+
+    def _path(self, name):
+        return os.path.join(self._cache_dir, name + '.npz')
+
+    def _get(self, name, compute):
+        try:
+            return self._operators[name]
+        except KeyError:
+            pass
+
+        operator = None
+        if self._cache_dir is not None and os.path.isfile(self._path(name)):
+            try:
+                operator = self._load(name)
+                logger.debug("Loaded spectral operator '%s' from '%s'.",
+                             name, self._cache_dir)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Cannot load spectral operator '%s' (%s).",
+                               self._path(name), e)
+
+        if operator is None:
+            operator = compute()
+            if self._cache_dir is not None:
+                self._save(name, operator)
+
+        self._operators[name] = operator
+        return operator
+
+    def _load(self, name):
+        with np.load(self._path(name), allow_pickle=False) as f:
+            if 'format' in f:
+                return sp.load_npz(self._path(name))
+            return tuple(f['arr_%d' % i] for i in range(len(f.files)))
+
+    def _save(self, name, operator):
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            tmp_path = self._path(name + '.tmp')
+            if sp.issparse(operator):
+                sp.save_npz(tmp_path, operator)
+            else:
+                np.savez(tmp_path, *operator)
+            os.replace(tmp_path, self._path(name))
+        except OSError as e:
+            logger.warning("Cannot save spectral operator '%s' (%s).",
+                           self._path(name), e)
+
+    def eigenpairs(self, k=None, which='smallest'):
+        """ eigenpairs()
+                Returns the k smallest (or 'largest') eigenvalues of the
+                laplacian, in ascending order, and the N x k matrix of their
+                eigenvectors. By default, all of them are returned.
+        """
+        if which not in ('smallest', 'largest'):
+            s = "Wrong value for 'which': %s. Must be 'smallest' or 'largest'." % (
+                which,)
+            logger.error(s)
+            raise AttributeError(s)
+        k = self._N if k is None else min(k, self._N)
+
+        def compute():
+            if k >= self._N - 1:
+                # eigsh cannot compute all the eigenpairs
+                w, v = np.linalg.eigh(self._laplacian.toarray())
+                return (w[:k], v[:, :k]) if which == 'smallest' \
+                    else (w[-k:], v[:, -k:])
+            w, v = spla.eigsh(self._laplacian, k=k,
+                              which='SA' if which == 'smallest' else 'LA')
+            order = np.argsort(w)
+            return w[order], v[:, order]
+
+        return self._get('eig_%s_%d' % (which, k), compute)
+
+    @property
+    def lmax(self):
+        """ Property: lmax
+                Returns the largest eigenvalue of the laplacian.
+        """
+        return float(self.eigenpairs(1, 'largest')[0][-1])
+
+    def scaled_laplacian(self, dense=False):
+        """ scaled_laplacian()
+                Returns 2 L / lmax - I, whose spectrum is in [-1, 1].
+        """
+        def compute():
+            return (2. / self.lmax * self._laplacian
+                    - sp.identity(self._N, format='csr')).tocsr()
+
+        operator = self._get('scaled_laplacian', compute)
+        return operator.toarray() if dense else operator
+
+    def _basis(self, prefix, K, dense, next_order):
+        basis = []
+        for k in range(K + 1):
+            basis.append(self._get('%s_%d' % (prefix, k),
+                                   lambda: next_order(basis).tocsr()))
+        return [T.toarray() for T in basis] if dense else basis
+
+    def chebyshev_basis(self, K, dense=False):
+        """ chebyshev_basis()
+                Returns the Chebyshev polynomials T_0, ..., T_K of the scaled
+                laplacian: T_0 = I, T_1 = L~, T_k = 2 L~ T_k-1 - T_k-2.
+        """
+        L = self.scaled_laplacian()
+
+        def next_order(basis):
+            if not basis:
+                return sp.identity(self._N, format='csr')
+            if len(basis) == 1:
+                return L
+            return 2 * L.dot(basis[-1]) - basis[-2]
+
+        return self._basis('chebyshev', K, dense, next_order)
+
+    def power_basis(self, K, dense=False):
+        """ power_basis()
+                Returns the powers A^0, ..., A^K of the symmetrically
+                normalized adjacency matrix.
+        """
+        def next_order(basis):
+            if not basis:
+                return sp.identity(self._N, format='csr')
+            return self._symnorm_adjacency.dot(basis[-1])
+
+        return self._basis('power', K, dense, next_order)
+
+    def clear(self):
+        """ clear()
+                Forgets the computed operators, in memory only.
+        """
+        self._operators = {}
+
+    @property
+    def key(self):
+        return self._key
+
+    @property
+    def cache_dir(self):
+        return self._cache_dir
@@ -0,0 +1,147 @@
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+from .ChangePointTensor import forward_fill
+from .Timestamps import NS_PER_SECOND
+
+# Aggregation of the values of a (node, feature) within a time bin:
+#   last: value at the end of the bin
+#   max: maximum value taken during the bin, including the value carried
+#       over from the previous bin
+#   count: number of events in the bin
+AGGREGATIONS = ('last', 'max', 'count')
+
+# Bins materialized at once by iter_binned(), and events read at once to
+# compute the state before the first bin
+DEFAULT_CHUNK_BINS = 4096
+STATE_CHUNK_EVENTS = 1 << 20
+
+
+def _last_values(state, cells, values):
+    # Sets each cell of the state to the value of its last event
+    unique_cells, last = np.unique(cells[::-1], return_index=True)
+    state.reshape(-1)[unique_cells] = values[len(cells) - 1 - last]
+
+
+class _EventSlicer(object):
+    # Reads the events [begin, end) of possibly memory-mapped columns as
+    # (cells, values), mapping sensors to nodes and nodes to features
+
+    def __init__(self, sensors, values, node_of_sensor, feature_of_node, F):
+        self._sensors = sensors
+        self._values = values
+        self._node_of_sensor = node_of_sensor
+        self._feature_of_node = feature_of_node
+        self._F = F
+
+    def __call__(self, begin, end):
+        nodes = np.asarray(self._sensors[begin:end], dtype=np.intp)
+        if self._node_of_sensor is not None:
+            nodes = self._node_of_sensor[nodes]
+        values = np.asarray(self._values[begin:end], dtype=np.float64)
+        known = nodes >= 0
+        if not known.all():
+            nodes, values = nodes[known], values[known]
+        return nodes * self._F + self._feature_of_node[nodes], values, known
+
+
+def iter_binned(timestamps, sensors, values, initial_state, bin_size,
+                feature_of_node, node_of_sensor=None, aggregation='last',
+                start=None, stop=None, chunk_bins=DEFAULT_CHUNK_BINS,
+                dtype=np.float64):
+    """ iter_binned()
+            Yields the N x F x T nodes features tensor of a sequence of
+            events sampled every bin_size seconds, in chunks of at most
+            chunk_bins time steps.
+
+            timestamps are the epoch nanoseconds of the events, in time
+            order, and sensors and values their node (or sensor index, mapped
+            to a node with node_of_sensor; unmapped sensors are -1) and value.
+            They can be memory-mapped: only the events of the current chunk
+            are read. feature_of_node is the feature index of every node.
+
+            The bins cover [start, stop) (by default, from the first to the
+            last event). initial_state is the N x F state before the first
+            event; the events before start are applied to it. The chunks have
+            the given dtype.
+    """
+    if aggregation not in AGGREGATIONS:
+        s = "Unknown aggregation '%s'. Must be one of %s." % (
+            aggregation, ', '.join(AGGREGATIONS))
+        logger.error(s)
+        raise AttributeError(s)
+
+    bin_ns = int(round(bin_size * NS_PER_SECOND))
+    if bin_ns <= 0:
+        s = "Wrong bin size: %s. Must be positive." % (bin_size,)
+        logger.error(s)
+        raise AttributeError(s)
+
+    N, F = initial_state.shape
+    num_events = len(timestamps)
+    if start is None:
+        if not num_events:
+            return
+        start = int(timestamps[0])
+    if stop is None:
+        stop = int(timestamps[-1]) + 1 if num_events else start
+    start, stop = int(start), int(stop)
+    num_bins = -(-(stop - start) // bin_ns)
+
+    events = _EventSlicer(sensors, values, node_of_sensor,
+                          np.asarray(feature_of_node, dtype=np.intp), F)
+    state = np.array(initial_state, dtype=np.float64)
+
+    # State before the first bin
+    first = int(np.searchsorted(timestamps, start, side='left'))
+    for begin in range(0, first, STATE_CHUNK_EVENTS):
+        cells, event_values, _ = events(
+            begin, min(first, begin + STATE_CHUNK_EVENTS))
+        _last_values(state, cells, event_values)
+
+    for b0 in range(0, num_bins, chunk_bins):
+        b1 = min(num_bins, b0 + chunk_bins)
+        nb = b1 - b0
+        t0 = start + b0 * bin_ns
+        begin, end = np.searchsorted(
+            timestamps, [t0, min(stop, start + b1 * bin_ns)], side='left')
+
+        cells, event_values, known = events(begin, end)
+        positions = (np.asarray(timestamps[begin:end], dtype=np.int64)[known]
+                     - t0) // bin_ns
+
+        if aggregation == 'count':
+            X = np.bincount(cells * nb + positions, minlength=N * F * nb) \
+                .reshape(N, F, nb).astype(dtype)
+            yield X
+            continue
+
+        X = np.empty((N, F, nb), dtype=dtype)
+        X[:] = state[:, :, None]
+        X_cells = X.reshape(N * F, nb)
+        forward_fill(X_cells, cells, positions, event_values)
+        previous_state = state
+        state = X[:, :, -1].copy()
+
+        if aggregation == 'max':
+            # Maximum over the value at the beginning of each bin and the
+            # values of the events of the bin
+            M = np.empty_like(X)
+            M[:, :, 0] = previous_state
+            M[:, :, 1:] = X[:, :, :-1]
+            M_cells = M.reshape(N * F, nb)
+            if len(cells):
+                keys = cells * nb + positions
+                order = np.argsort(keys, kind='stable')
+                keys = keys[order]
+                bounds = np.r_[0, np.flatnonzero(np.diff(keys)) + 1]
+                maxima = np.maximum.reduceat(event_values[order], bounds)
+                bin_cells, bin_positions = np.divmod(keys[bounds], nb)
+                M_cells[bin_cells, bin_positions] = np.maximum(
+                    M_cells[bin_cells, bin_positions], maxima)
+            X = M
+
+        yield X
+
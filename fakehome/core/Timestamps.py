@@ -0,0 +1,85 @@
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+from .BaseOntology import DATE_REPRESENTATION
+
+# Timestamps of the CASAS datasets are written as YYYY-MM-DD HH:MM:SS.ffffff.
+# They are converted to int64 nanoseconds since the epoch (UTC).
+FRACTION_START = 20
+FRACTION_DIGITS = 9
+NS_PER_SECOND = 10 ** 9
+SECONDS_PER_DAY = 86400
+
+
+def _days_from_civil(year, month, day):
+    # Days since 1970-01-01 of a proleptic Gregorian date (H. Hinnant's
+    # algorithm)
+    year = year - (month <= 2)
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+# Seconds since the epoch of the dates already seen by parse_timestamp()
+_date_seconds = {}
+
+
+def parse_timestamp(string):
+    """ parse_timestamp()
+            Converts a single 'YYYY-MM-DD HH:MM:SS.ffffff' string to epoch
+            nanoseconds, using the fixed positions of the fields.
+
+            Example:
+
+            parse_timestamp('1970-01-02 00:00:00.5') returns 86400500000000
+    """
+    date = string[0:10]
+    try:
+        seconds = _date_seconds[date]
+    except KeyError:
+        seconds = _date_seconds[date] = SECONDS_PER_DAY * _days_from_civil(
+            int(string[0:4]), int(string[5:7]), int(string[8:10]))
+
+    hhmmss = int(string[11:13] + string[14:16] + string[17:19])
+    seconds += hhmmss // 10000 * 3600 + hhmmss // 100 % 100 * 60 + hhmmss % 100
+
+    fraction = string[FRACTION_START:FRACTION_START + FRACTION_DIGITS].rstrip()
+    nanoseconds = int(fraction.ljust(FRACTION_DIGITS, '0')) if fraction else 0
+    return seconds * NS_PER_SECOND + nanoseconds
+
+
+def parse_timestamps(strings):
+    """ parse_timestamps()
+            Converts a batch of 'YYYY-MM-DD HH:MM:SS.ffffff' strings to an
+            int64 array of epoch nanoseconds.
+
+            The whole batch is handed to numpy's ISO 8601 parser, which
+            accepts the space separator of the CASAS layout and is several
+            times faster than character arithmetic on the batch.
+    """
+    return np.asarray(strings, dtype='datetime64[ns]').view(np.int64)
+
+
+def to_date_representation(string):
+    """ to_date_representation()
+            Converts a timestamp string read from a data file to
+            BaseOntology.DATE_REPRESENTATION.
+    """
+    if DATE_REPRESENTATION is str:
+        return string
+    return parse_timestamp(string)
+
+
+def as_timestamps(values):
+    """ as_timestamps()
+            Returns an int64 array of epoch nanoseconds from a sequence of
+            timestamps in any DATE_REPRESENTATION.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in ('U', 'S', 'O'):
+        return parse_timestamps(values.astype('U'))
+    return values.astype(np.int64, copy=False)
@@ -1,5 +1,16 @@
 from .BaseOntology import *
 from .DatasetObject import DatasetObject
+from .Sources import open_source, resolve_source
+from .LineIndex import LineIndex
+from .ParallelParser import parse_parallel
+from .DatasetCache import DatasetCache
+from .EventColumns import EVENT_COLUMNS, NO_ACTIVITY
+from .Timestamps import parse_timestamp, parse_timestamps
+from .EventRecords import MeasureRecord, ActivityRecord
+from .LogFollower import LogFollower
+from .ChangePointTensor import ChangePointTensor
+from .SpectralCache import SpectralCache
 from .FakeHomeOntology import FakeHomeOntology
 from .FakeHomeGraph import FakeHomeGraph
+from .FakeHomeGraphBatch import FakeHomeGraphBatch
 from .FakeHomeGraph import adjacency_from_ontology
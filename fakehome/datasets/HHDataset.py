@@ -1,7 +1,11 @@
 from ..core import DatasetObject
 from ..core.BaseOntology import *
+from ..core.EventColumns import NO_ACTIVITY, columns_from_lists
+from ..core.Timestamps import parse_timestamps, to_date_representation
+from ..core.Sources import resolve_source
 
 import json
+import hashlib
 import re
 import sys
 import os
@@ -30,17 +34,31 @@ DEFAULT_DATASET_PATH = os.path.join(os.path.dirname(
     os.path.abspath(__file__)), '..', '..', '.data')
 
 
+def load_config(config_file=DEFAULT_CONFIG_FILE):
+    """ load_config()
+            Returns the parsed json configuration of all the datasets of a
+            config file.
+    """
+    with open(config_file, 'r') as f:
+        logger.debug("Reading json config file '%s'...", config_file)
+        return json.load(f)
+
+
 class HHDataset(DatasetObject):
 
     def __init__(
-            self, dataset_name, dataset_path=DEFAULT_DATASET_PATH, config_file=DEFAULT_CONFIG_FILE):
+            self, dataset_name, dataset_path=DEFAULT_DATASET_PATH, config_file=DEFAULT_CONFIG_FILE, config=None):
 
         self.dataset_name = dataset_name
         self.dataset_path = dataset_path
+        self._resolved_filepath = None
 
-        with open(config_file, 'r') as f:
-            logger.debug("Reading json config file '%s'...", config_file)
-            self.dataset_conf = json.load(f)
+        # An already parsed configuration (e.g. shared by an HHRegistry)
+        # takes precedence over the config file
+        if config is not None:
+            self.dataset_conf = config
+        else:
+            self.dataset_conf = load_config(config_file)
 
         logger.debug(
             "Extracting dataset configuration for '%s'...", dataset_name)
@@ -66,6 +84,69 @@ class HHDataset(DatasetObject):
         for sensors in self.dataset_conf["sensors"]["locations"].values():
             self._sensor_list += sensors
 
+        self._compile_tables()
+
+    def _compile_tables(self):
+        """ _compile_tables()
+                Flattens the dataset configuration into the lookup tables
+                used when parsing lines, so that no nested config lookup or
+                str2ontoclass call happens per line:
+                    sensor type -> class
+                    sensor name -> (index in sensor_list, class)
+                    non numeric sensor state -> value
+                    activity name -> (index in activity_list, class)
+                    activity state -> (index in activity_state_list, relation)
+
+                Entries the mapping functions cannot resolve are left out, so
+                that parsing a line using them still raises the same error.
+        """
+        def compile_table(mapping, keys):
+            table = {}
+            for key in keys:
+                try:
+                    table[key] = mapping(key)
+                except (KeyError, AttributeError, ValueError):
+                    pass
+            return table
+
+        self._sensor_types = compile_table(
+            self._sensor_type_mapping, self.dataset_conf['sensors']['type'])
+        self._sensor_table = {
+            name: (i, cls) for i, (name, cls) in enumerate(
+                (name, self._sensor_types.get(self._sensor_type_of(name)))
+                for name in self._sensor_list)
+            if cls is not None}
+
+        # float() takes precedence over the configured states
+        numeric_states = set()
+        for state in self.dataset_conf['sensors']['state']:
+            try:
+                float(state)
+                numeric_states.add(state)
+            except ValueError:
+                pass
+        self._state_table = compile_table(
+            self.sensor_state_mapping,
+            set(self.dataset_conf['sensors']['state']) - numeric_states)
+
+        activity_types = compile_table(
+            self.activity_type_mapping, self.activity_list)
+        self._activity_table = {
+            name: (i, activity_types[name])
+            for i, name in enumerate(self.activity_list)
+            if name in activity_types}
+
+        activity_states = compile_table(
+            self.activity_state_mapping, self.activity_state_list)
+        self._activity_state_table = {
+            state: (i, activity_states[state])
+            for i, state in enumerate(self.activity_state_list)
+            if state in activity_states}
+
+    def _sensor_type_of(self, sensor_name_str):
+        tokens = self.sensor_type_pattern.search(sensor_name_str)
+        return tokens.group(1) if tokens else None
+
     def sensor_name_mapping(
             self, sensor_name_str):
         """ sensor_type_mapping()
@@ -234,36 +315,129 @@ class HHDataset(DatasetObject):
                 }
 
                 activity can be None.
-                Using regex can be the simplest way to implement this function.
-                Make use of the mapping functions defined above.
+                The timestamp is converted to BaseOntology.DATE_REPRESENTATION.
         """
         extracted = {}
         tokens = self.line_pattern.search(line)
 
-        extracted['timestamp'] = tokens.group(1)
+        sensor_type = tokens.group(2)
+        try:
+            sensor_class = self._sensor_types[sensor_type]
+        except KeyError:
+            sensor_class = self._sensor_type_mapping(sensor_type)
+
+        sensor_state = tokens.group(4).lower()
+        try:
+            sensor_value = self._state_table[sensor_state]
+        except KeyError:
+            sensor_value = self.sensor_state_mapping(sensor_state)
+
+        extracted['timestamp'] = to_date_representation(tokens.group(1))
         extracted['sensor'] = {
-            'name': '%s%s' % (tokens.group(2), tokens.group(3)),
-            'type': self._sensor_type_mapping(tokens.group(2)),
-            'state': self.sensor_state_mapping(tokens.group(4).lower())
+            'name': sensor_type + tokens.group(3),
+            'type': sensor_class,
+            'state': sensor_value
         }
         extracted['activity'] = None
 
         if tokens.group(6):
             act_tokens = self.activity_pattern.search(tokens.group(6))
+            act_name = act_tokens.group(1)
 
             if act_tokens.group(3):
                 act_state = act_tokens.group(3).lower()
             else:
-                act_state = None
+                act_state = 'None'
+
+            try:
+                act_class = self._activity_table[act_name][1]
+            except KeyError:
+                act_class = self.activity_type_mapping(act_name)
+            try:
+                act_relation = self._activity_state_table[act_state][1]
+            except KeyError:
+                act_relation = self.activity_state_mapping(act_state)
 
             extracted['activity'] = {
-                'name': act_tokens.group(1),
-                'type': self.activity_type_mapping(act_tokens.group(1)),
-                'state': self.activity_state_mapping(act_state)
+                'name': act_name,
+                'type': act_class,
+                'state': act_relation
             }
 
         return extracted
 
+    def apply_lines_pattern(self, lines):
+        """ apply_lines_pattern
+                Takes a list of lines from the data file as argument.
+                Returns the events of the lines as a dict of numpy columns
+                (see EventColumns.EVENT_COLUMNS).
+
+                Lines are parsed in a single pass, with the same patterns and
+                mappings as apply_line_pattern(). Lines that cannot be parsed
+                or whose sensor is not in sensor_list are skipped.
+        """
+        timestamps, sensors, values, activities, activity_states = \
+            [], [], [], [], []
+
+        line_pattern = self.line_pattern.search
+        activity_pattern = self.activity_pattern.search
+        sensor_table = self._sensor_table
+        state_table = self._state_table
+        activity_table = self._activity_table
+        activity_state_table = self._activity_state_table
+
+        num_errors = 0
+        for line in lines:
+            tokens = line_pattern(line)
+            if tokens is None:
+                num_errors += 1
+                continue
+
+            try:
+                sensor = sensor_table[tokens.group(2) + tokens.group(3)][0]
+            except KeyError:
+                num_errors += 1
+                continue
+
+            state = tokens.group(4).lower()
+            try:
+                value = state_table[state]
+            except KeyError:
+                try:
+                    value = self.sensor_state_mapping(state)
+                except ValueError:
+                    num_errors += 1
+                    continue
+
+            activity = activity_state = NO_ACTIVITY
+            if tokens.group(6):
+                act_tokens = activity_pattern(tokens.group(6))
+                act_state = act_tokens.group(3)
+                act_state = act_state.lower() if act_state else 'None'
+                try:
+                    activity = activity_table[act_tokens.group(1)][0]
+                    activity_state = activity_state_table[act_state][0]
+                except KeyError:
+                    num_errors += 1
+                    continue
+
+            timestamps.append(tokens.group(1))
+            sensors.append(sensor)
+            values.append(value)
+            activities.append(activity)
+            activity_states.append(activity_state)
+
+        logger.debug("Parsed %s lines out of %s...",
+                     len(lines) - num_errors, len(lines))
+
+        return columns_from_lists(
+            timestamp=parse_timestamps(timestamps),
+            sensor=sensors,
+            value=values,
+            activity=activities,
+            activity_state=activity_states
+        )
+
     @property
     def sensor_list(self):
         """ Property: sensor_list
@@ -278,6 +452,13 @@ class HHDataset(DatasetObject):
         """
         return list(self.dataset_conf['activities']['type'].keys())
 
+    @property
+    def activity_state_list(self):
+        """ Property: activity_state_list
+                Returns the list of activity states used in the dataset.
+        """
+        return list(self.dataset_conf['activities']['state'].keys())
+
     @property
     def location_list(self):
         """ Property: location_list
@@ -289,9 +470,24 @@ class HHDataset(DatasetObject):
     def filepath(self):
         """ Property: filepath
                 Returns the absolute path to the data file. 
+                If the data file does not exist, the path of a compressed
+                version of it is returned instead, if any (see
+                Sources.resolve_source).
         """
-        return os.path.abspath(
+        path = os.path.abspath(
             os.path.join(self.dataset_path, self.dataset_conf['datapath']))
+        # Looking into zip archives is not free: the resolution is memoized
+        if self._resolved_filepath is None or self._resolved_filepath[0] != path:
+            self._resolved_filepath = (path, resolve_source(path))
+        return self._resolved_filepath[1]
+
+    @property
+    def config_version(self):
+        """ Property: config_version
+                Returns the sha1 hex digest of the dataset configuration.
+        """
+        return hashlib.sha1(json.dumps(
+            self.dataset_conf, sort_keys=True).encode('utf-8')).hexdigest()
 
     @property
     def name(self):
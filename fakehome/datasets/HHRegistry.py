@@ -0,0 +1,236 @@
+from .HHDataset import HHDataset, load_config, DEFAULT_CONFIG_FILE, DEFAULT_DATASET_PATH
+from ..core import DatasetCache, FakeHomeOntology, FakeHomeGraph
+from ..core.Sources import sidecar_path
+
+import os
+import multiprocessing
+import time
+
+from tqdm import tqdm
+
+import logging
+logger = logging.getLogger(__name__)
+
+WORLD_SUFFIX = '.worlds'
+
+
+def world_path(dataset):
+    """ world_path()
+            Returns the path of the persistent world in which HHRegistry
+            workers build the ontology of a dataset, keyed by the version of
+            its configuration.
+    """
+    return os.path.join(sidecar_path(dataset.filepath, WORLD_SUFFIX),
+                        dataset.config_version + '.sqlite')
+
+
+def _build_world(dataset, path):
+    # The world is built in a file of its own, then renamed, as other
+    # processes may build the same world concurrently
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        FakeHomeOntology(dataset, world_path=tmp_path).close()
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _load_home(task):
+    # Runs in a worker process: builds the cache entry of the dataset and,
+    # if a path is given, the persistent world of its ontology. Only the
+    # timings are sent back: the main process memory-maps the cached
+    # columns and opens the world.
+    dataset, path = task
+    timings = {}
+    try:
+        t0 = time.perf_counter()
+        DatasetCache(dataset).load()
+        timings['events'] = time.perf_counter() - t0
+
+        if path is not None and not os.path.isfile(path):
+            t0 = time.perf_counter()
+            _build_world(dataset, path)
+            timings['world'] = time.perf_counter() - t0
+    except Exception as e:
+        return dataset.name, timings, "%s: %s" % (type(e).__name__, e)
+    return dataset.name, timings, None
+
+
+def _build_home(handle, build_graphs, lightweight, path):
+    t0 = time.perf_counter()
+    handle.ontology = FakeHomeOntology(
+        handle.dataset, lightweight=lightweight, world_path=path,
+        copy_world=True)
+    handle.timings['ontology'] = time.perf_counter() - t0
+
+    if build_graphs:
+        t0 = time.perf_counter()
+        handle.graph = FakeHomeGraph(handle.ontology)
+        handle.timings['graph'] = time.perf_counter() - t0
+
+
+class HomeHandle(object):
+    """ HomeHandle
+            Dataset, event columns, ontology and graph of a home loaded by an
+            HHRegistry, along with the time spent on each step. 'error' holds
+            the reason why the home could not be loaded, if any.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.ontology = None
+        self.reset()
+
+    def reset(self):
+        """ reset()
+                Forgets the loaded columns, ontology, graph, timings and
+                error of the home. The ontology is closed.
+        """
+        if self.ontology is not None:
+            self.ontology.close()
+        self.columns = None
+        self.ontology = None
+        self.graph = None
+        self.timings = {}
+        self.error = None
+
+    @property
+    def name(self):
+        return self.dataset.name
+
+    def __repr__(self):
+        return "HomeHandle(%s, %s)" % (self.name, ', '.join(
+            '%s=%.2fs' % item for item in self.timings.items()))
+
+
+class HHRegistry(object):
+    """ HHRegistry
+            Set of homes of a config file. The config file is parsed once and
+            shared by the HHDataset of every home. registry[name] returns the
+            HomeHandle of a home, filled by load().
+
+            load() parses (or loads from the DatasetCache) the events of the
+            homes concurrently in a pool of worker processes. As owlready2
+            worlds cannot be shared between processes, each worker also
+            builds the ontology of its homes in a persistent world of its own
+            (see world_path()), in lightweight mode. The main process then
+            opens in-memory copies of those worlds (see
+            FakeHomeOntology.copy_world), which is cheaper than creating the
+            individuals, and builds the graphs.
+
+            Example:
+
+            homes = HHRegistry('all').load(processes=8)
+            homes['hh101'].graph
+    """
+
+    def __init__(self, dataset_names='all', dataset_path=DEFAULT_DATASET_PATH,
+                 config_file=DEFAULT_CONFIG_FILE):
+        super(HHRegistry, self).__init__()
+        self._config = load_config(config_file)
+
+        if dataset_names == 'all':
+            dataset_names = sorted(self._config.keys())
+        elif isinstance(dataset_names, str):
+            dataset_names = [dataset_names]
+
+        unknown = [name for name in dataset_names if name not in self._config]
+        if unknown:
+            s = "Cannot find datasets with names: %s" % (', '.join(unknown),)
+            logger.error(s)
+            raise KeyError(s)
+
+        self._handles = {
+            name: HomeHandle(HHDataset(name, dataset_path, config=self._config))
+            for name in dataset_names
+        }
+
+    def _load_all(self, handles, processes, worlds):
+        tasks = [(handle.dataset, world_path(handle.dataset) if worlds else None)
+                 for handle in handles.values()]
+        if processes == 1:
+            results = map(_load_home, tasks)
+            pool = None
+        else:
+            pool = multiprocessing.Pool(min(processes, len(tasks)))
+            results = pool.imap_unordered(_load_home, tasks)
+
+        try:
+            for name, timings, error in tqdm(
+                    results, total=len(tasks), desc='Homes', ascii=True):
+                handles[name].timings.update(timings)
+                if error is not None:
+                    logger.error("Cannot load %s (%s).", name, error)
+                    handles[name].error = error
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        for handle in handles.values():
+            if handle.error is None:
+                handle.columns = DatasetCache(handle.dataset).load()
+
+    def load(self, processes=None, build_graphs=True, lightweight=True):
+        """ load()
+                Returns a dict of HomeHandle, by dataset name. Homes whose
+                events, ontology or graph cannot be loaded have their
+                'error' set.
+
+                With processes > 1 and lightweight ontologies, the
+                ontologies are built by the worker processes (see
+                HHRegistry). Otherwise, they are built in memory by the main
+                process.
+        """
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        if processes < 1:
+            s = "The number of processes must be at least 1. Got: %s" % (
+                processes,)
+            logger.error(s)
+            raise AttributeError(s)
+
+        for handle in self._handles.values():
+            handle.reset()
+        handles = dict(self._handles)
+        if not handles:
+            return handles
+
+        worlds = processes > 1 and lightweight
+        self._load_all(handles, processes, worlds)
+
+        for name, handle in handles.items():
+            if handle.error is not None:
+                continue
+            try:
+                _build_home(handle, build_graphs, lightweight,
+                            world_path(handle.dataset) if worlds else None)
+            except Exception as e:
+                handle.error = "%s: %s" % (type(e).__name__, e)
+                logger.error("Cannot build %s (%s).", name, handle.error)
+
+        for name, handle in sorted(handles.items()):
+            if handle.error is None:
+                logger.info("Loaded %s: %s", name, ', '.join(
+                    '%s %.2fs' % item for item in handle.timings.items()))
+
+        return handles
+
+    def __getitem__(self, name):
+        return self._handles[name]
+
+    def __iter__(self):
+        return iter(self._handles)
+
+    def __len__(self):
+        return len(self._handles)
+
+    @property
+    def config(self):
+        return self._config
+
+    @property
+    def dataset_names(self):
+        return list(self._handles.keys())
@@ -1 +1,2 @@
 from .HHDataset import HHDataset
+from .HHRegistry import HHRegistry, HomeHandle
@@ -0,0 +1,74 @@
+import os
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+from ..core.EventColumns import NO_ACTIVITY
+from .EventSimulator import NUMERIC_SENSORS
+
+# States written for the values 0 and 1 of binary sensors
+BINARY_STATES = {
+    'DoorSensor': ('CLOSE', 'OPEN'),
+}
+DEFAULT_BINARY_STATES = ('OFF', 'ON')
+WRITE_CHUNK_EVENTS = 1 << 20
+
+
+def _format_timestamps(timestamps):
+    # 'YYYY-MM-DD HH:MM:SS.ffffff', as in the CASAS data files
+    strings = np.datetime_as_string(
+        np.asarray(timestamps, dtype=np.int64).astype('datetime64[ns]')
+        .astype('datetime64[us]'))
+    return [s.replace('T', ' ') for s in strings.tolist()]
+
+
+def write_events(dataset, columns, path, append=False):
+    """ write_events()
+            Writes event columns (see EventColumns.EVENT_COLUMNS) to a data
+            file in the CASAS format read by HHDataset, e.g.
+            '2012-07-20 10:00:03.232671 M005 ON Toilet'. Sensor and activity
+            indices refer to the lists of the dataset. Numeric sensor values
+            are written as integers, as expected by the line pattern.
+            Returns the number of written lines.
+    """
+    sensor_list = dataset.sensor_list
+    activity_list = dataset.activity_list
+
+    # State strings of every sensor, for binary sensors
+    binary_states = []
+    numeric = np.zeros(len(sensor_list), dtype=bool)
+    for i, name in enumerate(sensor_list):
+        try:
+            cls = dataset.sensor_name_mapping(name).name
+        except (KeyError, AttributeError):
+            cls = None
+        binary_states.append(BINARY_STATES.get(cls, DEFAULT_BINARY_STATES))
+        numeric[i] = cls in NUMERIC_SENSORS
+    activity_suffixes = [' ' + name for name in activity_list] + ['']
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    n = len(columns['timestamp'])
+    with open(path, 'a' if append else 'w') as f:
+        for begin in range(0, n, WRITE_CHUNK_EVENTS):
+            end = min(n, begin + WRITE_CHUNK_EVENTS)
+            sensors = np.asarray(columns['sensor'][begin:end])
+            values = np.rint(np.asarray(columns['value'][begin:end])).astype(np.int64)
+            activities = np.asarray(columns['activity'][begin:end]).astype(np.intp)
+            activities[activities == NO_ACTIVITY] = len(activity_list)
+
+            states = [
+                str(value) if numeric[sensor] else binary_states[sensor][value != 0]
+                for sensor, value in zip(sensors.tolist(), values.tolist())
+            ]
+            f.writelines(
+                '%s %s %s%s\n' % line for line in zip(
+                    _format_timestamps(columns['timestamp'][begin:end]),
+                    [sensor_list[s] for s in sensors.tolist()],
+                    states,
+                    [activity_suffixes[a] for a in activities.tolist()]))
+
+    logger.debug("Wrote %s events to '%s'.", n, path)
+    return n
@@ -0,0 +1,385 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import breadth_first_order
+
+import logging
+logger = logging.getLogger(__name__)
+
+from ..core import FakeHomeOntology
+from ..core.EventColumns import NO_ACTIVITY, columns_from_lists, concatenate_columns
+from ..core.Timestamps import as_timestamps
+
+# Location classes where the activities (and their subclasses) take place.
+# The other activities take place anywhere.
+ACTIVITY_LOCATIONS = {
+    'CookActivity': ('KitchenLocation',),
+    'EatActivity': ('DiningRoomLocation', 'KitchenLocation'),
+    'DrinkActivity': ('KitchenLocation',),
+    'DishesActivity': ('KitchenLocation',),
+    'WashDishesActivity': ('KitchenLocation',),
+    'TakeMedsActivity': ('KitchenLocation', 'BathroomLocation'),
+    'TakeMedicineActivity': ('KitchenLocation', 'BathroomLocation'),
+    'DrugManagementActivity': ('KitchenLocation', 'BathroomLocation'),
+    'LaundryActivity': ('BathroomLocation', 'KitchenLocation'),
+    'SleepActivity': ('BedroomLocation',),
+    'MakeBedActivity': ('BedroomLocation',),
+    'DressActivity': ('DressingLocation', 'BedroomLocation'),
+    'BedToiletTransitionActivity': ('BathroomLocation',),
+    'BatheActivity': ('BathroomLocation',),
+    'ToiletActivity': ('BathroomLocation',),
+    'GroomActivity': ('BathroomLocation',),
+    'PersonalHygieneActivity': ('BathroomLocation',),
+    'EnterHomeActivity': ('EntranceLocation',),
+    'LeaveHomeActivity': ('EntranceLocation',),
+    'StepOutActivity': ('EntranceLocation',),
+    'GroceriesActivity': ('EntranceLocation', 'KitchenLocation'),
+    'WorkActivity': ('WorkAreaLocation', 'LivingRoomLocation'),
+    'RelaxActivity': ('LivingRoomLocation',),
+    'WatchTVActivity': ('LivingRoomLocation',),
+    'ReadActivity': ('LivingRoomLocation', 'BedroomLocation'),
+    'PhoneActivity': ('LivingRoomLocation',),
+    'PianoActivity': ('LivingRoomLocation',),
+    'EntertainGuestsActivity': ('LivingRoomLocation', 'DiningRoomLocation'),
+    'ExerciseActivity': ('LivingRoomLocation',),
+    'SleepOutOfBedActivity': ('LivingRoomLocation',),
+}
+
+# Relative firing rate of the sensor classes within a visited location
+SENSOR_RATES = {
+    'MotionSensor': 1.,
+    'WideAreaMotionSensor': .5,
+    'LightSensor': .5,
+    'LightSwitchSensor': .2,
+    'DoorSensor': .1,
+    'TemperatureSensor': .1,
+    'BatterySensor': .02,
+}
+DEFAULT_SENSOR_RATE = .2
+
+# Range of the values of numeric sensors. The other sensors are binary, and
+# alternate between 1 (ON, OPEN) and 0 (OFF, CLOSE).
+NUMERIC_SENSORS = {
+    'LightSensor': (0, 100),
+    'TemperatureSensor': (15, 30),
+    'BatterySensor': (0, 100),
+}
+
+DEFAULT_START = '2012-07-20 00:00:00.000000'
+# Next-hop trees kept in memory, one per target location
+MAX_ROUTES = 4096
+NS_PER_US = 1000
+
+
+def _class_names(cls):
+    return [getattr(c, 'name', None) for c in cls.mro()]
+
+
+class EventSimulator(object):
+    """ EventSimulator
+            Generates synthetic sensor events in the home of a
+            FakeHomeOntology.
+
+            An occupant performs a sequence of activities drawn from the
+            activities of the dataset. For each activity, they walk from
+            their location to a location where the activity takes place (see
+            ACTIVITY_LOCATIONS), through the shortest path of adjacent
+            locations, and stay there for activity_duration seconds. The
+            sensors of every visited location fire at event_rate events per
+            second, weighted by SENSOR_RATES.
+
+            Only the walk is sequential; the events of the visits are
+            generated with numpy, by blocks of segments. The result is made
+            of event columns (see EventColumns.EVENT_COLUMNS), whose sensor
+            and activity indices refer to the lists of the dataset, and can
+            be written in the CASAS format with write_events().
+
+            Example:
+
+            simulator = EventSimulator(FakeHomeOntology(HHDataset('hh101'), lightweight=True), seed=0)
+            columns = simulator.simulate(num_events=10 ** 7)
+    """
+
+    def __init__(self, ontology, seed=None, start=DEFAULT_START, event_rate=.5,
+                 activity_duration=(60., 3600.), transit_duration=(2., 20.)):
+        super(EventSimulator, self).__init__()
+        if not isinstance(ontology, FakeHomeOntology):
+            s = "The EventSimulator must be built from a FakeHomeOntology. \
+                Wrong type for 'ontology': %s" % (type(ontology),)
+            logger.error(s)
+            raise AttributeError(s)
+
+        self._ontology = ontology
+        self._dataset = ontology.dataset
+        self._rng = np.random.default_rng(seed)
+        self._event_rate = event_rate
+        self._activity_duration = activity_duration
+        self._transit_duration = transit_duration
+
+        self._build_locations()
+        self._build_sensors()
+        self._build_activities()
+
+        # Simulation state, carried from one block of segments to the next
+        self._location = int(self._rng.integers(self._nlocations))
+        self._time = int(as_timestamps([start])[0])
+        self._binary_counts = np.zeros(len(self._sensor_ids), dtype=np.int64)
+        self._routes = {}
+
+    def _build_locations(self):
+        self._location_names = sorted(self._ontology.locations.keys())
+        self._nlocations = len(self._location_names)
+        if not self._nlocations:
+            s = "Cannot simulate a home without locations."
+            logger.error(s)
+            raise AttributeError(s)
+
+        individuals = [self._ontology.locations[name]
+                       for name in self._location_names]
+        index = {location: i for i, location in enumerate(individuals)}
+        rows, cols = [], []
+        for i, location in enumerate(individuals):
+            for other in location.is_adjacent_to:
+                rows.append(i)
+                cols.append(index[other])
+        self._adjacency = sp.coo_matrix(
+            (np.ones(len(rows)), (rows, cols)),
+            shape=(self._nlocations, self._nlocations)).tocsr()
+
+        self._location_classes = [type(location).name for location in individuals]
+
+    def _build_sensors(self):
+        sensor_list = self._dataset.sensor_list
+        sensor_index = {name: i for i, name in enumerate(sensor_list)}
+        location_index = {self._ontology.locations[name]: i
+                          for i, name in enumerate(self._location_names)}
+
+        # Sensors grouped by location, with their cumulated firing rates
+        by_location = [[] for _ in range(self._nlocations)]
+        for name, sensor in sorted(self._ontology.sensors.items()):
+            if name in sensor_index and sensor.has_location in location_index:
+                by_location[location_index[sensor.has_location]].append(
+                    (sensor_index[name], type(sensor).name))
+
+        ids, rates, low, high, binary = [], [], [], [], []
+        self._location_bounds = np.zeros(self._nlocations + 1, dtype=np.intp)
+        for i, sensors in enumerate(by_location):
+            for sensor_id, cls in sensors:
+                ids.append(sensor_id)
+                rates.append(SENSOR_RATES.get(cls, DEFAULT_SENSOR_RATE))
+                lo, hi = NUMERIC_SENSORS.get(cls, (0, 1))
+                low.append(lo)
+                high.append(hi)
+                binary.append(cls not in NUMERIC_SENSORS)
+            self._location_bounds[i + 1] = len(ids)
+
+        self._sensor_ids = np.array(ids, dtype=np.int32)
+        self._cumulated_rates = np.cumsum(np.r_[0., rates])
+        self._binary = np.array(binary, dtype=bool)
+
+        # Numeric sensors take values around a level of their own
+        low, high = np.array(low, dtype=np.float64), np.array(high, dtype=np.float64)
+        self._levels = low + (high - low) * self._rng.random(len(ids))
+        self._spreads = (high - low) / 10.
+        self._low, self._high = low, high
+
+    def _build_activities(self):
+        self._activity_ids = []
+        self._activity_locations = []
+        for i, name in enumerate(self._dataset.activity_list):
+            try:
+                cls = self._dataset.activity_type_mapping(name)
+            except (KeyError, AttributeError):
+                continue
+
+            location_classes = ()
+            for class_name in _class_names(cls):
+                if class_name in ACTIVITY_LOCATIONS:
+                    location_classes = ACTIVITY_LOCATIONS[class_name]
+                    break
+            candidates = np.array(
+                [j for j, location_class in enumerate(self._location_classes)
+                 if location_class in location_classes], dtype=np.intp)
+            if not len(candidates):
+                candidates = np.arange(self._nlocations)
+
+            self._activity_ids.append(i)
+            self._activity_locations.append(candidates)
+
+        try:
+            self._timestamp_state = self._dataset.activity_state_list.index('None')
+        except ValueError:
+            self._timestamp_state = NO_ACTIVITY
+
+    def _next_hops(self, target):
+        # Predecessors in the breadth-first tree rooted at the target: the
+        # next location on a shortest path to the target
+        try:
+            return self._routes[target]
+        except KeyError:
+            pass
+        if len(self._routes) >= MAX_ROUTES:
+            self._routes.clear()
+        _, predecessors = breadth_first_order(
+            self._adjacency, target, directed=False, return_predecessors=True)
+        self._routes[target] = predecessors
+        return predecessors
+
+    def _walk(self, num_segments):
+        # Returns the location, duration and activity of the visits of
+        # num_segments activities
+        rng = self._rng
+        if self._activity_ids:
+            activities = rng.integers(len(self._activity_ids), size=num_segments)
+            choices = rng.random(num_segments)
+        lo, hi = self._transit_duration
+        locations, labels = [], []
+
+        location = self._location
+        for k in range(num_segments):
+            if self._activity_ids:
+                activity = activities[k]
+                candidates = self._activity_locations[activity]
+                target = int(candidates[int(choices[k] * len(candidates))])
+                label = self._activity_ids[activity]
+            else:
+                target = int(rng.integers(self._nlocations))
+                label = NO_ACTIVITY
+
+            next_hops = self._next_hops(target)
+            while location != target:
+                location = int(next_hops[location])
+                if location < 0:
+                    # Unreachable target
+                    location = target
+                if location != target:
+                    locations.append(location)
+                    labels.append(NO_ACTIVITY)
+            locations.append(target)
+            labels.append(label)
+        self._location = location
+
+        locations = np.array(locations, dtype=np.intp)
+        labels = np.array(labels, dtype=np.int16)
+        activity = labels != NO_ACTIVITY
+        durations = np.where(
+            activity,
+            rng.uniform(*self._activity_duration, size=len(labels)),
+            rng.uniform(lo, hi, size=len(labels)))
+        return locations, durations, labels
+
+    def _events(self, locations, durations, labels):
+        rng = self._rng
+        num_visits = len(locations)
+
+        # Times are integers of microseconds, as written in data files
+        durations_us = np.rint(durations * 1e6).astype(np.int64)
+        starts = self._time + \
+            np.r_[0, np.cumsum(durations_us[:-1])] * NS_PER_US
+        self._time += int(durations_us.sum()) * NS_PER_US
+
+        counts = rng.poisson(self._event_rate * durations)
+        # Visits of locations without sensors have no events
+        counts[self._location_bounds[locations + 1] ==
+               self._location_bounds[locations]] = 0
+        visits = np.repeat(np.arange(num_visits), counts)
+        n = len(visits)
+
+        offsets = (rng.random(n) * durations_us[visits]).astype(np.int64)
+        timestamps = starts[visits] + offsets * NS_PER_US
+        order = np.argsort(timestamps, kind='stable')
+        timestamps, visits = timestamps[order], visits[order]
+
+        # Sensors of the visited locations, weighted by their firing rate
+        event_locations = locations[visits]
+        low = self._cumulated_rates[self._location_bounds[event_locations]]
+        high = self._cumulated_rates[self._location_bounds[event_locations + 1]]
+        sensors = np.searchsorted(
+            self._cumulated_rates, low + (high - low) * rng.random(n),
+            side='right') - 1
+        sensors = np.clip(sensors, self._location_bounds[event_locations],
+                          self._location_bounds[event_locations + 1] - 1)
+
+        values = np.clip(np.rint(
+            self._levels[sensors] + self._spreads[sensors] * rng.standard_normal(n)),
+            self._low[sensors], self._high[sensors])
+
+        # Binary sensors alternate between 1 and 0, starting from their last
+        # state
+        binary = self._binary[sensors]
+        binary_sensors = sensors[binary]
+        by_sensor = np.argsort(binary_sensors, kind='stable')
+        sorted_sensors = binary_sensors[by_sensor]
+        group_starts = np.searchsorted(sorted_sensors, sorted_sensors, side='left')
+        ranks = np.empty(len(binary_sensors), dtype=np.int64)
+        ranks[by_sensor] = np.arange(len(binary_sensors)) - group_starts
+        values[binary] = 1 - (self._binary_counts[binary_sensors] + ranks) % 2
+        self._binary_counts += np.bincount(
+            binary_sensors, minlength=len(self._binary_counts))
+
+        activities = labels[visits]
+        activity_states = np.where(
+            activities != NO_ACTIVITY, self._timestamp_state, NO_ACTIVITY)
+
+        return columns_from_lists(
+            timestamp=timestamps,
+            sensor=self._sensor_ids[sensors],
+            value=values,
+            activity=activities,
+            activity_state=activity_states)
+
+    def _segments_per_block(self, batch_events):
+        mean_duration = (np.mean(self._activity_duration)
+                         + 2 * np.mean(self._transit_duration))
+        return max(1, int(batch_events / (self._event_rate * mean_duration)))
+
+    def iter_simulate(self, num_events=None, duration=None, batch_events=1 << 22):
+        """ iter_simulate()
+                Yields event columns of about batch_events events, until
+                num_events events or duration seconds were generated (if
+                both are None, forever). Successive calls continue the same
+                simulation.
+        """
+        if not len(self._sensor_ids):
+            s = "Cannot simulate a home without sensors."
+            logger.error(s)
+            raise AttributeError(s)
+
+        stop_time = self._time + int(duration * 1e9) \
+            if duration is not None else None
+        generated = 0
+        segments = self._segments_per_block(batch_events)
+        while num_events is None or generated < num_events:
+            columns = self._events(*self._walk(segments))
+            if stop_time is not None:
+                last = int(np.searchsorted(columns['timestamp'], stop_time))
+                columns = {k: v[:last] for k, v in columns.items()}
+            if num_events is not None:
+                columns = {k: v[:num_events - generated]
+                           for k, v in columns.items()}
+            generated += len(columns['timestamp'])
+            yield columns
+            if stop_time is not None and self._time >= stop_time:
+                return
+
+    def simulate(self, num_events=None, duration=None):
+        """ simulate()
+                Returns the event columns of num_events events, or of
+                duration seconds of simulation.
+        """
+        if num_events is None and duration is None:
+            s = "simulate() requires num_events or duration."
+            logger.error(s)
+            raise AttributeError(s)
+        return concatenate_columns(self.iter_simulate(num_events, duration))
+
+    @property
+    def ontology(self):
+        return self._ontology
+
+    @property
+    def time(self):
+        """ Property: time
+                Returns the current time of the simulation, in epoch
+                nanoseconds.
+        """
+        return self._time
@@ -0,0 +1,178 @@
+import os
+import json
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+from ..core import FakeHomeOntology
+from ..core.EventColumns import empty_columns
+from ..datasets.HHDataset import HHDataset, load_config
+from .EventSimulator import EventSimulator, ACTIVITY_LOCATIONS
+from .EventFiles import write_events
+
+# Location classes of the generated homes, with their relative frequency.
+# The first locations of a home get one of each class in CORE_LOCATIONS.
+LOCATION_TYPES = {
+    'EntranceLocation': 1.,
+    'KitchenLocation': 1.,
+    'LivingRoomLocation': 1.,
+    'BedroomLocation': 2.,
+    'BathroomLocation': 1.5,
+    'DiningRoomLocation': .5,
+    'CorridorLocation': 2.,
+    'WorkAreaLocation': .5,
+    'DressingLocation': .5,
+}
+CORE_LOCATIONS = ('EntranceLocation', 'KitchenLocation', 'LivingRoomLocation',
+                  'BedroomLocation', 'BathroomLocation')
+
+# Sensor name prefixes (as in the CASAS datasets) and their relative
+# frequency
+SENSOR_TYPES = {
+    'M': ('MotionSensor', 4.),
+    'MA': ('WideAreaMotionSensor', 1.),
+    'LS': ('LightSensor', 3.),
+    'L': ('LightSwitchSensor', 1.),
+    'D': ('DoorSensor', 1.),
+    'T': ('TemperatureSensor', 1.),
+    'BA': ('BatterySensor', .2),
+}
+SENSOR_STATES = {'open': 'True', 'close': 'False', 'on': 'True', 'off': 'False'}
+# Sensor names are a prefix and 3 to 5 digits
+MAX_SENSORS_PER_TYPE = 99999
+
+ACTIVITY_STATES = {'begin': 'beginsAt', 'end': 'endsAt', 'None': 'hasTimeStamp'}
+
+
+def _activity_types():
+    # e.g. {'WatchTV': 'WatchTVActivity'}
+    return {name[:-len('Activity')]: name for name in sorted(ACTIVITY_LOCATIONS)}
+
+
+def random_home_config(num_locations, sensors_per_location=5, seed=None,
+                       datapath='ann.txt', extra_adjacency=.2):
+    """ random_home_config()
+            Returns the configuration of a random home, in the schema of the
+            HHDataset config file.
+
+            The locations form a random tree (each location is adjacent to
+            a random previous one), plus extra_adjacency * num_locations
+            random adjacencies. Each location has sensors_per_location
+            sensors (or a number drawn in a (low, high) range), of classes
+            drawn from SENSOR_TYPES.
+
+            Example:
+
+            config = random_home_config(10000, sensors_per_location=(2, 8), seed=0)
+    """
+    if num_locations < 1:
+        s = "A home needs at least one location. Got: %s" % (num_locations,)
+        logger.error(s)
+        raise AttributeError(s)
+
+    rng = np.random.default_rng(seed)
+
+    # Location types
+    location_types = list(LOCATION_TYPES)
+    weights = np.array([LOCATION_TYPES[t] for t in location_types])
+    types = rng.choice(len(location_types), size=num_locations,
+                       p=weights / weights.sum())
+    types = [location_types[t] for t in types]
+    num_core = min(num_locations, len(CORE_LOCATIONS))
+    types[:num_core] = CORE_LOCATIONS[:num_core]
+    names = ['%s_%d' % (t[:-len('Location')].lower(), i)
+             for i, t in enumerate(types)]
+
+    # Adjacency: random tree plus random extra edges
+    children = np.arange(1, num_locations)
+    parents = (rng.random(num_locations - 1) * children).astype(np.intp)
+    num_extra = int(extra_adjacency * num_locations) if num_locations > 1 else 0
+    extra = rng.integers(num_locations, size=(num_extra, 2))
+    extra = extra[extra[:, 0] != extra[:, 1]]
+    adjacency = {}
+    for a, b in zip(np.r_[parents, extra[:, 0]].tolist(),
+                    np.r_[children, extra[:, 1]].tolist()):
+        others = adjacency.setdefault(names[a], [])
+        if names[b] not in others:
+            others.append(names[b])
+
+    # Sensors
+    if isinstance(sensors_per_location, (tuple, list)):
+        low, high = sensors_per_location
+        counts = rng.integers(low, high + 1, size=num_locations)
+    else:
+        counts = np.full(num_locations, sensors_per_location, dtype=np.intp)
+
+    prefixes = list(SENSOR_TYPES)
+    weights = np.array([SENSOR_TYPES[p][1] for p in prefixes])
+    kinds = rng.choice(len(prefixes), size=int(counts.sum()),
+                       p=weights / weights.sum())
+    numbers = np.zeros(len(prefixes), dtype=np.intp)
+    sensors = {}
+    position = 0
+    for name, count in zip(names, counts.tolist()):
+        sensors[name] = []
+        for kind in kinds[position:position + count].tolist():
+            numbers[kind] += 1
+            if numbers[kind] > MAX_SENSORS_PER_TYPE:
+                s = "Cannot name more than %d sensors of type %s." % (
+                    MAX_SENSORS_PER_TYPE, prefixes[kind])
+                logger.error(s)
+                raise AttributeError(s)
+            sensors[name].append('%s%03d' % (prefixes[kind], numbers[kind]))
+        position += count
+
+    return {
+        'datapath': datapath,
+        'ontoref': 'BaseOntology',
+        'locations': {
+            'type': dict(zip(names, types)),
+            'adjacency': adjacency,
+        },
+        'activities': {
+            'type': _activity_types(),
+            'state': dict(ACTIVITY_STATES),
+        },
+        'sensors': {
+            'type': {prefix: cls for prefix, (cls, _) in SENSOR_TYPES.items()},
+            'state': dict(SENSOR_STATES),
+            'locations': sensors,
+        },
+    }
+
+
+def write_home(dataset_name, config, dataset_path, config_file, num_events=0,
+               seed=None, batch_events=1 << 22, **simulator_args):
+    """ write_home()
+            Adds the configuration of a home to a config file (created if
+            missing) and writes num_events simulated events (see
+            EventSimulator) to its data file, under dataset_path. Returns
+            the HHDataset of the home.
+
+            Example:
+
+            config = random_home_config(1000, seed=0, datapath='big/ann.txt')
+            dataset = write_home('big', config, '.data', 'homes.json', num_events=10 ** 7)
+    """
+    configs = load_config(config_file) if os.path.isfile(config_file) else {}
+    configs[dataset_name] = config
+    directory = os.path.dirname(os.path.abspath(config_file))
+    os.makedirs(directory, exist_ok=True)
+    with open(config_file, 'w') as f:
+        json.dump(configs, f, indent=1)
+    logger.debug("Saved configuration of %s to '%s'.", dataset_name, config_file)
+
+    dataset = HHDataset(dataset_name, dataset_path, config=configs)
+    # The ontology is built from an existing data file: an empty one is
+    # written first
+    path = dataset.filepath
+    write_events(dataset, empty_columns(), path)
+    ontology = FakeHomeOntology(dataset, lightweight=True)
+    simulator = EventSimulator(ontology, seed=seed, **simulator_args)
+
+    written = 0
+    for columns in simulator.iter_simulate(num_events, batch_events=batch_events):
+        written += write_events(dataset, columns, path, append=True)
+    logger.debug("Wrote %s events of %s to '%s'.", written, dataset_name, path)
+    return dataset
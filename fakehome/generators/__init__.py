@@ -0,0 +1,3 @@
+from .EventSimulator import EventSimulator
+from .EventFiles import write_events
+from .HomeGenerator import random_home_config, write_home
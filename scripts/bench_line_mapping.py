@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+""" bench_line_mapping.py
+        Measures the per-line cost of HHDataset.apply_line_pattern() with the
+        compiled lookup tables, against the same parsing done through the
+        public mapping functions, which walk the dataset configuration and
+        call str2ontoclass for every line.
+
+        Usage: python scripts/bench_line_mapping.py [dataset_name] [num_lines]
+"""
+import sys
+import random
+import timeit
+
+from fakehome.datasets import HHDataset
+
+
+def synthetic_lines(dataset, num_lines, seed=0):
+    rng = random.Random(seed)
+    activities = dataset.activity_list
+    lines = []
+    for i in range(num_lines):
+        sensor = rng.choice(dataset.sensor_list)
+        if sensor.startswith(('LS', 'BA', 'T')):
+            state = str(rng.randint(0, 100))
+        elif sensor.startswith('D'):
+            state = rng.choice(['OPEN', 'CLOSE'])
+        else:
+            state = rng.choice(['ON', 'OFF'])
+        line = '2012-07-20 10:%02d:%02d.%06d %s %s' % (
+            (i // 60) % 60, i % 60, i, sensor, state)
+        r = rng.random()
+        if r < 0.1:
+            line += ' %s="%s"' % (rng.choice(activities),
+                                  rng.choice(['begin', 'end']))
+        elif r < 0.3:
+            line += ' %s' % (rng.choice(activities),)
+        lines.append(line + '\n')
+    return lines
+
+
+def config_lookup_line_pattern(dataset, line):
+    """ Parses a line like apply_line_pattern() did before the lookup tables
+        were compiled.
+    """
+    tokens = dataset.line_pattern.search(line)
+    extracted = {
+        'timestamp': tokens.group(1),
+        'sensor': {
+            'name': '%s%s' % (tokens.group(2), tokens.group(3)),
+            'type': dataset._sensor_type_mapping(tokens.group(2)),
+            'state': dataset.sensor_state_mapping(tokens.group(4).lower())
+        },
+        'activity': None
+    }
+    if tokens.group(6):
+        act_tokens = dataset.activity_pattern.search(tokens.group(6))
+        act_state = act_tokens.group(3).lower() if act_tokens.group(3) else None
+        extracted['activity'] = {
+            'name': act_tokens.group(1),
+            'type': dataset.activity_type_mapping(act_tokens.group(1)),
+            'state': dataset.activity_state_mapping(act_state)
+        }
+    return extracted
+
+
+def main():
+    dataset_name = sys.argv[1] if len(sys.argv) > 1 else 'hh101'
+    num_lines = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+
+    dataset = HHDataset(dataset_name)
+    lines = synthetic_lines(dataset, num_lines)
+
+    for line in lines[:1000]:
+        assert config_lookup_line_pattern(dataset, line) == \
+            dataset.apply_line_pattern(line)
+
+    def run(parse):
+        return min(timeit.repeat(
+            lambda: [parse(line) for line in lines], number=1, repeat=3))
+
+    before = run(lambda line: config_lookup_line_pattern(dataset, line))
+    after = run(dataset.apply_line_pattern)
+    columnar = min(timeit.repeat(
+        lambda: dataset.apply_lines_pattern(lines), number=1, repeat=3))
+
+    print("Lines: %d" % (num_lines,))
+    print("Config lookups:      %7.3f us/line" % (before / num_lines * 1e6,))
+    print("Compiled tables:     %7.3f us/line (x%.2f)" % (
+        after / num_lines * 1e6, before / after))
+    print("apply_lines_pattern: %7.3f us/line (x%.2f)" % (
+        columnar / num_lines * 1e6, before / columnar))
+
+
+if __name__ == '__main__':
+    main()
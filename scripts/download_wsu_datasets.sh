@@ -2,9 +2,18 @@
 
 PROC_NB=16
 POPU_DIR="`pwd`/$1"
+# Set KEEP_ARCHIVES=1 to keep the datasets as $POPU_DIR/hhXXX.zip instead of
+# unzipping them: fakehome reads ann.txt directly from the archives.
+KEEP_ARCHIVES=${KEEP_ARCHIVES:-0}
 
 curl -s http://casas.wsu.edu/datasets/ | sed -n 's/.*href="\([^"]*\).*/\1/p' | grep 'http://casas.wsu.edu/datasets/' | grep '.zip' | xargs -P $PROC_NB wget -P "$POPU_DIR/archives" -N -q --show-progress
 
+if [ "$KEEP_ARCHIVES" = "1" ]; then
+	mv "$POPU_DIR"/archives/*.zip "$POPU_DIR/"
+	rmdir "$POPU_DIR/archives"
+	exit 0
+fi
+
 ls "$POPU_DIR/archives" | sed 's/\.zip$//' | xargs -P $PROC_NB -I{} sh -c "unzip -n \"$POPU_DIR/archives/{}.zip\" -d \"$POPU_DIR/{}\" | pv -l >/dev/null"
 
 rm -r "$POPU_DIR/archives"
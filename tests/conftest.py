@@ -0,0 +1,102 @@
+import os
+import gzip
+import json
+import shutil
+import zipfile
+
+import pytest
+
+from fakehome import HHDataset, FakeHomeOntology, FakeHomeGraph
+from fakehome.generators import random_home_config, write_home
+
+# Synthetic home shared by the tests, generated once per session
+HOME_NAME = 'home'
+HOME_LOCATIONS = 6
+HOME_SENSORS_PER_LOCATION = 4
+HOME_EVENTS = 3000
+HOME_SEED = 0
+
+
+@pytest.fixture(scope='session')
+def home_dir(tmp_path_factory):
+    """ Directory holding the data file and the config file of the home.
+    """
+    directory = str(tmp_path_factory.mktemp('homes'))
+    config = random_home_config(
+        HOME_LOCATIONS, sensors_per_location=HOME_SENSORS_PER_LOCATION,
+        seed=HOME_SEED, datapath=HOME_NAME + '/ann.txt')
+    write_home(HOME_NAME, config, directory,
+               os.path.join(directory, 'homes.json'), num_events=HOME_EVENTS,
+               seed=HOME_SEED, activity_duration=(10., 60.))
+    return directory
+
+
+@pytest.fixture(scope='session')
+def home_config(home_dir):
+    with open(os.path.join(home_dir, 'homes.json')) as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='session')
+def dataset(home_dir, home_config):
+    return HHDataset(HOME_NAME, home_dir, config=home_config)
+
+
+@pytest.fixture(scope='session')
+def ontology(dataset):
+    return FakeHomeOntology(dataset, lightweight=True)
+
+
+@pytest.fixture(scope='session')
+def graph(ontology):
+    return FakeHomeGraph(ontology)
+
+
+@pytest.fixture
+def copy_home(dataset, home_config, tmp_path):
+    """ Returns a function copying the data file of the home to a new
+        directory, with the given compression ('gz' or 'zip'), and returning
+        the HHDataset of the copy. The copy can be modified freely.
+
+        Tests building another ontology of the home use a copy: ontologies
+        of the same data file share their individuals in the default world.
+    """
+    def copy(compression=None, name=HOME_NAME):
+        config = {name: dict(home_config[HOME_NAME], datapath='%s/ann.txt' % (name,))}
+        directory = tmp_path / name
+        directory.mkdir()
+        source = dataset.filepath
+        if compression is None:
+            shutil.copyfile(source, str(directory / 'ann.txt'))
+        elif compression == 'gz':
+            with open(source, 'rb') as f, \
+                    gzip.open(str(directory / 'ann.txt.gz'), 'wb') as g:
+                shutil.copyfileobj(f, g)
+        elif compression == 'zip':
+            # Member of an archive named after the data file directory
+            directory.rmdir()
+            with zipfile.ZipFile(str(tmp_path / (name + '.zip')), 'w') as z:
+                z.write(source, 'ann.txt')
+        return HHDataset(name, str(tmp_path), config=config)
+
+    return copy
+
+
+def event_tuples(events):
+    """ Returns the (sensor name, value, timestamp) of the measures and the
+        (class name, state, timestamp) of the activities of a slice, to
+        compare records and individuals.
+    """
+    measures = [(m.is_measured_by.name, m.value, m.timestamp)
+                for m in events['sensor_events']]
+    activities = []
+    for activity in events['activity_events']:
+        if hasattr(activity, 'state'):
+            activities.append((activity.type.name, activity.state.python_name,
+                               activity.timestamp))
+        else:
+            for state in ('begins_at', 'ends_at', 'timestamp'):
+                timestamp = getattr(activity, state, None)
+                if timestamp is not None:
+                    activities.append((type(activity).name, state, timestamp))
+    return measures, activities
@@ -0,0 +1,70 @@
+import sys
+
+import numpy as np
+import pytest
+
+from fakehome.core import ChangePointTensor
+
+ChangePointModule = sys.modules['fakehome.core.ChangePointTensor']
+
+
+def random_piecewise_constant(N=4, F=3, T=200, changes=150, seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.empty((N, F, T))
+    X[:] = rng.random((N, F))[:, :, None]
+    for t, n, f in zip(rng.integers(1, T, changes), rng.integers(0, N, changes),
+                       rng.integers(0, F, changes)):
+        X[n, f, t:] = rng.random()
+    return X
+
+
+@pytest.fixture(autouse=True)
+def small_checkpoints(monkeypatch):
+    # state_at() replays from several checkpoints
+    monkeypatch.setattr(ChangePointModule, 'CHECKPOINT_INTERVAL', 16)
+
+
+def test_dense_round_trip():
+    X = random_piecewise_constant()
+    C = ChangePointTensor.from_dense(X)
+
+    assert C.shape == X.shape and len(C) == X.shape[2]
+    np.testing.assert_array_equal(C.to_dense(), X)
+    for start, stop in [(0, 1), (17, 93), (150, 200), (199, 500), (50, 50)]:
+        np.testing.assert_array_equal(C.to_dense(start, stop), X[:, :, start:stop])
+    for t in (0, 1, 15, 16, 17, 100, 199):
+        np.testing.assert_array_equal(C.state_at(t), X[:, :, t])
+    np.testing.assert_array_equal(np.stack(list(C), axis=2), X)
+    np.testing.assert_array_equal(
+        np.concatenate(list(C.iter_windows(64)), axis=2), X)
+    assert C.nbytes < X.nbytes
+
+
+def test_empty_tensor():
+    C = ChangePointTensor.from_dense(np.zeros((2, 3, 0)))
+    assert C.shape == (2, 3, 0)
+    assert C.to_dense().shape == (2, 3, 0)
+
+
+def test_unsorted_change_points():
+    C = ChangePointTensor(np.zeros((1, 1)), [5, 2], [0, 0], [0, 0], [2., 1.])
+    np.testing.assert_array_equal(C.to_dense()[0, 0], [0, 0, 1, 1, 1, 2])
+
+
+def test_wrong_initial_state():
+    with pytest.raises(AttributeError):
+        ChangePointTensor(np.zeros(3), [], [], [], [])
+
+
+def test_events_to_change_points(ontology, graph):
+    events = ontology.read_data(1000, 0)
+    X = graph.events_to_nodes_features(events)
+    C = graph.events_to_change_points(events)
+    np.testing.assert_array_equal(C.to_dense(), X)
+
+    # Continuing from the last state of the previous slice
+    following = ontology.read_data(500, 1000)
+    state = X[:, :, -1]
+    np.testing.assert_array_equal(
+        graph.events_to_change_points(following, state).to_dense(),
+        graph.events_to_nodes_features(following, state))
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pytest
+
+from fakehome.core import DatasetCache, EVENT_COLUMNS, LineIndex
+
+
+def parse(dataset):
+    return dataset.apply_lines_pattern(LineIndex(dataset.filepath).read_lines())
+
+
+def assert_same_columns(columns, expected):
+    for name, dtype in EVENT_COLUMNS:
+        assert columns[name].dtype == dtype
+        np.testing.assert_array_equal(columns[name], expected[name])
+
+
+def test_round_trip(copy_home):
+    dataset = copy_home()
+    cache = DatasetCache(dataset)
+    columns = cache.load()
+
+    assert_same_columns(columns, parse(dataset))
+    assert isinstance(columns['timestamp'], np.memmap)
+    assert cache.vocabularies['sensor_list'] == dataset.sensor_list
+    assert sorted(os.listdir(cache.cache_dir)) == sorted([cache.key, 'source.json'])
+
+
+def test_up_to_date_entry_is_not_rebuilt(copy_home, monkeypatch):
+    dataset = copy_home()
+    expected = DatasetCache(dataset).load()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The cache was rebuilt.")
+    monkeypatch.setattr(DatasetCache, 'build', fail)
+    assert_same_columns(DatasetCache(dataset).load(), expected)
+
+
+def test_modified_file_invalidates_entry(copy_home):
+    dataset = copy_home()
+    cache = DatasetCache(dataset)
+    cache.load()
+    old_key = cache.key
+
+    with open(dataset.filepath) as f:
+        lines = f.readlines()
+    with open(dataset.filepath, 'a') as f:
+        f.writelines(lines[:10])
+
+    columns = DatasetCache(dataset).load()
+    assert cache.key != old_key
+    assert len(columns['timestamp']) == len(lines) + 10
+    assert not os.path.exists(os.path.join(cache.cache_dir, old_key))
+
+
+def test_rebuild_replaces_entry(copy_home):
+    dataset = copy_home()
+    cache = DatasetCache(dataset)
+    expected = parse(dataset)
+    cache.load()
+    assert_same_columns(cache.load(rebuild=True), expected)
+    assert not [name for name in os.listdir(cache.cache_dir)
+                if name.endswith('.tmp')]
+
+
+def test_wrong_dataset():
+    with pytest.raises(AttributeError):
+        DatasetCache('hh101')
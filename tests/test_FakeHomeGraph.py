@@ -0,0 +1,295 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from fakehome.core import ChangePointTensor, FakeHomeGraph, adjacency_from_ontology
+from fakehome.core.FakeHomeGraph import LOCATIONS_LAYER_HEIGHT, normalize_adjacency, \
+    window_view
+from fakehome.core.Timestamps import as_timestamps
+
+
+def reference_normalization(A, symmetric=True):
+    # Normalization with the pseudo-inverse of the dense degree matrix
+    D_1 = np.linalg.pinv(np.diag(A.sum(axis=0)))
+    if symmetric:
+        D_12 = np.sqrt(D_1)
+        return D_12 @ A @ D_12
+    return D_1 @ A
+
+
+def test_adjacency(ontology, graph):
+    A, sensors, locations = adjacency_from_ontology(ontology)
+    dense, _, _ = adjacency_from_ontology(ontology, dense=True)
+
+    assert sp.issparse(A)
+    np.testing.assert_array_equal(A.toarray(), dense)
+    np.testing.assert_array_equal(dense, dense.T)
+    assert set(np.unique(dense)) == {0, 1}
+    # Each sensor is only adjacent to its location
+    nsensors = len(sensors)
+    np.testing.assert_array_equal(dense[:nsensors, :nsensors], 0)
+    np.testing.assert_array_equal(dense[:nsensors].sum(axis=1), 1)
+
+    np.testing.assert_array_equal(graph.adjacency.toarray(), dense)
+    assert graph.number_of_nodes() == len(sensors) + len(locations)
+    assert graph.number_of_edges() == np.triu(dense).sum()
+
+
+@pytest.mark.parametrize('symmetric', [True, False])
+def test_normalization_matches_dense_reference(graph, symmetric):
+    A = graph.adjacency.toarray()
+    expected = reference_normalization(A, symmetric)
+
+    sparse = normalize_adjacency(graph.adjacency, symmetric)
+    assert sp.issparse(sparse)
+    np.testing.assert_allclose(sparse.toarray(), expected, atol=1e-12)
+    np.testing.assert_allclose(normalize_adjacency(A, symmetric), expected, atol=1e-12)
+
+
+def test_normalization_of_isolated_nodes():
+    A = np.array([[0, 1, 0], [1, 0, 0], [0, 0, 0]], dtype=np.float64)
+    for M in (A, sp.csr_matrix(A)):
+        N = normalize_adjacency(M)
+        N = N.toarray() if sp.issparse(N) else N
+        np.testing.assert_allclose(N, reference_normalization(A))
+        assert np.isfinite(N).all()
+
+
+def test_symnorm_adjacency_and_laplacian(graph):
+    expected = reference_normalization(graph.adjacency.toarray())
+    np.testing.assert_allclose(graph.symnorm_adjacency.toarray(), expected, atol=1e-12)
+    np.testing.assert_allclose(graph.normalized_laplacian.toarray(),
+                               np.eye(graph.N) - expected, atol=1e-12)
+
+
+def per_time_step_propagation(operator, X, hops):
+    # One matmul per time step and per hop
+    out = np.empty(X.shape)
+    for t in range(X.shape[2]):
+        H = X[:, :, t]
+        for _ in range(hops):
+            H = operator @ H
+        out[:, :, t] = H
+    return out
+
+
+@pytest.fixture(scope='module')
+def features(ontology, graph):
+    return graph.events_to_nodes_features(ontology.read_data(600, 0))
+
+
+@pytest.mark.parametrize('hops', [1, 2])
+@pytest.mark.parametrize('chunk_size', [None, 1, 64])
+def test_propagate_matches_per_time_step_loop(graph, features, hops, chunk_size):
+    expected = per_time_step_propagation(
+        graph.symnorm_adjacency.toarray(), features, hops)
+    np.testing.assert_allclose(
+        graph.propagate(features, hops, chunk_size=chunk_size), expected, atol=1e-12)
+
+
+def test_propagate_inputs(graph, features):
+    expected = graph.propagate(features, hops=2)
+    C = ChangePointTensor.from_dense(features)
+    np.testing.assert_allclose(graph.propagate(C, hops=2, chunk_size=100), expected)
+    np.testing.assert_allclose(
+        np.concatenate(list(graph.iter_propagate(
+            np.array_split(features, 7, axis=2), hops=2)), axis=2), expected)
+
+    laplacian = graph.normalized_laplacian
+    np.testing.assert_allclose(
+        graph.propagate(features, operator=laplacian),
+        per_time_step_propagation(laplacian.toarray(), features, 1), atol=1e-12)
+    assert graph.propagate(features[:, :, :0]).shape == features[:, :, :0].shape
+
+
+def test_iter_data_matches_read_data(ontology, graph):
+    expected = graph.read_data(1000, 200)
+    chunks = list(graph.iter_data(300, 1000, 200))
+    assert [X.shape[2] for X in chunks] == [
+        len(b['sensor_events']) for b in ontology.iter_events(300, 1000, 200)]
+    np.testing.assert_array_equal(np.concatenate(chunks, axis=2), expected)
+
+
+def per_event_features(graph, events, initial_state):
+    # Each time step copies the previous one and applies its event
+    names = [graph.nodes[i]['name'] for i in range(graph.nsensors)]
+    X = np.empty((graph.N, graph.F, len(events['sensor_events'])))
+    state = initial_state.copy()
+    for t, measure in enumerate(events['sensor_events']):
+        i = names.index(measure.is_measured_by.name)
+        j = graph.features_list.index(type(measure.is_measured_by))
+        state[i, j] = measure.value
+        X[:, :, t] = state
+    return X
+
+
+def test_features_match_per_event_loop(ontology, graph, features):
+    events = ontology.read_data(600, 0)
+    # Sensors at zero and one-hot location classes
+    initial_state = np.zeros((graph.N, graph.F))
+    for i in range(graph.nsensors, graph.N):
+        initial_state[i, graph.features_list.index(
+            type(graph.nodes[i]['instance']))] = 1
+    np.testing.assert_array_equal(
+        features, per_event_features(graph, events, initial_state))
+
+    following = ontology.read_data(300, 600)
+    np.testing.assert_array_equal(
+        graph.events_to_nodes_features(following, features[:, :, -1]),
+        per_event_features(graph, following, features[:, :, -1]))
+
+    with pytest.raises(AttributeError):
+        graph.events_to_nodes_features([])
+
+
+@pytest.mark.parametrize('window_size, stride', [(1, 1), (50, 7), (600, 1), (601, 1)])
+def test_window_view(features, window_size, stride):
+    windows = window_view(features, window_size, stride)
+    starts = range(0, features.shape[2] - window_size + 1, stride)
+    assert len(windows) == len(starts)
+    for window, start in zip(windows, starts):
+        np.testing.assert_array_equal(window, features[:, :, start:start + window_size])
+    assert not windows.flags.writeable
+
+
+def test_iter_minibatches(graph, features, tmp_path):
+    windows = window_view(features, 50, 7)
+    batches = list(graph.iter_minibatches(50, 7, batch_size=16, data=features))
+    assert [len(b) for b in batches] == [16] * 4 + [len(windows) - 64]
+    np.testing.assert_array_equal(np.concatenate(batches), windows)
+    assert len(list(graph.iter_minibatches(
+        50, 7, batch_size=16, drop_last=True, data=features))) == 4
+
+    # Shuffled windows are the same windows, in a seeded order
+    shuffled = np.concatenate(list(graph.iter_minibatches(
+        50, 7, batch_size=16, shuffle=True, seed=0, data=features)))
+    again = np.concatenate(list(graph.iter_minibatches(
+        50, 7, batch_size=16, shuffle=True, seed=0, data=features)))
+    np.testing.assert_array_equal(shuffled, again)
+    order = [next(i for i, w in enumerate(windows) if np.array_equal(w, s))
+             for s in shuffled]
+    assert sorted(order) == list(range(len(windows)))
+
+    # Memory-mapped and change-point data
+    path = str(tmp_path / 'features.npy')
+    np.save(path, features)
+    C = ChangePointTensor.from_dense(features)
+    for data, shuffle in [(path, False), (C, False), (C, True)]:
+        np.testing.assert_array_equal(np.concatenate(list(graph.iter_minibatches(
+            50, 7, batch_size=16, shuffle=shuffle, seed=0, data=data))),
+            shuffled if shuffle else windows)
+
+
+@pytest.mark.parametrize('arguments', [
+    dict(window_size=0), dict(window_size=10, stride=0),
+    dict(window_size=-1, stride=-1), dict(window_size=10, batch_size=0)])
+def test_wrong_windows(graph, features, arguments):
+    with pytest.raises(ValueError):
+        next(graph.iter_minibatches(data=features, **arguments))
+    if 'batch_size' not in arguments:
+        with pytest.raises(ValueError):
+            window_view(features, **arguments)
+    with pytest.raises(AttributeError):
+        next(graph.iter_minibatches(10, data=features[1:]))
+
+
+def binned_reference(graph, events, features, bin_size, aggregation):
+    # Bins computed from the state after each event
+    measures = events['sensor_events']
+    timestamps = as_timestamps([m.timestamp for m in measures])
+    names = [graph.nodes[i]['name'] for i in range(graph.nsensors)]
+    initial_state = features[:, :, 0].copy()
+    initial_state[:graph.nsensors] = 0
+
+    bin_ns = int(bin_size * 10 ** 9)
+    edges = np.arange(timestamps[0], timestamps[-1] + 1, bin_ns)
+    X = np.empty((graph.N, graph.F, len(edges)))
+    for b, begin in enumerate(edges):
+        i, j = np.searchsorted(timestamps, [begin, begin + bin_ns])
+        if aggregation == 'last':
+            X[:, :, b] = features[:, :, j - 1] if j else initial_state
+        elif aggregation == 'max':
+            before = features[:, :, i - 1] if i else initial_state
+            X[:, :, b] = np.dstack([before[:, :, None], features[:, :, i:j]]).max(axis=2)
+        else:
+            X[:, :, b] = initial_state
+            X[:graph.nsensors, :, b] = 0
+            for measure in measures[i:j]:
+                sensor = measure.is_measured_by
+                X[names.index(sensor.name),
+                  graph.features_list.index(type(sensor)), b] += 1
+    return X
+
+
+@pytest.mark.parametrize('aggregation', ['last', 'max', 'count'])
+@pytest.mark.parametrize('chunk_bins', [1, 7, 4096])
+def test_binned_features(ontology, graph, features, aggregation, chunk_bins):
+    events = ontology.read_data(600, 0)
+    expected = binned_reference(graph, events, features, 10., aggregation)
+    chunks = list(graph.iter_binned_features(
+        10., aggregation, events=events, chunk_bins=chunk_bins))
+    assert max(X.shape[2] for X in chunks) <= chunk_bins
+    np.testing.assert_array_equal(np.concatenate(chunks, axis=2), expected)
+
+    # Same bins from the event columns of the same lines
+    np.testing.assert_array_equal(graph.binned_features(
+        10., aggregation, columns=ontology.read_columns(600, 0)), expected)
+
+
+def test_binned_features_range(ontology, graph):
+    columns = ontology.read_columns()
+    X = graph.binned_features(60., columns=columns)
+    start = columns['timestamp'][0] + 5 * 60 * 10 ** 9
+    window = graph.binned_features(60., columns=columns, start=start,
+                                   stop=start + 10 * 60 * 10 ** 9)
+    np.testing.assert_array_equal(window, X[:, :, 5:15])
+
+    with pytest.raises(AttributeError):
+        graph.binned_features(0, columns=columns)
+    with pytest.raises(AttributeError):
+        graph.binned_features(60., 'mean', columns=columns)
+
+
+def test_cached_layouts(graph, tmp_path, monkeypatch):
+    FakeHomeGraphModule = sys.modules['fakehome.core.FakeHomeGraph']
+    monkeypatch.setattr(FakeHomeGraphModule, '_layouts', {})
+    layout_dir = str(tmp_path)
+
+    pos = graph.layout(2, layout_dir)
+    assert sorted(pos) == list(range(graph.N))
+    pos3d = graph.layout(3, layout_dir)
+    assert all(pos3d[v][:2] == pos[v] for v in pos)
+    assert set(z for _, _, z in pos3d.values()) == {0., LOCATIONS_LAYER_HEIGHT}
+    assert os.listdir(layout_dir) == [graph.topology_key + '.json']
+
+    # The layouts are loaded from the file in a new process
+    monkeypatch.setattr(FakeHomeGraphModule, '_layouts', {})
+    monkeypatch.setattr(type(graph), '_compute_layout', None)
+    assert graph.layout(2, layout_dir) == pos
+    assert graph.layout(3, layout_dir) == pos3d
+
+    with pytest.raises(AttributeError):
+        graph.layout(4, layout_dir)
+
+
+@pytest.mark.parametrize('dtype, binary_dtype, sparse', [
+    (np.float32, np.uint8, np.float32),
+    (np.float16, None, np.float32),
+    (np.float64, None, np.float64)])
+def test_compact_dtypes(ontology, graph, features, dtype, binary_dtype, sparse):
+    compact = FakeHomeGraph(ontology, dtype=dtype, binary_dtype=binary_dtype)
+    binary_dtype = binary_dtype or sparse
+    assert compact.dtype == dtype
+    assert compact.adjacency.dtype == binary_dtype
+    np.testing.assert_array_equal(compact.adjacency.toarray(), graph.adjacency.toarray())
+    assert compact.symnorm_adjacency.dtype == sparse
+    assert compact.normalized_laplacian.dtype == sparse
+
+    X = compact.events_to_nodes_features(ontology.read_data(600, 0))
+    assert X.dtype == dtype
+    np.testing.assert_array_equal(X, features.astype(dtype))
+    assert compact.propagate(X).dtype == dtype
+    assert compact.binned_features(60., events=ontology.read_data(600, 0)).dtype == dtype
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pytest
+
+from fakehome import FakeHomeOntology, FakeHomeGraph, FakeHomeGraphBatch
+from fakehome.generators import random_home_config, write_home
+
+
+@pytest.fixture(scope='module')
+def other_graph(tmp_path_factory):
+    # A home with other locations and sensors
+    directory = str(tmp_path_factory.mktemp('other'))
+    config = random_home_config(4, sensors_per_location=(1, 3), seed=1,
+                                datapath='other/ann.txt')
+    dataset = write_home('other', config, directory,
+                         os.path.join(directory, 'homes.json'),
+                         num_events=500, seed=1)
+    return FakeHomeGraph(FakeHomeOntology(dataset, lightweight=True))
+
+
+def test_block_diagonal_batch(graph, other_graph):
+    batch = FakeHomeGraphBatch([graph, other_graph])
+    assert len(batch) == 2
+    assert batch.N == graph.N + other_graph.N
+    np.testing.assert_array_equal(batch.offsets, [0, graph.N, batch.N])
+    np.testing.assert_array_equal(batch.node_home, [0] * graph.N + [1] * other_graph.N)
+    assert batch.features_list == sorted(set(
+        cls.name for g in (graph, other_graph) for cls in g.features_list))
+
+    A = batch.adjacency.toarray()
+    np.testing.assert_array_equal(A[:graph.N, :graph.N], graph.adjacency.toarray())
+    np.testing.assert_array_equal(A[graph.N:, graph.N:], other_graph.adjacency.toarray())
+    np.testing.assert_array_equal(A[:graph.N, graph.N:], 0)
+
+
+def test_batch_propagation(graph, other_graph):
+    batch = FakeHomeGraphBatch([graph, other_graph])
+    tensors = [g.binned_features(60., start='2012-07-20 00:00:00.000000',
+                                 stop='2012-07-20 01:00:00.000000')
+               for g in (graph, other_graph)]
+    X = batch.stack(tensors)
+    assert X.shape == (batch.N, batch.F, 60)
+
+    for i, (g, part) in enumerate(zip((graph, other_graph), batch.split(X))):
+        np.testing.assert_array_equal(part, batch.align(i, tensors[i]))
+    for i, (g, part) in enumerate(zip((graph, other_graph),
+                                      batch.split(batch.propagate(X, hops=2)))):
+        np.testing.assert_allclose(
+            part, batch.align(i, g.propagate(tensors[i], hops=2)), atol=1e-12)
+
+    with pytest.raises(AttributeError):
+        batch.stack(tensors[:1])
+    with pytest.raises(AttributeError):
+        batch.stack([tensors[0], tensors[1][:, :, :10]])
+
+
+def test_wrong_batch(graph, other_graph):
+    with pytest.raises(AttributeError):
+        FakeHomeGraphBatch([graph, 'hh101'])
+    with pytest.raises(AttributeError):
+        FakeHomeGraphBatch([graph, other_graph], features_list=['MotionSensor'])
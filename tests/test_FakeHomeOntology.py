@@ -0,0 +1,177 @@
+import numpy as np
+import pytest
+
+from fakehome import FakeHomeOntology
+from fakehome.core import ActivityRecord, Measure, MeasureRecord
+
+from conftest import event_tuples
+
+
+@pytest.fixture
+def cached_ontology(copy_home):
+    return FakeHomeOntology(copy_home(), lightweight=True, cache_max_lines=500)
+
+
+def uncached_read(ontology, window_size, starting_line):
+    ontology.clear_cache()
+    return ontology.read_data(window_size, starting_line)
+
+
+def test_cached_windows_match_direct_reads(cached_ontology, ontology):
+    rng = np.random.default_rng(0)
+    for _ in range(30):
+        starting_line = int(rng.integers(0, 2800))
+        window_size = int(rng.integers(1, 3000 - starting_line))
+        events = cached_ontology.read_data(window_size, starting_line)
+        assert (events['start'], events['stop']) == \
+            (starting_line, starting_line + window_size)
+        assert event_tuples(events) == event_tuples(
+            uncached_read(ontology, window_size, starting_line))
+
+    info = cached_ontology.cache_info()
+    assert info['hits'] > 0
+    assert info['lines'] <= info['max_lines'] + 3000
+
+
+def test_overlapping_windows_are_reused(copy_home):
+    ontology = FakeHomeOntology(copy_home(), lightweight=True, cache_max_lines=3000)
+    ontology.read_data(1000, 0)
+    ontology.read_data(1000, 500)
+
+    info = ontology.cache_info()
+    assert (info['hits'], info['misses']) == (500, 1500)
+    # The window and the lines before it, not fragmented
+    assert (info['segments'], info['lines']) == (2, 1500)
+
+    # Sliding forward merges the lines left behind
+    ontology.read_data(1000, 1000)
+    info = ontology.cache_info()
+    assert (info['segments'], info['lines']) == (2, 2000)
+
+
+def test_cache_budget(copy_home):
+    ontology = FakeHomeOntology(copy_home(), lightweight=True, cache_max_lines=0)
+    ontology.read_data(100, 0)
+    ontology.read_data(100, 1000)
+    info = ontology.cache_info()
+    # Only the current window is kept
+    assert (info['segments'], info['lines']) == (1, 100)
+
+    ontology.clear_cache()
+    assert ontology.cache_info()['segments'] == 0
+
+
+def test_evicted_individuals_are_destroyed(copy_home, ontology):
+    cached = FakeHomeOntology(copy_home(), cache_max_lines=100)
+    measure = cached.onto_class(Measure)
+
+    def num_measures():
+        return len(list(cached.working_ontology.search(type=measure)))
+
+    events = cached.read_data(100, 0)
+    assert event_tuples(events) == event_tuples(ontology.read_data(100, 0))
+    cached.read_data(100, 100)
+    assert num_measures() == 200
+    cached.read_data(100, 1000)
+    assert num_measures() == 200
+    cached.clear_cache()
+    assert num_measures() == 0
+
+
+@pytest.mark.parametrize('batch_size', [1, 333, 5000])
+def test_iter_events_matches_read_data(ontology, batch_size):
+    batches = list(ontology.iter_events(batch_size, 1000, 500))
+    assert [b['start'] for b in batches] == list(range(500, 1500, batch_size))
+    assert batches[-1]['stop'] == 1500
+
+    merged = {
+        'sensor_events': sum((b['sensor_events'] for b in batches), []),
+        'activity_events': sum((b['activity_events'] for b in batches), []),
+    }
+    assert event_tuples(merged) == event_tuples(ontology.read_data(1000, 500))
+
+
+def test_records_and_individuals(copy_home, ontology, graph):
+    records = ontology.read_data(300, 0)
+    assert all(isinstance(e, MeasureRecord) for e in records['sensor_events'])
+    assert all(isinstance(e, ActivityRecord) for e in records['activity_events'])
+    assert records['activity_events']
+
+    individuals = FakeHomeOntology(copy_home()).read_data(300, 0)
+    assert event_tuples(individuals) == event_tuples(records)
+
+    materialized = ontology.materialize(records)
+    assert all(isinstance(e, ontology.onto_class(Measure))
+               for e in materialized['sensor_events'])
+    assert event_tuples(materialized) == event_tuples(records)
+    np.testing.assert_array_equal(graph.events_to_nodes_features(materialized),
+                                  graph.events_to_nodes_features(records))
+
+
+def count_measures(ontology):
+    return ontology.query('SELECT (COUNT(?m) AS ?c) WHERE { ?m a ?? }',
+                          ontology.onto_class(Measure))[0][0]
+
+
+def test_ingest(copy_home, tmp_path):
+    dataset = copy_home()
+    world_path = str(tmp_path / 'world.sqlite')
+    with open(dataset.filepath) as f:
+        lines = f.readlines()
+
+    with FakeHomeOntology(dataset, world_path=world_path) as persistent:
+        assert persistent.ingest(batch_size=1000) == len(lines)
+        assert persistent.ingested_lines == len(lines)
+        assert count_measures(persistent) == len(
+            dataset.apply_lines_pattern(lines)['sensor'])
+        # Windows of a persistent world are records, not saved with it
+        assert isinstance(persistent.read_data(100)['sensor_events'][0], MeasureRecord)
+
+    # Only the appended lines are ingested
+    with open(dataset.filepath, 'a') as f:
+        f.writelines(lines[:10])
+    with FakeHomeOntology(dataset, world_path=world_path) as persistent:
+        assert persistent.ingest() == 10
+        assert count_measures(persistent) == len(
+            dataset.apply_lines_pattern(lines + lines[:10])['sensor'])
+        assert persistent.ingest() == 0
+
+    # Lines already ingested cannot change
+    with open(dataset.filepath, 'w') as f:
+        f.writelines(lines[:100])
+    with FakeHomeOntology(dataset, world_path=world_path) as persistent:
+        with pytest.raises(AssertionError):
+            persistent.ingest()
+
+
+def test_ingest_matches_individuals(copy_home, tmp_path):
+    dataset = copy_home()
+    world_path = str(tmp_path / 'world.sqlite')
+    with FakeHomeOntology(dataset, world_path=world_path) as persistent:
+        persistent.ingest()
+        measures = persistent.onto_class(Measure).instances(world=persistent.world)
+        ingested = sorted((m.is_measured_by.name, m.value, m.timestamp)
+                          for m in measures)
+    expected, _ = event_tuples(FakeHomeOntology(
+        copy_home(name='reference'), lightweight=True).read_data())
+    assert ingested == sorted(expected)
+
+
+def test_copied_world(copy_home, tmp_path):
+    dataset = copy_home()
+    world_path = str(tmp_path / 'world.sqlite')
+    with FakeHomeOntology(dataset, world_path=world_path) as persistent:
+        persistent.ingest()
+        expected = count_measures(persistent)
+
+    copied = FakeHomeOntology(dataset, world_path=world_path, copy_world=True)
+    # The file is not locked by the copy
+    with FakeHomeOntology(dataset, world_path=world_path) as persistent:
+        assert count_measures(persistent) == expected
+    assert count_measures(copied) == expected
+    copied.close()
+
+
+def test_ingest_requires_persistent_world(ontology):
+    with pytest.raises(AttributeError):
+        ontology.ingest()
@@ -0,0 +1,73 @@
+import numpy as np
+
+from fakehome.core import NO_ACTIVITY
+from fakehome.core.Timestamps import as_timestamps
+
+
+def per_line_columns(dataset, lines):
+    # Columns built from apply_line_pattern(), skipping the lines it rejects
+    # like FakeHomeOntology does
+    sensor_index = {name: i for i, name in enumerate(dataset.sensor_list)}
+    activity_index = {name: i for i, name in enumerate(dataset.activity_list)}
+    state_index = {dataset.activity_state_mapping(state): i
+                   for i, state in enumerate(dataset.activity_state_list)}
+    rows = []
+    for line in lines:
+        try:
+            event = dataset.apply_line_pattern(line)
+            sensor = sensor_index[event['sensor']['name']]
+        except (KeyError, AttributeError, ValueError):
+            continue
+        activity = activity_state = NO_ACTIVITY
+        if event['activity'] is not None:
+            activity = activity_index[event['activity']['name']]
+            activity_state = state_index[event['activity']['state']]
+        rows.append((as_timestamps([event['timestamp']])[0], sensor,
+                     event['sensor']['state'], activity, activity_state))
+    return [np.array(column) for column in zip(*rows)]
+
+
+def test_columnar_parse_matches_per_line(dataset):
+    with open(dataset.filepath) as f:
+        lines = f.readlines()
+    columns = dataset.apply_lines_pattern(lines)
+
+    assert len(columns['timestamp']) == len(lines)
+    expected = per_line_columns(dataset, lines)
+    for name, column in zip(('timestamp', 'sensor', 'value', 'activity',
+                             'activity_state'), expected):
+        np.testing.assert_array_equal(columns[name], column.astype(columns[name].dtype))
+    assert (columns['activity'] != NO_ACTIVITY).any()
+
+
+def test_columnar_parse_skips_bad_lines(dataset):
+    with open(dataset.filepath) as f:
+        lines = f.readlines()[:20]
+    sensor = dataset.sensor_list[0]
+    bad_lines = [
+        'not an event\n',
+        '2012-07-20 00:00:01.000000 ZZ999 ON\n',
+        '2012-07-20 00:00:01.000000 %s DIMMED\n' % (sensor,),
+    ]
+    columns = dataset.apply_lines_pattern(bad_lines[:2] + lines + bad_lines[2:])
+
+    np.testing.assert_array_equal(
+        columns['timestamp'], dataset.apply_lines_pattern(lines)['timestamp'])
+    expected = per_line_columns(dataset, bad_lines + lines)
+    np.testing.assert_array_equal(columns['sensor'], expected[1])
+
+
+def test_mapping_tables_match_mappings(dataset):
+    # The precompiled tables give the classes of the mapping functions
+    with open(dataset.filepath) as f:
+        lines = f.readlines()
+    seen_activities = set()
+    for line in lines:
+        event = dataset.apply_line_pattern(line)
+        assert event['sensor']['type'] is dataset.sensor_name_mapping(
+            event['sensor']['name'])
+        if event['activity'] is not None:
+            name = event['activity']['name']
+            seen_activities.add(name)
+            assert event['activity']['type'] is dataset.activity_type_mapping(name)
+    assert seen_activities
@@ -0,0 +1,54 @@
+import os
+import json
+
+import numpy as np
+import pytest
+
+from fakehome import HHRegistry
+from fakehome.datasets.HHRegistry import world_path
+
+
+@pytest.fixture
+def homes(copy_home, tmp_path):
+    # Two copies of the home and a home without data file
+    configs = {}
+    for name in ('first', 'second'):
+        configs[name] = copy_home(name=name).dataset_conf
+    configs['missing'] = dict(configs['first'], datapath='missing/ann.txt')
+    config_file = str(tmp_path / 'homes.json')
+    with open(config_file, 'w') as f:
+        json.dump(configs, f)
+    return str(tmp_path), config_file
+
+
+def assert_same_graph(graph, other):
+    assert (graph.adjacency != other.adjacency).nnz == 0
+    assert [c.name for c in graph.features_list] == \
+        [c.name for c in other.features_list]
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_load(homes, dataset, graph, processes):
+    with open(dataset.filepath) as f:
+        columns = dataset.apply_lines_pattern(f.readlines())
+    registry = HHRegistry(['first', 'second', 'missing'], *homes)
+    handles = registry.load(processes=processes)
+
+    assert handles['missing'].error is not None
+    assert handles['missing'].graph is None
+    for name in ('first', 'second'):
+        handle = handles[name]
+        assert handle.error is None
+        assert registry[name] is handle
+        np.testing.assert_array_equal(handle.columns['sensor'], columns['sensor'])
+        assert_same_graph(handle.graph, graph)
+        np.testing.assert_array_equal(handle.graph.read_data(200), graph.read_data(200))
+        # Worker processes build the ontologies in persistent worlds
+        assert os.path.isfile(world_path(handle.dataset)) == (processes > 1)
+
+
+def test_wrong_arguments(homes):
+    with pytest.raises(KeyError):
+        HHRegistry(['first', 'unknown'], *homes)
+    with pytest.raises(AttributeError):
+        HHRegistry('first', *homes).load(processes=0)
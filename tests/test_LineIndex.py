@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+
+from fakehome.core import LineIndex
+from fakehome.core.LineIndex import INDEX_SUFFIX
+
+
+def reference_offsets(path):
+    offsets = [0]
+    with open(path, 'rb') as f:
+        for line in f:
+            offsets.append(offsets[-1] + len(line))
+    return offsets
+
+
+def test_offsets_and_windows(copy_home):
+    path = copy_home().filepath
+    with open(path) as f:
+        lines = f.readlines()
+
+    index = LineIndex(path)
+    assert len(index) == len(lines)
+    np.testing.assert_array_equal(index.offsets, reference_offsets(path))
+    for start, stop in [(0, 1), (10, 20), (2999, 3000), (100, 100), (2990, 5000)]:
+        assert index.read_lines(start, stop) == lines[start:stop]
+
+
+def test_persisted_index(copy_home, monkeypatch):
+    path = copy_home().filepath
+    offsets = LineIndex(path).offsets
+    assert os.path.isfile(path + INDEX_SUFFIX)
+
+    def fail(self):
+        raise AssertionError("The index was rebuilt.")
+    monkeypatch.setattr(LineIndex, '_build', fail)
+    np.testing.assert_array_equal(LineIndex(path).offsets, offsets)
+
+
+def test_outdated_index_is_rebuilt(copy_home):
+    path = copy_home().filepath
+    LineIndex(path)
+    with open(path) as f:
+        lines = f.readlines()
+    with open(path, 'w') as f:
+        f.writelines(lines[:100])
+
+    index = LineIndex(path)
+    assert len(index) == 100
+    assert index.read_lines(90) == lines[90:100]
+
+
+def test_refresh_after_append(copy_home):
+    path = copy_home().filepath
+    with open(path) as f:
+        lines = f.readlines()
+    index = LineIndex(path)
+
+    # A partial last line is completed by the next append
+    with open(path, 'a') as f:
+        f.write(lines[0] + lines[1][:10])
+    assert index.refresh() == len(lines) + 2
+    with open(path, 'a') as f:
+        f.write(lines[1][10:])
+    assert index.refresh() == len(lines) + 2
+
+    np.testing.assert_array_equal(index.offsets, reference_offsets(path))
+    assert index.read_lines(len(lines)) == lines[:2]
+    np.testing.assert_array_equal(LineIndex(path).offsets, index.offsets)
@@ -0,0 +1,86 @@
+import os
+import threading
+
+import pytest
+
+from fakehome import FakeHomeOntology
+from fakehome.core import LogFollower, MeasureRecord
+
+from conftest import event_tuples
+
+
+@pytest.fixture
+def followed(copy_home):
+    dataset = copy_home()
+    with open(dataset.filepath) as f:
+        lines = f.readlines()
+    return dataset, lines
+
+
+def append(path, text):
+    with open(path, 'a') as f:
+        f.write(text)
+
+
+def test_complete_lines_only(followed):
+    dataset, lines = followed
+    follower = LogFollower(dataset)
+    assert follower.poll() is None
+
+    append(dataset.filepath, lines[0] + 'not an event\n' + lines[1][:10])
+    events = follower.poll()
+    assert [e['sensor']['name'] for e in events] == [lines[0].split()[2]]
+
+    append(dataset.filepath, lines[1][10:])
+    assert follower.read_new_lines() == [lines[1]]
+    follower.close()
+
+
+def test_from_start_truncation_and_rotation(followed):
+    dataset, lines = followed
+    follower = LogFollower(dataset, parse_lines=list, from_start=True)
+    assert follower.poll() == lines
+
+    with open(dataset.filepath, 'w') as f:
+        f.writelines(lines[:5])
+    assert follower.poll() == lines[:5]
+
+    # The rest of the old file is read before the new one
+    append(dataset.filepath, lines[5])
+    os.rename(dataset.filepath, dataset.filepath + '.1')
+    with open(dataset.filepath, 'w') as f:
+        f.writelines(lines[10:12])
+    assert follower.poll() == [lines[5]] + lines[10:12]
+    follower.close()
+
+
+def test_background_polling(followed):
+    dataset, lines = followed
+    received = []
+    done = threading.Event()
+
+    def callback(events):
+        received.extend(events)
+        if len(received) >= 3:
+            done.set()
+
+    with LogFollower(dataset, parse_lines=list, poll_interval=.01) as follower:
+        follower.subscribe(callback)
+        append(dataset.filepath, ''.join(lines[:3]))
+        assert done.wait(10)
+    assert received == lines[:3]
+
+
+def test_ontology_follow(followed):
+    dataset, lines = followed
+    ontology = FakeHomeOntology(dataset, lightweight=True)
+    follower = ontology.follow()
+
+    append(dataset.filepath, ''.join(lines[:50]))
+    events = follower.poll()
+    assert all(isinstance(e, MeasureRecord) for e in events['sensor_events'])
+    # The new lines can be read like the others
+    window = ontology.read_data(50, len(lines))
+    assert event_tuples(events) == event_tuples(window)
+    assert event_tuples(window) == event_tuples(ontology.read_data(50, 0))
+    follower.close()
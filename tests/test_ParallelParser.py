@@ -0,0 +1,45 @@
+import sys
+
+import numpy as np
+import pytest
+
+from fakehome.core import EVENT_COLUMNS, LineIndex, parse_parallel
+
+ParallelParser = sys.modules['fakehome.core.ParallelParser']
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # The synthetic home is split into several chunks
+    monkeypatch.setattr(ParallelParser, 'MIN_CHUNK_LINES', 100)
+
+
+def assert_same_columns(columns, expected):
+    for name, dtype in EVENT_COLUMNS:
+        assert columns[name].dtype == dtype
+        np.testing.assert_array_equal(columns[name], expected[name])
+
+
+@pytest.mark.parametrize('start, stop', [(0, None), (123, 2345), (500, 500)])
+def test_parallel_matches_serial(dataset, start, stop):
+    lines = LineIndex(dataset.filepath).read_lines(start, stop)
+    expected = dataset.apply_lines_pattern(lines)
+
+    assert_same_columns(parse_parallel(dataset, start, stop, processes=1), expected)
+    assert_same_columns(parse_parallel(dataset, start, stop, processes=2), expected)
+
+
+def test_read_columns(ontology, dataset):
+    expected = parse_parallel(dataset, 1000, 2000, processes=1)
+    assert_same_columns(
+        ontology.read_columns(1000, 1000, processes=2), expected)
+
+
+def test_compressed_file(copy_home, dataset):
+    expected = parse_parallel(dataset, processes=1)
+    assert_same_columns(parse_parallel(copy_home('gz'), processes=2), expected)
+
+
+def test_wrong_dataset():
+    with pytest.raises(AttributeError):
+        parse_parallel('hh101')
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from fakehome import FakeHomeOntology
+from fakehome.core import LineIndex, open_source, resolve_source
+from fakehome.core.LineIndex import read_lines_from
+from fakehome.core.Sources import is_compressed, sidecar_path
+
+from conftest import event_tuples
+
+
+@pytest.fixture(scope='module')
+def lines(dataset):
+    with open(dataset.filepath) as f:
+        return f.readlines()
+
+
+@pytest.mark.parametrize('compression', ['gz', 'zip'])
+def test_resolve_compressed_file(copy_home, compression):
+    dataset = copy_home(compression)
+    path = os.path.join(dataset.dataset_path, dataset.dataset_conf['datapath'])
+    assert not os.path.exists(path)
+    assert resolve_source(path) == dataset.filepath
+    assert is_compressed(dataset.filepath)
+
+
+def test_zip_sidecar(copy_home):
+    archive = os.path.join(copy_home('zip').dataset_path, 'home.zip')
+    assert sidecar_path(os.path.join(archive, 'ann.txt'), '.idx') == \
+        archive + '.ann.txt.idx'
+
+
+@pytest.mark.parametrize('compression', ['gz', 'zip'])
+def test_line_index(copy_home, lines, compression):
+    index = LineIndex(copy_home(compression).filepath)
+    assert len(index) == len(lines)
+    # Forward windows keep the file open, backward ones reopen it
+    for start, stop in [(0, 10), (100, 200), (150, 160), (2990, 3000), (5, 7)]:
+        assert index.read_lines(start, stop) == lines[start:stop]
+    index.close()
+
+
+def test_read_lines_from(dataset, lines):
+    index = LineIndex(dataset.filepath)
+    with open_source(dataset.filepath) as f:
+        assert read_lines_from(f, index.offset(10), index.offset(20)) == lines[10:20]
+
+
+def test_ontology_from_compressed_file(copy_home, ontology):
+    with FakeHomeOntology(copy_home('gz'), lightweight=True) as compressed:
+        assert event_tuples(compressed.read_data(500, 1000)) == \
+            event_tuples(ontology.read_data(500, 1000))
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from fakehome.core import SpectralCache
+
+
+@pytest.fixture(scope='module')
+def laplacian(graph):
+    return graph.normalized_laplacian.toarray().astype(np.float64)
+
+
+def test_eigenpairs(graph, laplacian):
+    spectral = graph.spectral_cache()
+    expected = np.linalg.eigvalsh(laplacian)
+
+    w, v = spectral.eigenpairs()
+    np.testing.assert_allclose(w, expected, atol=1e-10)
+    np.testing.assert_allclose(laplacian @ v, v * w, atol=1e-10)
+
+    w, v = spectral.eigenpairs(3)
+    np.testing.assert_allclose(w, expected[:3], atol=1e-8)
+    assert v.shape == (graph.N, 3)
+    w, _ = spectral.eigenpairs(3, 'largest')
+    np.testing.assert_allclose(w, expected[-3:], atol=1e-8)
+    assert spectral.lmax == pytest.approx(expected[-1])
+
+    with pytest.raises(AttributeError):
+        spectral.eigenpairs(3, 'middle')
+
+
+def test_bases(graph, laplacian):
+    spectral = graph.spectral_cache()
+    I = np.eye(graph.N)
+    L = 2 * laplacian / np.linalg.eigvalsh(laplacian)[-1] - I
+    np.testing.assert_allclose(spectral.scaled_laplacian(dense=True), L, atol=1e-10)
+
+    T = [I, L]
+    for _ in range(2):
+        T.append(2 * L @ T[-1] - T[-2])
+    for computed, expected in zip(spectral.chebyshev_basis(3, dense=True), T):
+        np.testing.assert_allclose(computed, expected, atol=1e-10)
+
+    A = graph.symnorm_adjacency.toarray()
+    for k, computed in enumerate(spectral.power_basis(3, dense=True)):
+        np.testing.assert_allclose(computed, np.linalg.matrix_power(A, k), atol=1e-10)
+
+
+def test_persisted_operators(graph, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path)
+    spectral = graph.spectral_cache(cache_dir)
+    assert graph.spectral_cache(cache_dir) is spectral
+    basis = spectral.chebyshev_basis(2, dense=True)
+    w, v = spectral.eigenpairs(4)
+
+    # A new cache of the same topology loads the operators from disk
+    fresh = SpectralCache(graph.adjacency, graph.normalized_laplacian,
+                          graph.symnorm_adjacency, cache_dir=cache_dir)
+    assert fresh.key == spectral.key == graph.topology_key
+    monkeypatch.setattr(np.linalg, 'eigh', None)
+    monkeypatch.setattr('scipy.sparse.linalg.eigsh', None)
+    for computed, expected in zip(fresh.chebyshev_basis(2, dense=True), basis):
+        np.testing.assert_array_equal(computed, expected)
+    np.testing.assert_array_equal(fresh.eigenpairs(4)[0], w)
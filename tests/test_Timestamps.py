@@ -0,0 +1,41 @@
+import datetime
+
+import numpy as np
+
+from fakehome.core import parse_timestamp, parse_timestamps
+from fakehome.core.Timestamps import as_timestamps, to_date_representation
+
+STRINGS = [
+    '1970-01-01 00:00:00.000000',
+    '1970-01-02 00:00:00.5',
+    '2000-02-29 23:59:59.999999',
+    '2012-07-20 13:04:05.123456',
+    '2038-01-19 03:14:08.000001',
+]
+
+
+def reference(string):
+    date = datetime.datetime.strptime(string.ljust(26, '0'), '%Y-%m-%d %H:%M:%S.%f')
+    delta = date - datetime.datetime(1970, 1, 1)
+    return (delta.days * 86400 + delta.seconds) * 10 ** 9 + delta.microseconds * 1000
+
+
+def test_parse_timestamp():
+    for string in STRINGS:
+        assert parse_timestamp(string) == reference(string)
+    assert parse_timestamp('1970-01-02 00:00:00.5') == 86400500000000
+
+
+def test_parse_timestamps():
+    timestamps = parse_timestamps(STRINGS)
+    assert timestamps.dtype == np.int64
+    np.testing.assert_array_equal(timestamps, [reference(s) for s in STRINGS])
+    assert len(parse_timestamps([])) == 0
+
+
+def test_as_timestamps():
+    expected = parse_timestamps(STRINGS)
+    np.testing.assert_array_equal(as_timestamps(STRINGS), expected)
+    np.testing.assert_array_equal(
+        as_timestamps([to_date_representation(s) for s in STRINGS]), expected)
+    np.testing.assert_array_equal(as_timestamps(list(expected)), expected)
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from fakehome.core import NO_ACTIVITY, LineIndex
+from fakehome.core.EventColumns import concatenate_columns
+from fakehome.generators import EventSimulator, random_home_config, write_events
+
+
+def assert_same_columns(columns, expected):
+    assert sorted(columns) == sorted(expected)
+    for name in columns:
+        np.testing.assert_array_equal(columns[name], expected[name])
+
+
+def test_simulation_is_reproducible(ontology):
+    columns = EventSimulator(ontology, seed=3).simulate(num_events=2000)
+    assert len(columns['timestamp']) == 2000
+    assert_same_columns(
+        EventSimulator(ontology, seed=3).simulate(num_events=2000), columns)
+
+    assert (np.diff(columns['timestamp']) >= 0).all()
+    assert set(columns['sensor'].tolist()) <= set(range(len(ontology.dataset.sensor_list)))
+    assert (columns['activity'] != NO_ACTIVITY).any()
+
+
+def test_batches_continue_the_simulation(ontology):
+    simulator = EventSimulator(ontology, seed=3)
+    batches = list(simulator.iter_simulate(2000, batch_events=300))
+    assert len(batches) > 1
+    columns = concatenate_columns(batches)
+    assert len(columns['timestamp']) == 2000
+    assert (np.diff(columns['timestamp']) >= 0).all()
+
+    following = simulator.simulate(num_events=10)
+    assert following['timestamp'][0] >= columns['timestamp'][-1]
+
+
+def test_duration(ontology):
+    simulator = EventSimulator(ontology, seed=3)
+    start = simulator.time
+    columns = simulator.simulate(duration=600)
+    assert (columns['timestamp'] < start + 600 * 10 ** 9).all()
+    with pytest.raises(AttributeError):
+        simulator.simulate()
+
+
+def test_written_events_are_parsed_back(ontology, dataset, tmp_path):
+    columns = EventSimulator(ontology, seed=3).simulate(num_events=2000)
+    path = str(tmp_path / 'ann.txt')
+    assert write_events(dataset, columns, path) == 2000
+
+    parsed = dataset.apply_lines_pattern(LineIndex(path).read_lines())
+    for name in ('timestamp', 'sensor', 'value', 'activity'):
+        np.testing.assert_array_equal(parsed[name], columns[name])
+
+
+def test_random_home_config():
+    config = random_home_config(50, sensors_per_location=(1, 4), seed=7)
+    assert config == random_home_config(50, sensors_per_location=(1, 4), seed=7)
+
+    names = list(config['locations']['type'])
+    assert len(names) == 50
+    sensors = config['sensors']['locations']
+    assert all(1 <= len(sensors[name]) <= 4 for name in names)
+    all_sensors = sum(sensors.values(), [])
+    assert len(set(all_sensors)) == len(all_sensors)
+
+    # The locations are connected
+    neighbours = {name: set() for name in names}
+    for name, others in config['locations']['adjacency'].items():
+        for other in others:
+            neighbours[name].add(other)
+            neighbours[other].add(name)
+    reached, frontier = {names[0]}, [names[0]]
+    while frontier:
+        for other in neighbours[frontier.pop()] - reached:
+            reached.add(other)
+            frontier.append(other)
+    assert reached == set(names)
+
+    with pytest.raises(AttributeError):
+        random_home_config(0)